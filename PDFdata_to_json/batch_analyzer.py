@@ -1,26 +1,33 @@
 from financial_analyzer import FinancialAnalyzer
 from config import DEEPSEEK_API_KEY
 import os
+import json
+import random
+import asyncio
+import time
 from pathlib import Path
+from openai import AsyncOpenAI, APIConnectionError, APITimeoutError, APIStatusError
 
-def batch_analyze_markdown_files(markdown_dir="../results"):
+def batch_analyze_markdown_files(markdown_dir="../results", use_streaming=False, bypass_cache=False):
     """
     批量分析markdown文件夹中的所有markdown文件
     :param markdown_dir: 包含markdown文件的目录
+    :param use_streaming: 是否以流式方式调用模型
+    :param bypass_cache: 是否忽略已缓存的分析结果，每个文件都调用模型
     """
     if DEEPSEEK_API_KEY == "your_deepseek_api_key_here":
         print("请先在config.py中配置DeepSeek API密钥")
         return
     
-    analyzer = FinancialAnalyzer(DEEPSEEK_API_KEY)
+    analyzer = FinancialAnalyzer(DEEPSEEK_API_KEY, use_streaming=use_streaming, bypass_cache=bypass_cache)
     markdown_path = Path(markdown_dir)
     
     if not markdown_path.exists():
         print(f"Markdown目录不存在: {markdown_path}")
         return
     
-    # 递归查找所有markdown文件
-    markdown_files = list(markdown_path.rglob("*.md"))
+    # 递归查找所有markdown文件（排序后编号，保证输出文件名确定）
+    markdown_files = sorted(markdown_path.rglob("*.md"))
     
     if not markdown_files:
         print("目录中没有找到markdown文件")
@@ -50,22 +57,205 @@ def batch_analyze_markdown_files(markdown_dir="../results"):
     print(f"\n=== 批量分析完成 ===")
     print(f"成功: {success_count} 个文件")
     print(f"失败: {len(failed_files)} 个文件")
+    cache_stats = analyzer.result_cache.stats()
+    print(f"结果缓存: 命中 {cache_stats['hits']} 次, 未命中 {cache_stats['misses']} 次")
     
     if failed_files:
         print("\n失败的文件:")
         for file in failed_files:
             print(f"  - {file}")
 
-def analyze_single_markdown(markdown_file_path):
+class AsyncBatchAnalyzer:
+    """
+    基于 AsyncOpenAI 的并发批量分析引擎，复用 FinancialAnalyzer 的提示词、结果校验和结果缓存
+    """
+    
+    # 需要重试的HTTP状态码
+    RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+    
+    def __init__(self, analyzer, max_concurrency=8, max_retries=4, request_timeout=300,
+                 backoff_base=1.0, backoff_max=30.0):
+        """
+        :param analyzer: FinancialAnalyzer 实例
+        :param max_concurrency: 同时进行中的API请求数上限
+        :param max_retries: 遇到429/5xx或网络错误时的最大重试次数
+        :param request_timeout: 单次API请求的超时时间（秒），从取得并发名额后开始计时，不含排队等待
+        :param backoff_base: 退避基准时间（秒）
+        :param backoff_max: 单次退避的最长时间（秒）
+        """
+        self.analyzer = analyzer
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.request_timeout = request_timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # 由本引擎负责重试，关闭客户端自带的重试
+        self.client = AsyncOpenAI(api_key=analyzer.api_key, base_url=analyzer.base_url, max_retries=0)
+    
+    def is_retryable(self, error):
+        """判断异常是否值得重试"""
+        if isinstance(error, (APIConnectionError, APITimeoutError)):
+            return True
+        if isinstance(error, APIStatusError):
+            return error.status_code in self.RETRYABLE_STATUS_CODES
+        return False
+    
+    async def analyze_content(self, markdown_content, semaphore):
+        """
+        分析一份markdown内容，本地可计算全部指标或命中结果缓存时不调用API
+        表格解析等同步计算在线程中执行，不阻塞事件循环；模型调用失败时保留本地已计算的指标
+        :return: 分析结果JSON字符串或None
+        """
+        local_result, missing = await asyncio.to_thread(self.analyzer.compute_local_metrics, markdown_content)
+        if local_result is not None and not missing:
+            return json.dumps(local_result, ensure_ascii=False)
+        try:
+            llm_result = await self.request_llm_analysis(markdown_content, semaphore, missing)
+        except Exception:
+            if not local_result or not any(local_result.values()):
+                raise
+            llm_result = None
+        return self.analyzer.merge_results(local_result, llm_result)
+    
+    async def request_llm_analysis(self, markdown_content, semaphore, missing=None):
+        """
+        调用模型分析，遇到可重试的错误时按退避策略重试
+        超时只计算取得并发名额之后的API请求时间，排队等待和退避期间不计时
+        :param missing: 本地无法计算的指标列表，提供时只请求这些指标
+        :return: 分析结果JSON字符串或None
+        :raises asyncio.TimeoutError: 单次请求超过 request_timeout 秒
+        """
+        user_prompt = await asyncio.to_thread(self.analyzer.build_user_prompt, markdown_content, missing)
+        cache_key = self.analyzer.make_cache_key(user_prompt)
+        if not self.analyzer.bypass_cache:
+            cached_result = await asyncio.to_thread(self.analyzer.result_cache.get, cache_key)
+            if cached_result is not None:
+                return cached_result
+        
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with semaphore:
+                    response = await asyncio.wait_for(
+                        self.client.chat.completions.create(
+                            model=self.analyzer.model,
+                            messages=self.analyzer.build_messages(user_prompt),
+                            stream=False,
+                            temperature=self.analyzer.temperature
+                        ),
+                        self.request_timeout
+                    )
+                self.analyzer.record_usage(getattr(response, 'usage', None))
+                return await asyncio.to_thread(
+                    self.analyzer.extract_json_result, response.choices[0].message.content, cache_key
+                )
+            except Exception as e:
+                if attempt >= self.max_retries or not self.is_retryable(e):
+                    raise
+                # full jitter 指数退避
+                delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+                await asyncio.sleep(random.uniform(0, delay))
+    
+    async def analyze_file(self, markdown_file, output_filename, semaphore):
+        """
+        分析单个markdown文件并保存结果
+        :return: (markdown_file, 结果文件路径或None, 错误信息或None, 耗时秒数)
+        """
+        start = time.perf_counter()
+        try:
+            markdown_content = await asyncio.to_thread(self.analyzer.read_markdown_content, str(markdown_file))
+            if not markdown_content:
+                return markdown_file, None, "无法读取markdown文件内容", time.perf_counter() - start
+            
+            result = await self.analyze_content(markdown_content, semaphore)
+            if not result:
+                return markdown_file, None, "财务数据分析失败", time.perf_counter() - start
+            
+            result_path = await asyncio.to_thread(self.analyzer.save_analysis_result, result, output_filename)
+            error = None if result_path else "保存分析结果失败"
+            return markdown_file, result_path, error, time.perf_counter() - start
+        except asyncio.TimeoutError:
+            return markdown_file, None, f"API请求超过 {self.request_timeout} 秒未完成", time.perf_counter() - start
+        except Exception as e:
+            return markdown_file, None, str(e), time.perf_counter() - start
+    
+    async def run(self, markdown_files):
+        """
+        并发分析所有文件，按完成顺序报告进度
+        :param markdown_files: 已排序的markdown文件列表，输出文件名按此顺序编号
+        :return: 成功的文件列表和失败的 (文件, 错误) 列表
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        tasks = [
+            self.analyze_file(markdown_file, f"financial_analysis_{markdown_file.stem}_{i:03d}.json", semaphore)
+            for i, markdown_file in enumerate(markdown_files, 1)
+        ]
+        
+        succeeded, failed = [], []
+        for completed, task in enumerate(asyncio.as_completed(tasks), 1):
+            markdown_file, result_path, error, elapsed = await task
+            if result_path:
+                succeeded.append(markdown_file)
+                print(f"[{completed}/{len(tasks)}] ✓ {markdown_file.name} ({elapsed:.1f}秒)")
+            else:
+                failed.append((markdown_file, error))
+                print(f"[{completed}/{len(tasks)}] ✗ {markdown_file.name} ({elapsed:.1f}秒): {error}")
+        
+        await self.client.close()
+        return succeeded, failed
+
+def async_batch_analyze_markdown_files(markdown_dir="../results", max_concurrency=8, request_timeout=300, max_retries=4,
+                                       bypass_cache=False):
+    """
+    并发批量分析markdown文件夹中的所有markdown文件
+    :param markdown_dir: 包含markdown文件的目录
+    :param max_concurrency: 同时进行中的API请求数上限
+    :param request_timeout: 单次API请求的超时时间（秒），不含排队等待
+    :param max_retries: 429/5xx等错误的最大重试次数
+    :param bypass_cache: 是否忽略已缓存的分析结果，每个文件都调用模型
+    """
+    if DEEPSEEK_API_KEY == "your_deepseek_api_key_here":
+        print("请先在config.py中配置DeepSeek API密钥")
+        return
+    
+    markdown_path = Path(markdown_dir)
+    if not markdown_path.exists():
+        print(f"Markdown目录不存在: {markdown_path}")
+        return
+    
+    markdown_files = sorted(markdown_path.rglob("*.md"))
+    if not markdown_files:
+        print("目录中没有找到markdown文件")
+        return
+    
+    print(f"找到 {len(markdown_files)} 个markdown文件，并发数 {max_concurrency}，开始批量分析...")
+    
+    analyzer = FinancialAnalyzer(DEEPSEEK_API_KEY, bypass_cache=bypass_cache)
+    engine = AsyncBatchAnalyzer(analyzer, max_concurrency, max_retries, request_timeout)
+    succeeded, failed = asyncio.run(engine.run(markdown_files))
+    
+    print(f"\n=== 批量分析完成 ===")
+    print(f"成功: {len(succeeded)} 个文件")
+    print(f"失败: {len(failed)} 个文件")
+    cache_stats = analyzer.result_cache.stats()
+    print(f"结果缓存: 命中 {cache_stats['hits']} 次, 未命中 {cache_stats['misses']} 次")
+    
+    if failed:
+        print("\n失败的文件:")
+        for markdown_file, error in failed:
+            print(f"  - {markdown_file.name}: {error}")
+
+def analyze_single_markdown(markdown_file_path, use_streaming=False, bypass_cache=False):
     """
     分析单个markdown文件
     :param markdown_file_path: markdown文件路径
+    :param use_streaming: 是否以流式方式调用模型
+    :param bypass_cache: 是否忽略已缓存的分析结果，强制调用模型
     """
     if DEEPSEEK_API_KEY == "your_deepseek_api_key_here":
         print("请先在config.py中配置DeepSeek API密钥")
         return
     
-    analyzer = FinancialAnalyzer(DEEPSEEK_API_KEY)
+    analyzer = FinancialAnalyzer(DEEPSEEK_API_KEY, use_streaming=use_streaming, bypass_cache=bypass_cache)
     result = analyzer.analyze_markdown_file(markdown_file_path)
     
     if result:
@@ -77,10 +267,18 @@ if __name__ == "__main__":
     # 可以选择批量分析或单个文件分析
     import sys
     
-    if len(sys.argv) > 1:
+    # --stream: 以流式方式调用模型（逐个解析指标分组，输出偏离格式时提前中止）
+    use_streaming = '--stream' in sys.argv
+    # --no-llm-cache: 忽略已缓存的分析结果，强制调用模型（新结果仍会写入缓存）
+    bypass_cache = '--no-llm-cache' in sys.argv
+    args = [arg for arg in sys.argv[1:] if arg not in ('--stream', '--no-llm-cache')]
+    
+    if args and args[0] == '--async':
+        # 并发批量分析指定目录（默认为results）下的所有markdown文件
+        async_batch_analyze_markdown_files(*args[1:2], bypass_cache=bypass_cache)
+    elif args:
         # 分析指定的markdown文件
-        markdown_file = sys.argv[1]
-        analyze_single_markdown(markdown_file)
+        analyze_single_markdown(args[0], use_streaming, bypass_cache)
     else:
         # 批量分析results目录下的所有markdown文件
-        batch_analyze_markdown_files()
\ No newline at end of file
+        batch_analyze_markdown_files(use_streaming=use_streaming, bypass_cache=bypass_cache)
\ No newline at end of file
@@ -0,0 +1,165 @@
+import os
+import json
+import shutil
+import hashlib
+import threading
+from pathlib import Path
+from datetime import datetime
+
+
+def file_sha256(file_path, chunk_size=1024 * 1024):
+    """计算文件的SHA-256"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def detect_mineru_version():
+    """读取已安装的MinerU版本，无法确定时返回 'unknown'"""
+    try:
+        from importlib.metadata import version
+        return version('mineru')
+    except Exception:
+        return 'unknown'
+
+
+class MinerUOutputCache:
+    def __init__(self, cache_dir=None, max_size_mb=2048, mineru_version=None):
+        """
+        按PDF内容哈希缓存MinerU的输出目录，超出容量时按最近最少使用淘汰
+        :param cache_dir: 缓存目录，默认为 PDFdata_to_json/cache/mineru
+        :param max_size_mb: 缓存总大小上限（MB）
+        :param mineru_version: MinerU版本（参与缓存键），默认自动检测
+        """
+        if cache_dir is None:
+            cache_dir = Path(__file__).parent / 'cache' / 'mineru'
+        self.cache_dir = Path(cache_dir)
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.mineru_version = mineru_version or detect_mineru_version()
+        self._lock = threading.Lock()
+
+    def make_key(self, pdf_path, options=None):
+        """
+        生成缓存键：PDF内容哈希 + MinerU版本 + 提取参数
+        :param pdf_path: 原始PDF路径
+        :param options: 影响提取结果的参数（设备、页面筛选等）
+        :return: SHA-256 十六进制字符串
+        """
+        payload = json.dumps({
+            'pdf_sha256': file_sha256(pdf_path),
+            'mineru_version': self.mineru_version,
+            'options': options or {},
+        }, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _entry_dir(self, key):
+        return self.cache_dir / key
+
+    def _read_meta(self, entry_dir):
+        try:
+            with open(entry_dir / 'meta.json', 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, entry_dir, meta):
+        tmp_path = entry_dir / f"meta.json.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, entry_dir / 'meta.json')
+
+    @staticmethod
+    def _dir_size(path):
+        return sum(file.stat().st_size for file in Path(path).rglob('*') if file.is_file())
+
+    def get(self, key, copy_to=None):
+        """
+        查找缓存的markdown文件
+        :param key: 缓存键
+        :param copy_to: 指定时把markdown复制到该目录并返回副本路径，
+                        条目之后被其他任务淘汰也不影响本任务读取
+        :return: markdown文件路径，未命中时返回None
+        """
+        entry_dir = self._entry_dir(key)
+        meta = self._read_meta(entry_dir)
+        if not meta:
+            return None
+
+        # 淘汰同样在锁内进行，检查、复制期间条目不会被删除
+        with self._lock:
+            markdown_path = entry_dir / meta['markdown']
+            if not markdown_path.exists():
+                return None
+            if copy_to is not None:
+                os.makedirs(copy_to, exist_ok=True)
+                markdown_path = Path(shutil.copy2(markdown_path, Path(copy_to) / markdown_path.name))
+            meta['last_used_at'] = datetime.now().isoformat(timespec='seconds')
+            self._write_meta(entry_dir, meta)
+        return str(markdown_path)
+
+    def put(self, key, output_dir, markdown_path, metadata=None):
+        """
+        将MinerU输出目录复制到缓存
+        :param key: 缓存键
+        :param output_dir: MinerU输出目录
+        :param markdown_path: 输出目录中的markdown文件路径
+        :param metadata: 额外记录的信息
+        :return: 缓存中的markdown文件路径
+        """
+        entry_dir = self._entry_dir(key)
+        tmp_dir = self.cache_dir / f".{key}.{threading.get_ident()}.tmp"
+        os.makedirs(self.cache_dir, exist_ok=True)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        shutil.copytree(output_dir, tmp_dir / 'output')
+
+        now = datetime.now().isoformat(timespec='seconds')
+        meta = {
+            'key': key,
+            'mineru_version': self.mineru_version,
+            'markdown': str(Path('output') / Path(markdown_path).relative_to(output_dir)),
+            'size_bytes': self._dir_size(tmp_dir),
+            'created_at': now,
+            'last_used_at': now,
+        }
+        meta.update(metadata or {})
+        self._write_meta(tmp_dir, meta)
+
+        with self._lock:
+            if entry_dir.exists():
+                # 其他任务已写入相同内容
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+            else:
+                os.replace(tmp_dir, entry_dir)
+            self._evict(keep=key)
+        return str(entry_dir / meta['markdown'])
+
+    def entries(self):
+        """返回全部缓存条目的元数据"""
+        if not self.cache_dir.exists():
+            return []
+        entries = []
+        for entry_dir in self.cache_dir.iterdir():
+            if entry_dir.is_dir() and not entry_dir.name.startswith('.'):
+                meta = self._read_meta(entry_dir)
+                if meta:
+                    entries.append(meta)
+        return entries
+
+    def total_size(self):
+        """缓存占用的总字节数"""
+        return sum(entry.get('size_bytes', 0) for entry in self.entries())
+
+    def _evict(self, keep=None):
+        """按最近使用时间从旧到新删除条目，直到总大小不超过上限"""
+        entries = sorted(self.entries(), key=lambda entry: entry['last_used_at'])
+        total = sum(entry.get('size_bytes', 0) for entry in entries)
+        for entry in entries:
+            if total <= self.max_size_bytes:
+                break
+            if entry['key'] == keep:
+                continue
+            shutil.rmtree(self._entry_dir(entry['key']), ignore_errors=True)
+            total -= entry.get('size_bytes', 0)
+            print(f"MinerU缓存超出容量，已删除: {entry['key'][:12]}")
@@ -4,43 +4,14 @@ import subprocess
 from pathlib import Path
 from openai import OpenAI
 from datetime import datetime
-import re
 
-class FinancialAnalyzer:
-    def __init__(self, deepseek_api_key):
-        """
-        初始化财务分析器
-        :param deepseek_api_key: DeepSeek API密钥
-        """
-        self.client = OpenAI(
-            api_key=deepseek_api_key,
-            base_url="https://api.deepseek.com"
-        )
-        self.current_dir = Path(__file__).parent
-    
-    def read_markdown_content(self, markdown_path):
-        """
-        读取markdown文件内容
-        :param markdown_path: markdown文件路径
-        :return: 文件内容字符串
-        """
-        try:
-            with open(markdown_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            return content
-        except Exception as e:
-            print(f"读取markdown文件失败: {e}")
-            return None
-    
-    def analyze_financial_data(self, markdown_content):
-        """
-        使用DeepSeek API分析财务数据
-        :param markdown_content: markdown格式的财务报表内容
-        :return: 分析结果JSON字符串
-        """
-        try:
-            # 构建分析提示词
-            system_prompt = """
+from llm_result_cache import LLMResultCache
+from statement_locator import StatementLocator
+from local_ratio_engine import LocalRatioEngine, METRIC_GROUPS
+from streaming_json import IncrementalJSONParser, OffSchemaError, find_json_object
+
+# 财务指标提取的系统提示词
+SYSTEM_PROMPT = """
 你是一个专业的财务分析师。请根据提供的财务报表markdown内容，计算并提取以下财务指标，并以JSON格式返回结果：
 
 {
@@ -86,42 +57,291 @@ class FinancialAnalyzer:
 
 请仔细分析财务报表数据，优先从合并报表中提取数据。只返回JSON格式的结果，不要包含其他解释文字。
 """
+
+class FinancialAnalyzer:
+    def __init__(self, deepseek_api_key, result_cache=None, use_statement_locator=True, use_local_engine=True, use_streaming=False,
+                 client=None, bypass_cache=False):
+        """
+        初始化财务分析器
+        :param deepseek_api_key: DeepSeek API密钥
+        :param result_cache: 分析结果缓存（LLMResultCache），默认使用 PDFdata_to_json/cache/llm_results
+        :param use_statement_locator: 是否只向模型发送定位到的报表表格（未定位到时发送全文）
+        :param use_local_engine: 是否先在本地解析报表表格计算指标，只有本地无法计算时才调用模型
+        :param use_streaming: 是否以流式方式调用模型，逐个解析指标分组并在输出偏离格式时提前中止
+        :param client: OpenAI兼容的客户端，默认按API密钥创建DeepSeek客户端
+        :param bypass_cache: 为True时不读取结果缓存，每次都调用API（新结果仍会写入缓存）
+        """
+        self.api_key = deepseek_api_key
+        self.base_url = "https://api.deepseek.com"
+        self.client = client or OpenAI(
+            api_key=deepseek_api_key,
+            base_url=self.base_url
+        )
+        self.current_dir = Path(__file__).parent
+        self.model = "deepseek-chat"
+        self.temperature = 0.1  # 降低随机性，提高准确性
+        self.result_cache = result_cache or LLMResultCache()
+        self.statement_locator = StatementLocator() if use_statement_locator else None
+        self.ratio_engine = LocalRatioEngine(self.statement_locator) if use_local_engine else None
+        self.use_streaming = use_streaming
+        self.bypass_cache = bypass_cache
+        # 累计的token用量
+        self.token_usage = {'prompt_tokens': 0, 'completion_tokens': 0}
+    
+    def read_markdown_content(self, markdown_path):
+        """
+        读取markdown文件内容
+        :param markdown_path: markdown文件路径
+        :return: 文件内容字符串
+        """
+        try:
+            with open(markdown_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+            return content
+        except Exception as e:
+            print(f"读取markdown文件失败: {e}")
+            return None
+    
+    def record_usage(self, usage):
+        """
+        累计API返回的token用量
+        :param usage: 响应中的 usage 对象（可为None）
+        """
+        if usage is None:
+            return
+        self.token_usage['prompt_tokens'] += getattr(usage, 'prompt_tokens', 0) or 0
+        self.token_usage['completion_tokens'] += getattr(usage, 'completion_tokens', 0) or 0
+    
+    def prepare_content(self, markdown_content):
+        """
+        截取合并资产负债表、合并利润表及相关附注，未定位到时返回全文
+        :param markdown_content: markdown格式的财务报表内容
+        :return: 发送给模型的内容
+        """
+        if self.statement_locator is None:
+            return markdown_content
+        
+        sections = self.statement_locator.locate(markdown_content)
+        if not sections:
+            print("未定位到合并报表表格，发送完整内容")
+            return markdown_content
+        
+        print(f"已截取报表相关内容: {len(sections)}/{len(markdown_content)} 字符")
+        return sections
+    
+    def build_user_prompt(self, markdown_content, missing=None):
+        """
+        构建用户提示词
+        :param markdown_content: markdown格式的财务报表内容
+        :param missing: 本地无法计算的指标列表，提供时只要求模型计算这些指标
+        :return: 用户提示词
+        """
+        markdown_content = self.prepare_content(markdown_content)
+        if missing:
+            return (
+                f"其余指标已在本地计算，只需计算以下指标：{'、'.join(missing)}。"
+                f"按相同的JSON结构返回，只包含这些指标所在的分组和指标：\n\n{markdown_content}"
+            )
+        return f"请分析以下财务报表数据，特别注意提取存货、应收账款、营业收入、营业成本等关键数据：\n\n{markdown_content}"
+    
+    def build_messages(self, user_prompt):
+        """
+        构建发送给模型的消息列表
+        :param user_prompt: 用户提示词
+        :return: messages 列表
+        """
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt}
+        ]
+    
+    def make_cache_key(self, user_prompt):
+        """
+        计算请求对应的结果缓存键
+        :param user_prompt: 用户提示词
+        :return: 缓存键
+        """
+        return self.result_cache.make_key(user_prompt, SYSTEM_PROMPT, self.model, self.temperature)
+    
+    def extract_json_result(self, result, cache_key=None):
+        """
+        校验模型返回内容，必要时从中提取JSON部分
+        :param result: 模型返回的文本
+        :param cache_key: 提供时将有效结果写入缓存
+        :return: JSON字符串或None
+        """
+        # 尝试解析JSON以验证格式
+        try:
+            json.loads(result)
+            if cache_key:
+                self.result_cache.put(cache_key, result, self.model)
+            return result
+        except json.JSONDecodeError:
+            print("API返回的不是有效的JSON格式，尝试提取JSON部分")
+            # 尝试从响应中提取JSON部分
+            json_text = find_json_object(result)
+            if json_text:
+                if cache_key:
+                    self.result_cache.put(cache_key, json_text, self.model)
+                return json_text
+            else:
+                print("无法从响应中提取有效的JSON")
+                return None
+    
+    def compute_local_metrics(self, markdown_content):
+        """
+        在本地解析报表表格并计算指标
+        :param markdown_content: markdown格式的财务报表内容
+        :return: (指标字典, 无法计算的指标列表)，未启用本地计算时返回 (None, None)
+        """
+        if self.ratio_engine is None:
+            return None, None
+        try:
+            return self.ratio_engine.compute(markdown_content)
+        except Exception as e:
+            print(f"本地计算财务指标时发生错误: {e}")
+            return None, None
+    
+    def merge_results(self, local_result, llm_result):
+        """
+        合并本地计算结果和模型结果，本地已计算的指标优先
+        :param local_result: 本地计算的指标字典（可为None）
+        :param llm_result: 模型返回的JSON字符串（可为None）
+        :return: 合并后的JSON字符串；模型调用失败时返回本地结果（未计算的指标为null），两者都没有时返回None
+        """
+        has_local = bool(local_result) and any(local_result.values())
+        merged = None
+        if llm_result:
+            try:
+                merged = json.loads(llm_result)
+            except json.JSONDecodeError:
+                merged = None
+        if not isinstance(merged, dict):
+            if not has_local:
+                return None
+            print("模型未返回有效结果，使用本地计算的指标，其余指标记为空")
+            merged = {}
+        elif not has_local:
+            return llm_result
+        
+        for group, names in METRIC_GROUPS.items():
+            if not isinstance(merged.get(group), dict):
+                merged[group] = {}
+            for name in names:
+                if name in local_result.get(group, {}):
+                    merged[group][name] = local_result[group][name]
+                else:
+                    merged[group].setdefault(name, None)
+        return json.dumps(merged, ensure_ascii=False)
+    
+    def analyze_financial_data(self, markdown_content, bypass_cache=None):
+        """
+        分析财务数据：优先在本地计算，本地无法计算的指标再调用DeepSeek API补充
+        :param markdown_content: markdown格式的财务报表内容
+        :param bypass_cache: 为True时不读取结果缓存，强制调用API（新结果仍会写入缓存），默认取创建分析器时的设置
+        :return: 分析结果JSON字符串
+        """
+        local_result, missing = self.compute_local_metrics(markdown_content)
+        if local_result is not None and not missing:
+            print("已在本地计算全部财务指标，无需调用DeepSeek API")
+            return json.dumps(local_result, ensure_ascii=False)
+        if local_result is not None:
+            print(f"本地无法计算的指标: {'、'.join(missing)}，调用DeepSeek API补充")
+        
+        llm_result = self.request_llm_analysis(markdown_content, bypass_cache, missing)
+        return self.merge_results(local_result, llm_result)
+    
+    def request_llm_analysis(self, markdown_content, bypass_cache=None, missing=None):
+        """
+        使用DeepSeek API分析财务数据
+        :param markdown_content: markdown格式的财务报表内容
+        :param bypass_cache: 为True时不读取结果缓存，强制调用API（新结果仍会写入缓存），默认取创建分析器时的设置
+        :param missing: 本地无法计算的指标列表，提供时只请求这些指标
+        :return: 分析结果JSON字符串
+        """
+        try:
+            user_prompt = self.build_user_prompt(markdown_content, missing)
+            
+            # 相同内容、提示词、模型和温度的请求直接返回缓存结果
+            cache_key = self.make_cache_key(user_prompt)
+            if bypass_cache is None:
+                bypass_cache = self.bypass_cache
+            if not bypass_cache:
+                cached_result = self.result_cache.get(cache_key)
+                if cached_result is not None:
+                    print("命中分析结果缓存，跳过DeepSeek API调用")
+                    return cached_result
             
-            user_prompt = f"请分析以下财务报表数据，特别注意提取存货、应收账款、营业收入、营业成本等关键数据：\n\n{markdown_content}"
+            if self.use_streaming:
+                return self.stream_llm_analysis(user_prompt, cache_key)
             
             print("正在调用DeepSeek API进行财务分析...")
             
             response = self.client.chat.completions.create(
-                model="deepseek-chat",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
+                model=self.model,
+                messages=self.build_messages(user_prompt),
                 stream=False,
-                temperature=0.1  # 降低随机性，提高准确性
+                temperature=self.temperature
             )
             
+            self.record_usage(getattr(response, 'usage', None))
             result = response.choices[0].message.content
             print("DeepSeek API调用成功")
             
-            # 尝试解析JSON以验证格式
-            try:
-                json.loads(result)
-                return result
-            except json.JSONDecodeError:
-                print("API返回的不是有效的JSON格式，尝试提取JSON部分")
-                # 尝试从响应中提取JSON部分
-                json_match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', result, re.DOTALL)
-                if json_match:
-                    return json_match.group(0)
-                else:
-                    print("无法从响应中提取有效的JSON")
-                    return None
+            return self.extract_json_result(result, cache_key)
                     
         except Exception as e:
             print(f"调用DeepSeek API时发生错误: {e}")
             return None
     
+    def stream_llm_analysis(self, user_prompt, cache_key=None, on_group=None):
+        """
+        以流式方式调用DeepSeek API，每个指标分组闭合时立即解析，输出偏离格式时中止生成
+        :param user_prompt: 用户提示词
+        :param cache_key: 提供时将有效结果写入缓存
+        :param on_group: 分组解析完成时的回调 on_group(分组名称, 指标字典)
+        :return: 分析结果JSON字符串，失败或中止时返回None
+        """
+        print("正在以流式方式调用DeepSeek API进行财务分析...")
+        
+        parser = IncrementalJSONParser()
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=self.build_messages(user_prompt),
+            stream=True,
+            stream_options={"include_usage": True},
+            temperature=self.temperature
+        )
+        trailing_chunks = 0
+        try:
+            for chunk in response:
+                # 最后一个分片只包含token用量
+                if getattr(chunk, 'usage', None):
+                    self.record_usage(chunk.usage)
+                if not chunk.choices:
+                    continue
+                for group_name, metrics in parser.feed(chunk.choices[0].delta.content):
+                    print(f"已解析指标分组: {group_name}")
+                    if on_group:
+                        on_group(group_name, metrics)
+                # 顶层对象闭合后只再读取少量分片（等待用量统计），不等待冗长的剩余输出
+                if parser.complete:
+                    trailing_chunks += 1
+                    if trailing_chunks > 16:
+                        break
+        except OffSchemaError as e:
+            print(f"模型输出偏离预期格式，已中止生成: {e}")
+            return None
+        finally:
+            response.close()
+        
+        if not parser.complete:
+            print("流式响应结束时JSON仍未闭合")
+            return self.extract_json_result(parser.buffer, cache_key)
+        
+        print("DeepSeek API调用成功")
+        return self.extract_json_result(parser.document(), cache_key)
+    
     def save_analysis_result(self, result_json, output_filename=None):
         """
         保存分析结果到JSON文件
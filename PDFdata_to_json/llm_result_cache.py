@@ -0,0 +1,88 @@
+import os
+import json
+import hashlib
+import threading
+from pathlib import Path
+from datetime import datetime
+
+class LLMResultCache:
+    def __init__(self, cache_dir=None):
+        """
+        按内容哈希缓存大模型分析结果
+        :param cache_dir: 缓存目录，默认为 PDFdata_to_json/cache/llm_results
+        """
+        if cache_dir is None:
+            cache_dir = Path(__file__).parent / 'cache' / 'llm_results'
+        self.cache_dir = Path(cache_dir)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(user_prompt, system_prompt, model, temperature):
+        """
+        根据请求内容生成缓存键
+        :param user_prompt: 用户提示词（包含markdown内容）
+        :param system_prompt: 系统提示词
+        :param model: 模型名称
+        :param temperature: 采样温度
+        :return: SHA-256 十六进制字符串
+        """
+        payload = json.dumps(
+            [user_prompt, system_prompt, model, float(temperature)],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key):
+        """
+        读取缓存的结果
+        :param key: 缓存键
+        :return: 结果JSON字符串，未命中时返回None
+        """
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                result = json.load(f)['result']
+        except (OSError, ValueError, KeyError):
+            result = None
+
+        with self._lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return result
+
+    def put(self, key, result, model=None):
+        """
+        保存结果
+        :param key: 缓存键
+        :param result: 结果JSON字符串
+        :param model: 模型名称（仅作记录）
+        """
+        path = self._path(key)
+        os.makedirs(path.parent, exist_ok=True)
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'result': result,
+                'model': model,
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def stats(self):
+        """
+        返回命中统计
+        :return: {'hits': 命中次数, 'misses': 未命中次数, 'hit_rate': 命中率}
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+            }
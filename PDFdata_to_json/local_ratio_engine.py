@@ -0,0 +1,236 @@
+import re
+import html
+
+from statement_locator import StatementLocator
+
+# 指标分组，与系统提示词中的JSON结构一致
+METRIC_GROUPS = {
+    "盈利能力指标": ["净利润", "销售净利率", "销售毛利率", "净资产收益率"],
+    "成长性指标": ["净利润同比增长率", "营业总收入同比增长率"],
+    "偿债能力指标": ["流动比率", "速动比率", "资产负债率"],
+    "营运能力指标": ["存货周转天数", "应收账款周转天数"],
+}
+
+# 需要从报表中提取的项目：标准名称 -> 可接受的规范化行名
+BALANCE_SHEET_ITEMS = {
+    '应收账款': ['应收账款'],
+    '存货': ['存货'],
+    '流动资产合计': ['流动资产合计'],
+    '流动负债合计': ['流动负债合计'],
+    # 资产总计 = 负债和所有者权益总计
+    '资产总计': ['资产总计', '资产合计', '负债和所有者权益总计', '负债和股东权益总计', '负债及所有者权益总计'],
+    '负债合计': ['负债合计'],
+    '所有者权益合计': ['所有者权益合计', '股东权益合计', '所有者权益或股东权益合计'],
+}
+INCOME_STATEMENT_ITEMS = {
+    '营业总收入': ['营业总收入'],
+    '营业收入': ['营业收入'],
+    '营业成本': ['营业成本'],
+    '净利润': ['净利润'],
+}
+
+ROW_PATTERN = re.compile(r'<tr\b.*?>(.*?)</tr>', re.DOTALL | re.IGNORECASE)
+CELL_PATTERN = re.compile(r'<t[dh]\b.*?>(.*?)</t[dh]>', re.DOTALL | re.IGNORECASE)
+TAG_PATTERN = re.compile(r'<[^>]+>')
+YEAR_PATTERN = re.compile(r'(19|20)\d{2}')
+
+
+def parse_number(text):
+    """
+    将报表中的数字文本转换为浮点数，支持千分位、空格、全角字符和括号负数
+    :param text: 单元格文本
+    :return: 浮点数，无法解析时返回None
+    """
+    if text is None:
+        return None
+    text = str(text).strip()
+    text = text.translate(str.maketrans('０１２３４５６７８９．，－（）', '0123456789.,-()'))
+    text = re.sub(r'[\s,]', '', text)
+    negative = False
+    if text.startswith('(') and text.endswith(')'):
+        negative = True
+        text = text[1:-1]
+    if not re.fullmatch(r'[-+]?\d+(\.\d+)?', text):
+        return None
+    value = float(text)
+    return -value if negative else value
+
+
+def normalize_label(label):
+    """
+    规范化报表行名：去掉序号、"其中："等前缀及括号内说明
+    如 "五、净利润（净亏损以"－"号填列）" -> "净利润"
+    """
+    label = re.sub(r'\s', '', label)
+    label = re.sub(r'^[一二三四五六七八九十]+[、.．]', '', label)
+    label = re.sub(r'^[（(][一二三四五六七八九十\d]+[)）]', '', label)
+    label = re.sub(r'^(其中|加|减)[:：]', '', label)
+    label = re.sub(r'[（(][^（）()]*[)）]', '', label)
+    return label.strip(':：')
+
+
+class LocalRatioEngine:
+    def __init__(self, statement_locator=None):
+        """
+        从MinerU输出的markdown表格中解析报表项目并在本地计算财务指标
+        :param statement_locator: 报表定位器，默认新建StatementLocator
+        """
+        self.statement_locator = statement_locator or StatementLocator()
+
+    @staticmethod
+    def parse_table(table_text):
+        """
+        将HTML表格或markdown管道表格解析为二维单元格列表
+        :param table_text: 表格文本
+        :return: [[单元格文本, ...], ...]
+        """
+        rows = []
+        if table_text.lstrip().lower().startswith('<table'):
+            for row_html in ROW_PATTERN.findall(table_text):
+                cells = [html.unescape(TAG_PATTERN.sub('', cell)).strip() for cell in CELL_PATTERN.findall(row_html)]
+                rows.append(cells)
+        else:
+            for line in table_text.strip().split('\n'):
+                cells = [cell.strip() for cell in line.strip().strip('|').split('|')]
+                # 跳过 |---|---| 分隔行
+                if all(re.fullmatch(r':?-{2,}:?', cell) for cell in cells if cell):
+                    continue
+                rows.append(cells)
+        return rows
+
+    def extract_line_items(self, tables, wanted_items, unit=1):
+        """
+        从报表表格中提取项目的本期（期末）和上期（期初）数值
+        :param tables: 表格文本列表（同一张报表可能跨多个表格）
+        :param wanted_items: {标准名称: [可接受的规范化行名]}
+        :param unit: 金额单位倍数
+        :return: {标准名称: (本期值, 上期值或None)}，同名项目取第一次出现的值
+        """
+        label_lookup = {alias: name for name, aliases in wanted_items.items() for alias in aliases}
+        items = {}
+        note_column = None
+        swap_periods = False
+
+        for table_text in tables:
+            for cells in self.parse_table(table_text):
+                if not cells:
+                    continue
+
+                # 表头：记录附注列位置，并根据年份判断本期/上期列的顺序
+                if normalize_label(cells[0]) == '项目' or any('附注' in cell for cell in cells):
+                    note_column = next((i for i, cell in enumerate(cells) if '附注' in cell), None)
+                    years = [int(m.group(0)) for m in (YEAR_PATTERN.search(cell) for cell in cells) if m]
+                    swap_periods = len(years) >= 2 and years[0] < years[1]
+                    continue
+
+                name = label_lookup.get(normalize_label(cells[0]))
+                if name is None or name in items:
+                    continue
+
+                values = [
+                    parse_number(cell) for index, cell in enumerate(cells[1:], 1)
+                    if index != note_column
+                ]
+                numbers = [value for value in values if value is not None]
+                # 没有表头时，附注列可能是一个小整数
+                if note_column is None and len(numbers) >= 3 and numbers[0].is_integer() and abs(numbers[0]) < 100:
+                    numbers = numbers[1:]
+                if not numbers:
+                    continue
+
+                current = numbers[0] * unit
+                prior = numbers[1] * unit if len(numbers) > 1 else None
+                if swap_periods and prior is not None:
+                    current, prior = prior, current
+                items[name] = (current, prior)
+
+        return items
+
+    def compute(self, markdown_content):
+        """
+        在本地计算财务指标
+        :param markdown_content: MinerU输出的markdown内容
+        :return: (与LLM输出结构相同的指标字典, 无法计算的指标名称列表)
+        """
+        sections = self.statement_locator.locate_sections(markdown_content)
+        balance = {}
+        income = {}
+        if '合并资产负债表' in sections:
+            section = sections['合并资产负债表']
+            balance = self.extract_line_items(section['tables'], BALANCE_SHEET_ITEMS, section['unit'])
+        if '合并利润表' in sections:
+            section = sections['合并利润表']
+            income = self.extract_line_items(section['tables'], INCOME_STATEMENT_ITEMS, section['unit'])
+
+        metrics = self.calculate_metrics(balance, income)
+
+        result = {}
+        missing = []
+        for group, names in METRIC_GROUPS.items():
+            result[group] = {}
+            for name in names:
+                if metrics.get(name) is None:
+                    missing.append(name)
+                else:
+                    result[group][name] = metrics[name]
+        return result, missing
+
+    @staticmethod
+    def calculate_metrics(balance, income):
+        """
+        按系统提示词中的公式计算指标
+        :param balance: 资产负债表项目 {名称: (期末, 期初)}
+        :param income: 利润表项目 {名称: (本期, 上期)}
+        :return: {指标名称: 数值或None}
+        """
+        def current(items, name):
+            return items[name][0] if name in items else None
+
+        def prior(items, name):
+            return items[name][1] if name in items else None
+
+        def average(name):
+            if current(balance, name) is None or prior(balance, name) is None:
+                return None
+            return (current(balance, name) + prior(balance, name)) / 2
+
+        def divide(numerator, denominator):
+            if numerator is None or not denominator:
+                return None
+            return numerator / denominator
+
+        def ratio(numerator, denominator, scale=1):
+            value = divide(numerator, denominator)
+            return round(value * scale, 2) if value is not None else None
+
+        def growth(now, before):
+            if now is None or not before:
+                return None
+            return round((now - before) / abs(before) * 100, 2)
+
+        revenue = current(income, '营业收入') if '营业收入' in income else current(income, '营业总收入')
+        total_revenue = income.get('营业总收入') or income.get('营业收入')
+        cost = current(income, '营业成本')
+        net_profit = current(income, '净利润')
+        current_assets = current(balance, '流动资产合计')
+        current_liabilities = current(balance, '流动负债合计')
+        inventory = current(balance, '存货')
+
+        gross_profit = revenue - cost if revenue is not None and cost is not None else None
+        quick_assets = current_assets - inventory if current_assets is not None and inventory is not None else None
+        inventory_turnover = divide(cost, average('存货'))
+        receivable_turnover = divide(revenue, average('应收账款'))
+
+        return {
+            '净利润': round(net_profit, 2) if net_profit is not None else None,
+            '销售净利率': ratio(net_profit, revenue, 100),
+            '销售毛利率': ratio(gross_profit, revenue, 100),
+            '净资产收益率': ratio(net_profit, average('所有者权益合计'), 100),
+            '净利润同比增长率': growth(net_profit, prior(income, '净利润')),
+            '营业总收入同比增长率': growth(*total_revenue) if total_revenue else None,
+            '流动比率': ratio(current_assets, current_liabilities),
+            '速动比率': ratio(quick_assets, current_liabilities),
+            '资产负债率': ratio(current(balance, '负债合计'), current(balance, '资产总计'), 100),
+            '存货周转天数': ratio(365, inventory_turnover),
+            '应收账款周转天数': ratio(365, receivable_turnover),
+        }
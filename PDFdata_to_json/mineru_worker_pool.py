@@ -0,0 +1,351 @@
+import os
+import sys
+import uuid
+import queue
+import threading
+import multiprocessing
+import multiprocessing.spawn
+from pathlib import Path
+from contextlib import contextmanager
+
+
+def default_worker_count(device='cpu', memory_per_worker_gb=4, cores_per_worker=4):
+    """
+    根据CPU核数和内存估算工作进程数
+    :param device: 推理设备，GPU/NPU等设备默认只启动1个进程
+    :param memory_per_worker_gb: 每个进程（加载版面和OCR模型后）预计占用的内存
+    :param cores_per_worker: CPU推理时每个进程预留的核数
+    """
+    if device != 'cpu':
+        return 1
+    by_cores = max(1, (os.cpu_count() or 1) // cores_per_worker)
+    try:
+        memory_gb = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') / 1024 ** 3
+        by_memory = max(1, int(memory_gb // memory_per_worker_gb))
+    except (AttributeError, ValueError, OSError):  # Windows 没有 sysconf
+        by_memory = by_cores
+    return min(by_cores, by_memory)
+
+
+def find_venv_python(venv_dir='myenv'):
+    """
+    查找虚拟环境中的Python解释器（与命令行方式相同，相对于当前工作目录）
+    :return: 解释器的绝对路径，不存在时返回None
+    """
+    if os.name == 'nt':
+        python_path = os.path.join(venv_dir, 'Scripts', 'python.exe')
+    else:
+        python_path = os.path.join(venv_dir, 'bin', 'python')
+    return os.path.abspath(python_path) if os.path.exists(python_path) else None
+
+
+def _worker_main(device, threads, lang, backend, parse_method, job_queue, result_queue):
+    """工作进程：导入MinerU一次，之后循环处理任务，模型在进程内只加载一次"""
+    os.environ['MINERU_DEVICE_MODE'] = device
+    if threads:
+        os.environ.setdefault('OMP_NUM_THREADS', str(threads))
+    try:
+        from mineru.cli.common import do_parse, read_fn
+    except Exception as e:
+        result_queue.put(('ready', False, f"无法导入MinerU: {e}"))
+        return
+    result_queue.put(('ready', True, None))
+
+    while True:
+        job = job_queue.get()
+        if job is None:
+            break
+        job_id, pdf_path, output_dir = job
+        try:
+            do_parse(
+                output_dir,
+                [Path(pdf_path).stem],
+                [read_fn(Path(pdf_path))],
+                [lang],
+                backend=backend,
+                parse_method=parse_method,
+            )
+            markdown_files = sorted(Path(output_dir).rglob('*.md'))
+            if markdown_files:
+                result_queue.put((job_id, str(markdown_files[0]), None))
+            else:
+                result_queue.put((job_id, None, "未找到生成的markdown文件"))
+        except Exception as e:
+            result_queue.put((job_id, None, str(e)))
+
+
+# spawn 使用的解释器是进程级的全局设置，临时替换期间加锁，避免与其他线程启动的进程互相影响
+_executable_lock = threading.Lock()
+
+
+@contextmanager
+def spawn_executable(context, python_executable):
+    """在 with 块内以指定的解释器启动 spawn 进程，结束后恢复原来的解释器"""
+    if not python_executable or python_executable == sys.executable:
+        yield
+        return
+    with _executable_lock:
+        previous = multiprocessing.spawn.get_executable()
+        context.set_executable(python_executable)
+        try:
+            yield
+        finally:
+            context.set_executable(previous)
+
+
+class MinerUWorker:
+    def __init__(self, context, device, threads, lang, backend, parse_method, startup_timeout,
+                 python_executable=None):
+        """
+        单个常驻的MinerU工作进程，通过各自的任务队列和结果队列通信
+        :param python_executable: 启动进程使用的解释器（MinerU所在的虚拟环境），默认为当前解释器
+        """
+        self.context = context
+        self.args = (device, threads, lang, backend, parse_method)
+        self.startup_timeout = startup_timeout
+        self.python_executable = python_executable
+        self.process = None
+        self.job_queue = None
+        self.result_queue = None
+
+    def start(self):
+        """启动进程并等待其完成MinerU导入"""
+        self.launch()
+        self.wait_ready()
+
+    def launch(self):
+        """启动进程，不等待MinerU导入完成"""
+        self.job_queue = self.context.Queue()
+        self.result_queue = self.context.Queue()
+        self.process = self.context.Process(
+            target=_worker_main,
+            args=self.args + (self.job_queue, self.result_queue),
+            daemon=True,
+        )
+        # 重启时同样需要用MinerU环境的解释器启动，启动后恢复全局设置
+        with spawn_executable(self.context, self.python_executable):
+            self.process.start()
+
+    def wait_ready(self):
+        """等待进程报告MinerU导入结果，进程提前退出或超时视为启动失败"""
+        waited = 0
+        while True:
+            try:
+                _, ready, error = self.result_queue.get(timeout=1)
+                break
+            except queue.Empty:
+                waited += 1
+                if not self.process.is_alive():
+                    ready, error = False, "工作进程启动后异常退出"
+                    break
+                if waited >= self.startup_timeout:
+                    ready, error = False, "工作进程启动超时"
+                    break
+        if not ready:
+            self.stop()
+            raise RuntimeError(error)
+
+    def stop(self):
+        if self.process is None:
+            return
+        if self.process.is_alive():
+            self.job_queue.put(None)
+            self.process.join(5)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.process = None
+
+    def terminate(self):
+        """立即终止进程，之后需要重新 start() 才能继续使用"""
+        if self.process is not None and self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.process = None
+
+    def restart(self):
+        self.terminate()
+        self.start()
+
+    def run(self, pdf_path, output_dir, timeout):
+        """
+        提交一个任务并等待结果，超时或进程异常退出时终止进程（process 置为None，由进程池负责重启）
+        :return: markdown文件路径
+        """
+        job_id = uuid.uuid4().hex
+        self.job_queue.put((job_id, str(pdf_path), str(output_dir)))
+
+        waited = 0
+        while True:
+            try:
+                result_id, markdown_path, error = self.result_queue.get(timeout=1)
+            except queue.Empty:
+                waited += 1
+                if not self.process.is_alive():
+                    self.terminate()
+                    raise RuntimeError("MinerU工作进程异常退出")
+                if timeout and waited >= timeout:
+                    # 终止卡住的进程，新进程由进程池在后台启动，不占用当前任务的时间
+                    self.terminate()
+                    raise TimeoutError(f"MinerU提取超时（{timeout}秒）")
+                continue
+            if result_id != job_id:
+                continue
+            if error:
+                raise RuntimeError(error)
+            return markdown_path
+
+
+class MinerUWorkerPool:
+    def __init__(self, device='cpu', workers=None, job_timeout=600, startup_timeout=300,
+                 lang='ch', backend='pipeline', parse_method='auto', python_executable=None):
+        """
+        常驻的MinerU工作进程池：每个进程只加载一次模型，PDF通过本地队列提交
+        工作进程使用MinerU所在虚拟环境的解释器启动：依次取 python_executable、环境变量 MINERU_PYTHON、
+        当前目录下的 myenv，都没有时使用当前解释器
+        :param device: 推理设备（cpu/cuda/cuda:0/npu/mps）
+        :param workers: 工作进程数，默认按CPU核数和内存估算
+        :param job_timeout: 单个PDF的提取超时（秒），超时后重启对应的进程
+        :param startup_timeout: 进程启动（导入MinerU）的超时（秒）
+        :param lang: 文档语言
+        :param backend: 解析后端
+        :param parse_method: 解析方法（auto/txt/ocr）
+        :param python_executable: 工作进程的Python解释器；显式配置（参数或 MINERU_PYTHON）后无法导入MinerU时
+                                  直接报错，不再退回命令行方式
+        """
+        configured = python_executable or os.environ.get('MINERU_PYTHON')
+        self.python_executable = configured or find_venv_python() or sys.executable
+        self.python_configured = bool(configured)
+        self.device = device
+        self.workers = workers or default_worker_count(device)
+        self.job_timeout = job_timeout
+        self.startup_timeout = startup_timeout
+        self.lang = lang
+        self.backend = backend
+        self.parse_method = parse_method
+
+        self._lock = threading.Lock()
+        self._idle = queue.Queue()
+        self._all_workers = []
+        self._available = None
+        self._start_error = None
+
+    def start(self):
+        """
+        启动全部工作进程（只启动一次）
+        :return: 进程池是否可用，MinerU无法导入时返回False
+        :raises RuntimeError: 显式配置的解释器无法启动工作进程或导入MinerU
+        """
+        with self._lock:
+            if self._start_error:
+                raise RuntimeError(self._start_error)
+            if self._available is not None:
+                return self._available
+
+            # spawn 方式避免子进程继承父进程的CUDA和线程状态
+            context = multiprocessing.get_context('spawn')
+            if self.python_configured and not os.path.exists(self.python_executable):
+                self._available = False
+                self._start_error = f"配置的MinerU解释器不存在: {self.python_executable}"
+                raise RuntimeError(self._start_error)
+            threads = max(1, (os.cpu_count() or 1) // self.workers) if self.device == 'cpu' else None
+            try:
+                # 先启动全部进程再等待，模型导入并行进行
+                for _ in range(self.workers):
+                    # MinerU安装在独立的虚拟环境中时，工作进程用该环境的解释器启动
+                    worker = MinerUWorker(
+                        context, self.device, threads, self.lang, self.backend,
+                        self.parse_method, self.startup_timeout, self.python_executable
+                    )
+                    worker.launch()
+                    self._all_workers.append(worker)
+                for worker in self._all_workers:
+                    worker.wait_ready()
+                    self._idle.put(worker)
+            except Exception as e:
+                self._stop_workers()
+                self._available = False
+                if self.python_configured:
+                    self._start_error = f"MinerU工作进程启动失败（解释器 {self.python_executable}）: {e}"
+                    raise RuntimeError(self._start_error)
+                print(f"MinerU工作进程启动失败，改用命令行方式提取: {e}")
+                return False
+
+            print(f"MinerU工作进程池已启动: {self.workers} 个进程，设备 {self.device}，解释器 {self.python_executable}")
+            self._available = True
+            return True
+
+    def is_available(self):
+        return self.start()
+
+    def extract(self, pdf_path, output_dir, timeout=None):
+        """
+        提取一个PDF，阻塞直到有空闲进程并完成提取
+        :param pdf_path: PDF路径
+        :param output_dir: 输出目录
+        :param timeout: 本次提取的超时（秒），默认使用 job_timeout
+        :return: 生成的markdown文件路径
+        """
+        if not self.start():
+            raise RuntimeError("MinerU工作进程池不可用")
+        os.makedirs(output_dir, exist_ok=True)
+        worker = self._acquire_worker()
+        try:
+            return worker.run(pdf_path, output_dir, timeout or self.job_timeout)
+        finally:
+            if worker.process is None:
+                # 进程已因超时或异常退出被终止，在后台重启，不阻塞当前任务
+                threading.Thread(target=self._restart_worker, args=(worker,), daemon=True).start()
+            else:
+                self._idle.put(worker)
+
+    def _acquire_worker(self):
+        """等待空闲进程，进程全部启动失败被移除后不再等待"""
+        while True:
+            try:
+                return self._idle.get(timeout=1)
+            except queue.Empty:
+                if not self._all_workers:
+                    raise RuntimeError("MinerU工作进程池中已没有可用的进程")
+
+    def _restart_worker(self, worker):
+        """重启进程，成功后放回空闲队列，失败时从进程池中移除"""
+        try:
+            worker.start()
+        except Exception as e:
+            with self._lock:
+                if worker in self._all_workers:
+                    self._all_workers.remove(worker)
+                remaining = len(self._all_workers)
+                if not remaining:
+                    # 之后的提取改用命令行方式；显式配置了解释器时直接报错
+                    self._available = False
+                    if self.python_configured:
+                        self._start_error = f"MinerU工作进程全部重启失败（解释器 {self.python_executable}）: {e}"
+            print(f"MinerU工作进程重启失败，已从进程池移除（剩余 {remaining} 个）: {e}")
+            return
+        with self._lock:
+            if worker not in self._all_workers:
+                # 重启期间进程池已关闭
+                worker.stop()
+                return
+        self._idle.put(worker)
+
+    def _stop_workers(self):
+        for worker in self._all_workers:
+            worker.stop()
+        self._all_workers = []
+        self._idle = queue.Queue()
+
+    def close(self):
+        """停止全部工作进程"""
+        with self._lock:
+            self._stop_workers()
+            self._available = None
+            self._start_error = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
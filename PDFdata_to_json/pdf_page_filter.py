@@ -0,0 +1,160 @@
+import os
+import re
+from pathlib import Path
+
+try:
+    from pypdf import PdfReader, PdfWriter
+except ImportError:  # 未安装pypdf时不做页面预筛选，MinerU处理全文
+    PdfReader = PdfWriter = None
+
+# 合并报表标题
+STATEMENT_TITLE_PATTERN = re.compile(r'合并(资产负债表|利润表|损益表)')
+
+# 报表中的典型行项目，用于识别报表正文页（包括没有标题的续页）
+STATEMENT_ITEMS = [
+    '流动资产合计', '非流动资产合计', '资产总计', '流动负债合计', '负债合计',
+    '所有者权益合计', '股东权益合计', '营业总收入', '营业收入', '营业成本',
+    '营业利润', '利润总额', '净利润',
+]
+
+# 存货、应收账款附注
+NOTE_TITLE_PATTERN = re.compile(r'存货(分类|明细|跌价准备)|应收账款(分类|按账龄|坏账准备|明细)')
+NOTE_AMOUNT_PATTERN = re.compile(r'账面余额|期末余额|账面价值')
+
+# 目录行（带引导点），目录页中的报表名称不计入
+TOC_LINE_PATTERN = re.compile(r'[.…·]{3,}')
+
+
+class PdfPageFilter:
+    # 未安装pypdf的提示每个进程只输出一次
+    _missing_pypdf_reported = False
+
+    def __init__(self, min_statement_items=5, min_text_chars=100, min_text_page_ratio=0.5,
+                 context_pages=1, max_note_pages=20):
+        """
+        扫描PDF文字层，找出合并报表及存货、应收账款附注所在页，只让MinerU处理这些页
+        :param min_statement_items: 判定为报表正文页所需的行项目数量
+        :param min_text_chars: 页面文字少于该长度视为没有文字层
+        :param min_text_page_ratio: 有文字层的页面比例低于该值时视为扫描件，处理全文
+        :param context_pages: 报表页之后额外保留的页数（报表跨页时的续页）
+        :param max_note_pages: 最多保留的附注页数
+        """
+        self.min_statement_items = min_statement_items
+        self.min_text_chars = min_text_chars
+        self.min_text_page_ratio = min_text_page_ratio
+        self.context_pages = context_pages
+        self.max_note_pages = max_note_pages
+
+    @staticmethod
+    def is_available():
+        """是否安装了pypdf"""
+        return PdfReader is not None
+
+    def extract_page_texts(self, pdf_path):
+        """
+        读取每一页的文字层
+        :return: 每页文字列表，读取失败时返回None
+        """
+        try:
+            reader = PdfReader(pdf_path)
+            return [page.extract_text() or '' for page in reader.pages]
+        except Exception as e:
+            print(f"读取PDF文字层失败: {e}")
+            return None
+
+    def is_scanned(self, page_texts):
+        """判断PDF是否为扫描件（大部分页面没有文字层）"""
+        if not page_texts:
+            return True
+        text_pages = sum(1 for text in page_texts if len(re.sub(r'\s', '', text)) >= self.min_text_chars)
+        return text_pages / len(page_texts) < self.min_text_page_ratio
+
+    def classify_page(self, text):
+        """
+        判断页面类型
+        :return: 'statement'、'note' 或 None
+        """
+        compact = re.sub(r'\s', '', text)
+        items = sum(1 for item in STATEMENT_ITEMS if item in compact)
+        has_title = any(
+            STATEMENT_TITLE_PATTERN.search(line) and not TOC_LINE_PATTERN.search(line)
+            for line in text.split('\n')
+        )
+        if items >= self.min_statement_items or (has_title and items >= 2):
+            return 'statement'
+        if NOTE_TITLE_PATTERN.search(compact) and NOTE_AMOUNT_PATTERN.search(compact):
+            return 'note'
+        return None
+
+    def select_pages(self, page_texts):
+        """
+        选出需要交给MinerU的页
+        :param page_texts: 每页文字列表
+        :return: 从0开始的页码列表（升序），未找到报表页时返回None
+        """
+        statement_pages = set()
+        note_pages = []
+        for index, text in enumerate(page_texts):
+            kind = self.classify_page(text)
+            if kind == 'statement':
+                statement_pages.add(index)
+            elif kind == 'note':
+                note_pages.append(index)
+
+        if not statement_pages:
+            return None
+
+        selected = set(statement_pages)
+        for index in statement_pages:
+            selected.update(range(index + 1, min(index + 1 + self.context_pages, len(page_texts))))
+        selected.update(note_pages[:self.max_note_pages])
+        return sorted(selected)
+
+    @staticmethod
+    def write_pages(pdf_path, pages, output_path):
+        """将选中的页写入新的PDF"""
+        reader = PdfReader(pdf_path)
+        writer = PdfWriter()
+        for index in pages:
+            writer.add_page(reader.pages[index])
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        with open(output_path, 'wb') as f:
+            writer.write(f)
+        return output_path
+
+    def prepare(self, pdf_path, output_dir):
+        """
+        生成只包含报表相关页的PDF
+        :param pdf_path: 原始PDF路径
+        :param output_dir: 筛选后PDF的输出目录
+        :return: (交给MinerU的PDF路径, 选中的页码列表)，无法筛选时返回 (原始路径, None)
+        """
+        if not self.is_available():
+            if not PdfPageFilter._missing_pypdf_reported:
+                PdfPageFilter._missing_pypdf_reported = True
+                print("未安装pypdf，页面预筛选已停用，MinerU将处理全部页面（安装: pip install pypdf）")
+            return pdf_path, None
+
+        page_texts = self.extract_page_texts(pdf_path)
+        if page_texts is None:
+            return pdf_path, None
+        if self.is_scanned(page_texts):
+            print("PDF缺少文字层（可能为扫描件），处理全部页面")
+            return pdf_path, None
+
+        pages = self.select_pages(page_texts)
+        if not pages:
+            print("未识别到合并报表所在页，处理全部页面")
+            return pdf_path, None
+        if len(pages) == len(page_texts):
+            return pdf_path, pages
+
+        output_path = os.path.join(output_dir, f"{Path(pdf_path).stem}_statements.pdf")
+        try:
+            self.write_pages(pdf_path, pages, output_path)
+        except Exception as e:
+            print(f"生成筛选后的PDF失败，处理全部页面: {e}")
+            return pdf_path, None
+
+        print(f"页面预筛选: 共 {len(page_texts)} 页，选取 {len(pages)} 页（第 {', '.join(str(p + 1) for p in pages)} 页）")
+        return output_path, pages
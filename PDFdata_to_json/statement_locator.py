@@ -0,0 +1,150 @@
+import re
+
+# HTML表格（MinerU默认输出）或连续的markdown管道表格行（管道表格每行单独匹配，不跨行）
+TABLE_PATTERN = re.compile(r'<table\b.*?</table>|(?:^[ \t]*\|[^\n]*\|[ \t]*(?:\n|$))+', re.DOTALL | re.IGNORECASE | re.MULTILINE)
+
+# 报表标题行：用于定位报表起点，也用于判断上一张报表的结束
+STATEMENT_TITLE_PATTERN = re.compile(r'(资产负债表|利润表|损益表|现金流量表|所有者权益变动表|股东权益变动表)')
+
+# 报表金额单位，如"单位：元"、"单位：万元"
+UNIT_PATTERN = re.compile(r'单位\s*[:：]\s*(人民币)?\s*(元|千元|万元|百万元|亿元)')
+UNIT_MULTIPLIERS = {'元': 1, '千元': 1e3, '万元': 1e4, '百万元': 1e6, '亿元': 1e8}
+
+# 目录行（带引导点或以页码结尾），不视为标题
+TOC_LINE_PATTERN = re.compile(r'[.…·]{3,}|\s\d+\s*$')
+
+
+class StatementLocator:
+    def __init__(self, max_title_length=30, max_gap_chars=600, max_note_tables=2):
+        """
+        在MinerU输出的markdown中定位合并报表及相关附注表格
+        :param max_title_length: 标题行的最大长度，更长的行视为正文而非标题
+        :param max_gap_chars: 同一张报表跨页时，两个表格之间允许的最大非表格文字长度
+        :param max_note_tables: 每个附注项目最多截取的表格数
+        """
+        self.max_title_length = max_title_length
+        self.max_gap_chars = max_gap_chars
+        self.max_note_tables = max_note_tables
+
+        # 需要截取的报表：(名称, 优先匹配的标题, 无合并报表时的备选标题)
+        self.statements = [
+            ('合并资产负债表', re.compile(r'合并资产负债表'), re.compile(r'资产负债表')),
+            ('合并利润表', re.compile(r'合并(利润|损益)表'), re.compile(r'(利润|损益)表')),
+        ]
+        # 需要截取的附注项目（存货、应收账款的期初期末明细）
+        self.notes = [
+            ('存货附注', re.compile(r'^[\W\d一二三四五六七八九十（）()、.．]*存货(分类|明细)?[\W]*$')),
+            ('应收账款附注', re.compile(r'^[\W\d一二三四五六七八九十（）()、.．]*应收账款(分类|明细)?[\W]*$')),
+        ]
+
+    def _split_blocks(self, markdown_content):
+        """将markdown切分为表格块和文本行，返回 [(类型, 起始位置, 结束位置, 文本)]"""
+        blocks = []
+        position = 0
+        for match in TABLE_PATTERN.finditer(markdown_content):
+            blocks.extend(self._text_lines(markdown_content, position, match.start()))
+            blocks.append(('table', match.start(), match.end(), match.group(0)))
+            position = match.end()
+        blocks.extend(self._text_lines(markdown_content, position, len(markdown_content)))
+        return blocks
+
+    @staticmethod
+    def _text_lines(markdown_content, start, end):
+        lines = []
+        offset = start
+        for line in markdown_content[start:end].split('\n'):
+            if line.strip():
+                lines.append(('text', offset, offset + len(line), line))
+            offset += len(line) + 1
+        return lines
+
+    def _is_title(self, line, pattern):
+        title = line.strip().lstrip('#').strip()
+        if len(title) > self.max_title_length or TOC_LINE_PATTERN.search(title):
+            return False
+        return pattern.search(title) is not None
+
+    def _collect_statement(self, blocks, title_index):
+        """
+        从标题行开始，收集属于该报表的连续表格（允许跨页的页眉页脚等少量文字）
+        :return: (表格列表, 金额单位倍数)
+        """
+        tables = []
+        unit = 1
+        gap_chars = 0
+        for kind, start, end, text in blocks[title_index + 1:]:
+            if kind == 'table':
+                tables.append(text)
+                gap_chars = 0
+                continue
+            # 遇到下一张报表的标题，或表格之间文字过多，视为本报表结束
+            if self._is_title(text, STATEMENT_TITLE_PATTERN):
+                break
+            unit_match = UNIT_PATTERN.search(text)
+            if unit_match and not tables:
+                unit = UNIT_MULTIPLIERS[unit_match.group(2)]
+            gap_chars += len(text.strip())
+            if gap_chars > self.max_gap_chars:
+                break
+        return tables, unit
+
+    def _find_statement(self, blocks, primary_pattern, fallback_pattern):
+        """查找报表标题并返回 (标题, 表格列表, 单位倍数)，优先匹配合并报表，且只返回包含表格的第一个匹配"""
+        for pattern in (primary_pattern, fallback_pattern):
+            for index, (kind, _, _, text) in enumerate(blocks):
+                if kind == 'text' and self._is_title(text, pattern):
+                    tables, unit = self._collect_statement(blocks, index)
+                    if tables:
+                        return text.strip().lstrip('#').strip(), tables, unit
+        return None, [], 1
+
+    def _find_note_tables(self, blocks, pattern):
+        """查找附注项目标题之后紧跟的表格"""
+        tables = {}
+        for index, (kind, _, _, text) in enumerate(blocks):
+            if kind != 'text' or not self._is_title(text, pattern):
+                continue
+            for next_kind, next_start, _, next_text in blocks[index + 1:index + 4]:
+                if next_kind == 'table':
+                    # 多级标题（如"9、存货"与"（1）存货分类"）可能指向同一张表格
+                    tables[next_start] = next_text
+                    break
+            if len(tables) >= self.max_note_tables:
+                break
+        return list(tables.values())
+
+    def locate_sections(self, markdown_content):
+        """
+        定位各报表及附注表格
+        :param markdown_content: MinerU输出的markdown内容
+        :return: {名称: {'title': 标题, 'tables': [表格文本], 'unit': 金额单位倍数}}，只包含找到的部分
+        """
+        blocks = self._split_blocks(markdown_content)
+
+        sections = {}
+        for name, primary_pattern, fallback_pattern in self.statements:
+            title, tables, unit = self._find_statement(blocks, primary_pattern, fallback_pattern)
+            if tables:
+                sections[name] = {'title': title, 'tables': tables, 'unit': unit}
+
+        for name, pattern in self.notes:
+            tables = self._find_note_tables(blocks, pattern)
+            if tables:
+                sections[name] = {'title': name, 'tables': tables, 'unit': 1}
+
+        return sections
+
+    def locate(self, markdown_content):
+        """
+        截取合并资产负债表、合并利润表及存货、应收账款附注表格
+        :param markdown_content: MinerU输出的markdown内容
+        :return: 仅包含相关表格的markdown，未找到两张主表时返回None
+        """
+        sections = self.locate_sections(markdown_content)
+        if any(name not in sections for name, _, _ in self.statements):
+            return None
+
+        return "\n\n".join(
+            f"## {section['title']}\n\n" + "\n\n".join(section['tables'])
+            for section in sections.values()
+        )
@@ -0,0 +1,146 @@
+import json
+
+from local_ratio_engine import METRIC_GROUPS
+
+
+class OffSchemaError(ValueError):
+    """模型输出偏离预期的JSON结构"""
+
+
+def find_json_object(text):
+    """
+    从文本中提取第一个完整且可解析的JSON对象（按括号配对，忽略字符串内的括号）
+    :param text: 模型返回的文本，可能包含```json代码块或说明文字
+    :return: JSON字符串，找不到时返回None
+    """
+    start = text.find('{')
+    while start != -1:
+        depth = 0
+        in_string = False
+        escape = False
+        for index in range(start, len(text)):
+            char = text[index]
+            if in_string:
+                if escape:
+                    escape = False
+                elif char == '\\':
+                    escape = True
+                elif char == '"':
+                    in_string = False
+            elif char == '"':
+                in_string = True
+            elif char == '{':
+                depth += 1
+            elif char == '}':
+                depth -= 1
+                if depth == 0:
+                    candidate = text[start:index + 1]
+                    try:
+                        json.loads(candidate)
+                        return candidate
+                    except json.JSONDecodeError:
+                        break
+        start = text.find('{', start + 1)
+    return None
+
+
+class IncrementalJSONParser:
+    def __init__(self, expected_groups=None, max_prefix_chars=200, max_chars=4000, max_depth=2):
+        """
+        增量解析流式返回的指标JSON，每个指标分组的对象闭合时立即解析
+        :param expected_groups: 允许出现的顶层分组名称，默认为全部指标分组
+        :param max_prefix_chars: JSON开始前允许的最大说明文字长度
+        :param max_chars: 整个回复允许的最大长度
+        :param max_depth: 允许的最大嵌套层数（顶层对象 + 分组对象）
+        """
+        self.expected_groups = set(expected_groups or METRIC_GROUPS)
+        self.max_prefix_chars = max_prefix_chars
+        self.max_chars = max_chars
+        self.max_depth = max_depth
+
+        self.buffer = ''
+        self.position = 0
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.string_start = None
+        self.last_key = None
+        self.object_start = None
+        self.end = None
+        self.group_start = None
+        self.group_name = None
+        self.groups = {}
+        self.complete = False
+
+    def feed(self, chunk):
+        """
+        追加一段流式内容
+        :param chunk: 新收到的文本
+        :return: 本次新闭合的分组列表 [(分组名称, 指标字典)]
+        :raises OffSchemaError: 输出明显偏离预期结构时
+        """
+        if not chunk or self.complete:
+            return []
+        self.buffer += chunk
+        if len(self.buffer) > self.max_chars:
+            raise OffSchemaError(f"回复超过 {self.max_chars} 字符仍未结束")
+
+        closed = []
+        while self.position < len(self.buffer) and not self.complete:
+            char = self.buffer[self.position]
+            index = self.position
+            self.position += 1
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == '\\':
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+                    # 顶层对象中的字符串作为下一个分组的键
+                    if self.depth == 1:
+                        self.last_key = json.loads(self.buffer[self.string_start:index + 1])
+                continue
+
+            if self.depth == 0:
+                if char == '{':
+                    self.depth = 1
+                    self.object_start = index
+                elif index + 1 > self.max_prefix_chars:
+                    raise OffSchemaError("回复开头没有JSON对象")
+                continue
+
+            if char == '"':
+                self.in_string = True
+                self.string_start = index
+            elif char == '{':
+                self.depth += 1
+                if self.depth > self.max_depth:
+                    raise OffSchemaError("JSON嵌套层数超出预期")
+                if self.last_key not in self.expected_groups:
+                    raise OffSchemaError(f"出现未知的指标分组: {self.last_key}")
+                self.group_start = index
+                self.group_name = self.last_key
+            elif char == '}':
+                self.depth -= 1
+                if self.depth == 1:
+                    try:
+                        group = json.loads(self.buffer[self.group_start:index + 1])
+                    except json.JSONDecodeError:
+                        raise OffSchemaError(f"指标分组不是有效的JSON: {self.group_name}")
+                    self.groups[self.group_name] = group
+                    closed.append((self.group_name, group))
+                elif self.depth == 0:
+                    self.complete = True
+                    self.end = index + 1
+            elif char == '[' and self.depth >= 1:
+                raise OffSchemaError("指标JSON中不应出现数组")
+
+        return closed
+
+    def document(self):
+        """返回完整的JSON对象文本，尚未闭合时返回None"""
+        if not self.complete:
+            return None
+        return self.buffer[self.object_start:self.end]
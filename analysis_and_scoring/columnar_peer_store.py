@@ -0,0 +1,159 @@
+import os
+import json
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+
+from unit_parser import parse_unit_series, is_unit_column
+
+# 同花顺财务摘要中以百分比字符串保存的指标（按单位解析，12.5% → 12.5）
+PERCENTAGE_COLUMNS = ['净利润同比增长率', '营业总收入同比增长率', '销售净利率', '销售毛利率', '净资产收益率', '资产负债率']
+# 直接保存为数值的指标
+NUMERIC_COLUMNS = ['流动比率', '速动比率', '存货周转天数', '应收账款周转天数']
+# 始终按文本保存的标识列（股票代码需要保留前导零）
+TEXT_COLUMNS = ['股票代码', '报告期']
+
+# 列式副本所在目录的后缀：v0001.csv → v0001.columns/
+COLUMNS_SUFFIX = '.columns'
+# 行业快照目录中的版本清单（见 data_get_result/peer_snapshot_store.py）
+SNAPSHOT_MANIFEST = 'manifest.json'
+# 3: 无穷值（如 'inf'）在转换时记为NaN，旧版本的副本需要重新生成
+FORMAT_VERSION = 3
+
+
+def normalize_peer_frame(df):
+    """
+    把同行业数据（全部为字符串）转换为带类型的数据表：指标列为float64，标识列为字符串，
+    其他列（如以 亿/万 为单位的净利润、营业总收入）能完整解析为数值时保存为float64，否则保持字符串；
+    无穷值与无法解析的值一样记为NaN
+    """
+    normalized = pd.DataFrame(index=range(len(df)))
+    for col in df.columns:
+        values = df[col].reset_index(drop=True)
+        if col in TEXT_COLUMNS:
+            normalized[col] = values.fillna('').astype(str)
+        elif col in PERCENTAGE_COLUMNS or col in NUMERIC_COLUMNS or is_unit_column(values):
+            parsed = parse_unit_series(values)
+            normalized[col] = np.where(np.isinf(parsed), np.nan, parsed)
+        else:
+            normalized[col] = values.fillna('').astype(str)
+    return normalized
+
+
+def read_peer_csv(csv_path):
+    """读取同行业数据CSV并转换类型"""
+    return normalize_peer_frame(pd.read_csv(csv_path, encoding='utf-8-sig', dtype={'股票代码': str}))
+
+
+# 同行业数据的列式存储：每列一个 .npy 文件，读取时内存映射，不再解析字符串
+# 只为快照库管理的CSV生成副本（随快照版本一起清理），其他CSV每次直接解析，不在其旁边写入文件
+class ColumnarPeerStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def columns_dir(csv_path):
+        """CSV快照对应的列式副本目录"""
+        return os.path.splitext(csv_path)[0] + COLUMNS_SUFFIX
+
+    @staticmethod
+    def is_managed_snapshot(csv_path):
+        """CSV是否为快照库中登记的快照版本（同目录的版本清单中列出了该文件）"""
+        manifest_path = os.path.join(os.path.dirname(os.path.abspath(csv_path)), SNAPSHOT_MANIFEST)
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                versions = json.load(f)['versions']
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+        filename = os.path.basename(csv_path)
+        return any(isinstance(v, dict) and v.get('file') == filename for v in versions)
+
+    @staticmethod
+    def _source_signature(csv_path):
+        stat = os.stat(csv_path)
+        return {'source_size': stat.st_size, 'source_mtime_ns': stat.st_mtime_ns}
+
+    def _read_meta(self, columns_dir):
+        try:
+            with open(os.path.join(columns_dir, 'meta.json'), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def is_current(self, csv_path):
+        """列式副本存在且与CSV一致"""
+        meta = self._read_meta(self.columns_dir(csv_path))
+        if not meta or meta.get('format_version') != FORMAT_VERSION:
+            return False
+        return all(meta.get(key) == value for key, value in self._source_signature(csv_path).items())
+
+    def ingest(self, csv_path):
+        """
+        读取CSV、转换类型，是快照库管理的快照时写出列式副本；目录不可写时只返回转换结果
+        :return: 转换后的数据表
+        """
+        df = read_peer_csv(csv_path)
+        if not self.is_managed_snapshot(csv_path):
+            return df
+        try:
+            self._write_columns(csv_path, df)
+        except OSError as e:
+            print(f"保存列式副本失败，直接使用CSV: {e}")
+        return df
+
+    def _write_columns(self, csv_path, df):
+        """写出列式副本（先写临时目录再重命名，并发写入时保留先完成的一份）"""
+        columns_dir = self.columns_dir(csv_path)
+        tmp_dir = f"{columns_dir}.{threading.get_ident()}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        columns = []
+        for index, col in enumerate(df.columns):
+            values = df[col].to_numpy()
+            if values.dtype == object:
+                values = values.astype(str)
+            filename = f"{index:03d}.npy"
+            np.save(os.path.join(tmp_dir, filename), values, allow_pickle=False)
+            columns.append({'name': col, 'file': filename, 'dtype': values.dtype.str})
+
+        meta = {'format_version': FORMAT_VERSION, 'rows': len(df), 'columns': columns}
+        meta.update(self._source_signature(csv_path))
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+
+        with self._lock:
+            if os.path.exists(columns_dir):
+                if self.is_current(csv_path):
+                    shutil.rmtree(tmp_dir, ignore_errors=True)
+                    return
+                shutil.rmtree(columns_dir, ignore_errors=True)
+            try:
+                os.rename(tmp_dir, columns_dir)
+            except OSError:
+                # 其他进程已写入
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def load_columns(self, csv_path):
+        """以内存映射方式读取列式副本，不存在或已过期时返回None"""
+        if not self.is_current(csv_path):
+            return None
+        columns_dir = self.columns_dir(csv_path)
+        meta = self._read_meta(columns_dir)
+        try:
+            return pd.DataFrame({
+                column['name']: np.load(os.path.join(columns_dir, column['file']), mmap_mode='r', allow_pickle=False)
+                for column in meta['columns']
+            })
+        except (OSError, ValueError) as e:
+            print(f"读取列式副本失败，将重新解析CSV: {e}")
+            return None
+
+    def load(self, csv_path):
+        """读取带类型的同行业数据，快照首次读取时从CSV转换并保存列式副本"""
+        df = self.load_columns(csv_path)
+        if df is not None:
+            return df
+        return self.ingest(csv_path)
@@ -4,9 +4,16 @@ import json
 from pathlib import Path
 from datetime import datetime
 
+from percentile_index import (
+    IndustryPercentileIndex, REVERSE_METRICS, DEFAULT_SCORE, LOWEST_SCORE, percentile_to_score
+)
+from columnar_peer_store import ColumnarPeerStore
+
 # 分析得到的财务指标并输出markdown格式的报告
 class FinancialComparisonAnalyzer:
-    def __init__(self):
+    def __init__(self, peer_store=None):
+        # 同行业数据的列式存储
+        self.peer_store = peer_store or ColumnarPeerStore()
         # 指标权重配置
         self.weights = {
             '销售毛利率': 0.12,
@@ -20,48 +27,56 @@ class FinancialComparisonAnalyzer:
             '存货周转天数': 0.05,
             '应收账款周转天数': 0.05
         }
+        
+        # 指标分类及各维度权重
+        self.categories = {
+            '盈利能力': ['销售毛利率', '销售净利率', '净资产收益率'],
+            '成长性': ['营业总收入同比增长率', '净利润同比增长率'],
+            '偿债能力': ['资产负债率', '流动比率', '速动比率'],
+            '营运能力': ['存货周转天数', '应收账款周转天数']
+        }
+        self.category_weights = {
+            '盈利能力': 0.4,
+            '成长性': 0.3,
+            '偿债能力': 0.2,
+            '营运能力': 0.1
+        }
     
     def load_target_company_data(self, json_file_path):
         """加载待分析公司的财务数据"""
         with open(json_file_path, 'r', encoding='utf-8') as f:
             data = json.load(f)
         
+        def to_float(value):
+            # 本地和模型都未能计算的指标为null，记为NaN（评分时为最低档）
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                return np.nan
+        
         # 提取关键指标
         target_metrics = {
-            '销售毛利率': float(data['盈利能力指标']['销售毛利率']),
-            '销售净利率': float(data['盈利能力指标']['销售净利率']),
-            '净资产收益率': float(data['盈利能力指标']['净资产收益率']),
-            '营业总收入同比增长率': float(data['成长性指标']['营业总收入同比增长率']),
-            '净利润同比增长率': float(data['成长性指标']['净利润同比增长率']),
-            '资产负债率': float(data['偿债能力指标']['资产负债率']),
-            '流动比率': float(data['偿债能力指标']['流动比率']),
-            '速动比率': float(data['偿债能力指标']['速动比率']),
-            '存货周转天数': float(data['营运能力指标']['存货周转天数']),
-            '应收账款周转天数': float(data['营运能力指标']['应收账款周转天数'])
+            '销售毛利率': to_float(data['盈利能力指标'].get('销售毛利率')),
+            '销售净利率': to_float(data['盈利能力指标'].get('销售净利率')),
+            '净资产收益率': to_float(data['盈利能力指标'].get('净资产收益率')),
+            '营业总收入同比增长率': to_float(data['成长性指标'].get('营业总收入同比增长率')),
+            '净利润同比增长率': to_float(data['成长性指标'].get('净利润同比增长率')),
+            '资产负债率': to_float(data['偿债能力指标'].get('资产负债率')),
+            '流动比率': to_float(data['偿债能力指标'].get('流动比率')),
+            '速动比率': to_float(data['偿债能力指标'].get('速动比率')),
+            '存货周转天数': to_float(data['营运能力指标'].get('存货周转天数')),
+            '应收账款周转天数': to_float(data['营运能力指标'].get('应收账款周转天数'))
         }
         
         return target_metrics
     
     def load_industry_data(self, csv_file_path):
-        """加载同行业公司数据"""
-        df = pd.read_csv(csv_file_path, encoding='utf-8')
+        """加载同行业公司数据（读取已转换类型的列式副本，首次读取时从CSV转换）"""
+        df = self.peer_store.load(csv_file_path)
         
         # 清理数据，移除包含异常值的行
         df = df.replace([np.inf, -np.inf], np.nan)
         
-        # 处理百分比字符串和其他数据类型问题
-        percentage_cols = ['净利润同比增长率', '营业总收入同比增长率', '销售净利率', '销售毛利率', '净资产收益率', '资产负债率']
-        for col in percentage_cols:
-            if col in df.columns:
-                df[col] = df[col].astype(str).str.replace('%', '').replace('False', np.nan)
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-        
-        # 处理数值列
-        numeric_cols = ['流动比率', '速动比率', '存货周转天数', '应收账款周转天数']
-        for col in numeric_cols:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-        
         # 移除包含NaN的行
         required_cols = ['销售毛利率', '销售净利率', '净资产收益率', '营业总收入同比增长率', 
                         '净利润同比增长率', '资产负债率', '流动比率', '速动比率', 
@@ -71,6 +86,16 @@ class FinancialComparisonAnalyzer:
         
         return df_clean
     
+    @staticmethod
+    def format_target_value(value):
+        """报告中显示的目标公司指标值，缺失时显示为 数据缺失"""
+        try:
+            if not np.isfinite(float(value)):
+                return '数据缺失'
+        except (TypeError, ValueError):
+            return '数据缺失'
+        return value
+    
     def calculate_percentile_score(self, target_value, industry_values, metric_name):
         """计算单个指标的百分位排名得分"""
         # 移除异常值并确保数据类型一致
@@ -78,12 +103,12 @@ class FinancialComparisonAnalyzer:
         target_value = float(target_value)
         
         if len(industry_values) == 0:
-            return 60  # 默认中等分数
+            return DEFAULT_SCORE  # 默认中等分数
+        if not np.isfinite(target_value):
+            return LOWEST_SCORE  # 缺失的目标值记为最低档
         
         # 对于负向指标（越小越好），需要反向计算
-        reverse_metrics = ['资产负债率', '存货周转天数', '应收账款周转天数']
-        
-        if metric_name in reverse_metrics:
+        if metric_name in REVERSE_METRICS:
             # 对于负向指标，值越小排名越高
             percentile = (industry_values > target_value).sum() / len(industry_values) * 100
         else:
@@ -91,44 +116,87 @@ class FinancialComparisonAnalyzer:
             percentile = (industry_values < target_value).sum() / len(industry_values) * 100
         
         # 根据百分位排名分配分数
-        if percentile >= 90:
-            return 100
-        elif percentile >= 70:
-            return 80
-        elif percentile >= 40:
-            return 60
-        elif percentile >= 20:
-            return 40
+        return percentile_to_score(percentile)
+    
+    def build_percentile_index(self, industry_df):
+        """为同行业数据建立百分位索引，可复用于多个目标公司的评分"""
+        return IndustryPercentileIndex(industry_df, self.weights.keys())
+    
+    def rate_total_score(self, total_score):
+        """根据综合评分给出评级"""
+        if total_score >= 90:
+            return "优秀（行业标杆）"
+        elif total_score >= 80:
+            return "良好（优于多数同行）"
+        elif total_score >= 70:
+            return "中等（行业平均水平）"
+        elif total_score >= 60:
+            return "一般（存在短板）"
         else:
-            return 20
+            return "较差（需警惕风险）"
     
-    def generate_comparison_report(self, target_metrics, industry_df, company_name, industry_name, year):
-        """生成对比分析报告"""
-        # 计算各指标得分
-        scores = {}
-        weighted_scores = {}
+    def generate_league_table(self, industry_df, percentile_index=None):
+        """
+        对同行业全部公司一次性评分排名（向量化），返回按综合评分降序排列的行业排名表，
+        包含各指标得分、四个维度得分、综合评分、评级和行业排名
+        """
+        if percentile_index is None:
+            percentile_index = self.build_percentile_index(industry_df)
+        
+        metrics = [m for m in self.weights if m in percentile_index]
+        values = industry_df[metrics].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+        
+        # n×m 得分矩阵，缺失值与 score_target 一致：行业无有效数据时为默认分，否则为最低档
+        score_matrix = np.column_stack([
+            np.where(
+                np.isfinite(values[:, j]),
+                percentile_index.score_array(metric, values[:, j]),
+                percentile_index.score(metric, np.nan),
+            )
+            for j, metric in enumerate(metrics)
+        ]) if metrics else np.empty((len(industry_df), 0))
         
-        for metric, target_value in target_metrics.items():
-            if metric in industry_df.columns:
-                industry_values = industry_df[metric]
-                score = self.calculate_percentile_score(target_value, industry_values, metric)
-                scores[metric] = score
-                weighted_scores[metric] = score * self.weights[metric]
+        weight_vector = np.array([self.weights[m] for m in metrics])
+        # m×k 维度矩阵：指标属于该维度时取其权重
+        category_names = list(self.categories)
+        category_matrix = np.array([
+            [self.weights[m] if m in self.categories[c] else 0.0 for c in category_names]
+            for m in metrics
+        ]).reshape(len(metrics), len(category_names))
+        category_divisors = np.array([self.category_weights[c] for c in category_names])
+        
+        total_scores = score_matrix @ weight_vector
+        category_scores = (score_matrix @ category_matrix) / category_divisors
+        
+        league_df = pd.DataFrame(index=industry_df.index)
+        for column in ['股票代码', '报告期']:
+            if column in industry_df.columns:
+                league_df[column] = industry_df[column]
+        for j, metric in enumerate(metrics):
+            league_df[f'{metric}得分'] = score_matrix[:, j]
+        for k, category in enumerate(category_names):
+            league_df[f'{category}得分'] = np.round(category_scores[:, k], 1)
+        league_df['综合评分'] = np.round(total_scores, 1)
+        league_df['评级'] = [self.rate_total_score(score) for score in total_scores]
+        league_df['行业排名'] = league_df['综合评分'].rank(ascending=False, method='min').astype(int)
+        
+        return league_df.sort_values('行业排名', kind='stable').reset_index(drop=True)
+    
+    def generate_comparison_report(self, target_metrics, industry_df, company_name, industry_name, year,
+                                   percentile_index=None):
+        """生成对比分析报告，percentile_index 可传入预先建立的行业百分位索引"""
+        if percentile_index is None:
+            percentile_index = self.build_percentile_index(industry_df)
+        
+        # 计算各指标得分
+        scores = percentile_index.score_all(target_metrics)
+        weighted_scores = {metric: score * self.weights[metric] for metric, score in scores.items()}
         
         # 计算总分
         total_score = sum(weighted_scores.values())
         
         # 评级
-        if total_score >= 90:
-            rating = "优秀（行业标杆）"
-        elif total_score >= 80:
-            rating = "良好（优于多数同行）"
-        elif total_score >= 70:
-            rating = "中等（行业平均水平）"
-        elif total_score >= 60:
-            rating = "一般（存在短板）"
-        else:
-            rating = "较差（需警惕风险）"
+        rating = self.rate_total_score(total_score)
         
         # 生成markdown报告内容
         timestamp = datetime.now().strftime("%Y年%m月%d日 %H:%M:%S")
@@ -153,27 +221,22 @@ class FinancialComparisonAnalyzer:
 """
         
         # 按类别组织指标
-        categories = {
-            '盈利能力': ['销售毛利率', '销售净利率', '净资产收益率'],
-            '成长性': ['营业总收入同比增长率', '净利润同比增长率'],
-            '偿债能力': ['资产负债率', '流动比率', '速动比率'],
-            '营运能力': ['存货周转天数', '应收账款周转天数']
-        }
+        categories = self.categories
         
         for category, metrics in categories.items():
             for metric in metrics:
                 if metric in target_metrics:
-                    target_value = target_metrics[metric]
+                    target_value = self.format_target_value(target_metrics[metric])
                     score = scores.get(metric, 0)
                     weight = self.weights[metric] * 100
                     weighted_score = weighted_scores.get(metric, 0)
                     markdown_content += f"| {category} | {metric} | {target_value} | {score}分 | {weight}% | {weighted_score:.2f}分 |\n"
         
         # 计算各维度得分
-        profitability_score = sum(weighted_scores.get(m, 0) for m in categories['盈利能力']) / 0.4
-        growth_score = sum(weighted_scores.get(m, 0) for m in categories['成长性']) / 0.3
-        solvency_score = sum(weighted_scores.get(m, 0) for m in categories['偿债能力']) / 0.2
-        operation_score = sum(weighted_scores.get(m, 0) for m in categories['营运能力']) / 0.1
+        profitability_score = sum(weighted_scores.get(m, 0) for m in categories['盈利能力']) / self.category_weights['盈利能力']
+        growth_score = sum(weighted_scores.get(m, 0) for m in categories['成长性']) / self.category_weights['成长性']
+        solvency_score = sum(weighted_scores.get(m, 0) for m in categories['偿债能力']) / self.category_weights['偿债能力']
+        operation_score = sum(weighted_scores.get(m, 0) for m in categories['营运能力']) / self.category_weights['营运能力']
         
         markdown_content += f"""
 
@@ -226,7 +289,116 @@ class FinancialComparisonAnalyzer:
         
         return markdown_content
 
+    def score_target(self, target_metrics, industry_df, percentile_index=None):
+        """
+        对目标公司评分，返回各指标得分、四个维度得分、综合评分和评级
+        :return: {'scores', 'category_scores', 'total_score', 'rating', 'sample_size'}
+        """
+        if percentile_index is None:
+            percentile_index = self.build_percentile_index(industry_df)
+        
+        scores = percentile_index.score_all(target_metrics)
+        weighted_scores = {metric: score * self.weights[metric] for metric, score in scores.items()}
+        total_score = sum(weighted_scores.values())
+        category_scores = {
+            category: sum(weighted_scores.get(m, 0) for m in metrics) / self.category_weights[category]
+            for category, metrics in self.categories.items()
+        }
+        return {
+            'scores': scores,
+            'category_scores': category_scores,
+            'total_score': total_score,
+            'rating': self.rate_total_score(total_score),
+            'sample_size': len(industry_df),
+        }
+    
+    def generate_trend_report(self, target_metrics, industry_data_by_year, company_name, industry_name):
+        """
+        生成多年份趋势报告：目标公司与每一年的同行业分布分别对比
+        :param target_metrics: 目标公司指标，可以是单组指标（与每一年对比），也可以是 {年份: 指标}
+        :param industry_data_by_year: {年份: 同行业数据}
+        """
+        years = sorted(industry_data_by_year)
+        if target_metrics and all(isinstance(value, dict) for value in target_metrics.values()):
+            metrics_by_year = target_metrics
+        else:
+            metrics_by_year = {year: target_metrics for year in years}
+        
+        results = {}
+        medians = {}
+        for year in years:
+            if year not in metrics_by_year:
+                continue
+            industry_df = industry_data_by_year[year]
+            results[year] = self.score_target(metrics_by_year[year], industry_df)
+            medians[year] = {
+                metric: pd.to_numeric(industry_df[metric], errors='coerce').median()
+                for metric in self.weights if metric in industry_df.columns
+            }
+        
+        timestamp = datetime.now().strftime("%Y年%m月%d日 %H:%M:%S")
+        scored_years = list(results)
+        year_range = f"{scored_years[0]}-{scored_years[-1]}" if scored_years else "无"
+        
+        markdown_content = f"""# {company_name} 财务指标趋势报告
+
+**分析对象**: {company_name}
+**对比行业**: {industry_name}
+**分析年份**: {year_range}年
+**生成时间**: {timestamp}
+
+## 📈 综合评分趋势
+
+| 年份 | 对比样本 | 综合评分 | 评级 | 盈利能力 | 成长性 | 偿债能力 | 营运能力 |
+|-----|---------|---------|-----|---------|-------|---------|---------|
+"""
+        for year, result in results.items():
+            category_scores = result['category_scores']
+            markdown_content += (
+                f"| {year} | {result['sample_size']}家 | {result['total_score']:.1f}分 | {result['rating']} | "
+                + " | ".join(f"{category_scores[c]:.1f}分" for c in self.categories)
+                + " |\n"
+            )
+        
+        markdown_content += "\n## 🎯 分指标趋势\n"
+        for category, metrics in self.categories.items():
+            markdown_content += f"\n### {category}\n\n| 指标 | 年份 | 公司数值 | 行业中位数 | 行业排名得分 |\n|-----|-----|---------|-----------|-------------|\n"
+            for metric in metrics:
+                for year, result in results.items():
+                    if metric not in metrics_by_year[year]:
+                        continue
+                    median = medians[year].get(metric)
+                    median_text = '-' if median is None or pd.isna(median) else f"{median:.2f}"
+                    score = result['scores'].get(metric, 0)
+                    markdown_content += f"| {metric} | {year} | {self.format_target_value(metrics_by_year[year][metric])} | {median_text} | {score}分 |\n"
+        
+        if len(results) > 1:
+            first, last = results[scored_years[0]], results[scored_years[-1]]
+            change = last['total_score'] - first['total_score']
+            direction = '上升' if change > 0 else '下降' if change < 0 else '持平'
+            best_year = max(results, key=lambda y: results[y]['total_score'])
+            worst_year = min(results, key=lambda y: results[y]['total_score'])
+            markdown_content += f"""
+## 💡 趋势小结
+
+- **评分变化**: {scored_years[0]}年 {first['total_score']:.1f}分 → {scored_years[-1]}年 {last['total_score']:.1f}分（{direction} {abs(change):.1f}分）
+- **相对最好年份**: {best_year}年（{results[best_year]['total_score']:.1f}分）
+- **相对最弱年份**: {worst_year}年（{results[worst_year]['total_score']:.1f}分）
+"""
+        
+        markdown_content += f"""
+---
+*本报告基于同行业公司{year_range}年的财务数据逐年进行对比分析，评分规则与单年报告相同，仅供参考。*
+"""
+        return markdown_content
+
 if __name__ == "__main__":
     # 简化的测试代码
+    import sys
     analyzer = FinancialComparisonAnalyzer()
-    print("FinancialComparisonAnalyzer 初始化完成")
\ No newline at end of file
+    print("FinancialComparisonAnalyzer 初始化完成")
+    
+    # 传入同行业数据CSV时输出行业排名表
+    if len(sys.argv) > 1:
+        league_df = analyzer.generate_league_table(analyzer.load_industry_data(sys.argv[1]))
+        print(league_df.to_string(index=False))
\ No newline at end of file
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+
+# 负向指标（越小越好）
+REVERSE_METRICS = ['资产负债率', '存货周转天数', '应收账款周转天数']
+
+# 百分位排名到得分的分档：(百分位下限, 得分)，从高到低
+SCORE_BANDS = [(90, 100), (70, 80), (40, 60), (20, 40)]
+LOWEST_SCORE = 20
+# 行业没有有效数据时的默认得分
+DEFAULT_SCORE = 60
+
+
+def percentile_to_score(percentile):
+    """根据百分位排名分配分数"""
+    for lower_bound, score in SCORE_BANDS:
+        if percentile >= lower_bound:
+            return score
+    return LOWEST_SCORE
+
+
+# 行业百分位索引：每个指标预先排好序的数组，排名通过二分查找完成，可复用于任意多个目标公司
+class IndustryPercentileIndex:
+    def __init__(self, industry_df, metrics):
+        """
+        :param industry_df: 同行业公司数据
+        :param metrics: 需要建立索引的指标列表，行业数据中不存在的列会被跳过
+        """
+        self.sorted_values = {}
+        for metric in metrics:
+            if metric in industry_df.columns:
+                values = pd.to_numeric(industry_df[metric], errors='coerce').to_numpy(dtype=float)
+                self.sorted_values[metric] = np.sort(values[np.isfinite(values)])
+
+    def __contains__(self, metric):
+        return metric in self.sorted_values
+
+    def percentile(self, metric, target_value):
+        """
+        计算目标值在行业中的百分位排名（0-100），正向指标统计小于目标值的公司占比，负向指标统计大于目标值的公司占比
+        :return: 百分位，行业无有效数据时返回None，目标值缺失或非有限值时返回NaN
+        """
+        industry_values = self.sorted_values[metric]
+        count = len(industry_values)
+        if count == 0:
+            return None
+
+        target_value = float(target_value)
+        # searchsorted 会把NaN排在所有值之后，缺失的目标值不能参与排名
+        if not np.isfinite(target_value):
+            return np.nan
+        if metric in REVERSE_METRICS:
+            better_than = count - np.searchsorted(industry_values, target_value, side='right')
+        else:
+            better_than = np.searchsorted(industry_values, target_value, side='left')
+        return better_than / count * 100
+
+    def score(self, metric, target_value):
+        """计算单个指标的百分位排名得分，目标值缺失时为最低档"""
+        percentile = self.percentile(metric, target_value)
+        if percentile is None:
+            return DEFAULT_SCORE
+        if np.isnan(percentile):
+            return LOWEST_SCORE
+        return percentile_to_score(percentile)
+
+    def score_array(self, metric, target_values):
+        """
+        向量化计算一组目标值的得分（用于整表评分），缺失值和非有限值得分为NaN
+        :param target_values: 一维浮点数组
+        """
+        industry_values = self.sorted_values[metric]
+        target_values = np.asarray(target_values, dtype=float)
+        missing = ~np.isfinite(target_values)
+        count = len(industry_values)
+        if count == 0:
+            return np.where(missing, np.nan, float(DEFAULT_SCORE))
+
+        if metric in REVERSE_METRICS:
+            better_than = count - np.searchsorted(industry_values, target_values, side='right')
+        else:
+            better_than = np.searchsorted(industry_values, target_values, side='left')
+        percentiles = better_than / count * 100
+
+        conditions = [percentiles >= lower_bound for lower_bound, _ in SCORE_BANDS]
+        scores = np.select(conditions, [score for _, score in SCORE_BANDS], default=LOWEST_SCORE)
+        return np.where(missing, np.nan, scores.astype(float))
+
+    def score_all(self, target_metrics):
+        """对目标公司的全部指标评分，返回 {指标: 得分}，只包含索引中存在的指标"""
+        return {
+            metric: self.score(metric, value)
+            for metric, value in target_metrics.items()
+            if metric in self.sorted_values
+        }
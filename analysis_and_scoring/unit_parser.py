@@ -0,0 +1,130 @@
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+# 同花顺财务摘要中的数量单位，百分比保留为百分数（12.5% → 12.5）
+UNIT_MULTIPLIERS = {'万亿': 1e12, '亿': 1e8, '万': 1e4, '%': 1.0}
+# 数据源中表示缺失的取值
+MISSING_MARKERS = ['', 'False', 'false', 'None', 'nan', 'NaN', '--', '-']
+
+VALUE_PATTERN = r'^([+-]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?)(万亿|亿|万|%)?$'
+_VALUE_REGEX = re.compile(VALUE_PATTERN)
+
+
+def parse_unit_value(text):
+    """
+    逐个解析带中文单位的数值字符串（如 '1.23亿'、'-12.3%'），无法解析时返回NaN
+    先做NFKC规范化，全角数字、符号（'１２'、'％'、'，'）按半角解析
+    用于单个取值；整列数据请使用 parse_unit_series
+    """
+    if text is None or isinstance(text, bool):
+        return np.nan
+    if isinstance(text, (int, float, np.number)):
+        return float(text)
+    match = _VALUE_REGEX.match(unicodedata.normalize('NFKC', str(text)).strip().replace(',', ''))
+    if not match:
+        return np.nan
+    value = float(match.group(1)) * UNIT_MULTIPLIERS.get(match.group(2), 1.0)
+    return value if np.isfinite(value) else np.nan
+
+
+def _parse_with_regex(series):
+    """numpy 1.x 没有字符串ufunc时使用的解析方式"""
+    text = series.astype(str).str.normalize('NFKC').str.strip().str.replace(',', '', regex=False)
+    parts = text.str.extract(VALUE_PATTERN)
+    numbers = pd.to_numeric(parts[0], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    multipliers = parts[1].map(UNIT_MULTIPLIERS).fillna(1.0).to_numpy(dtype=float)
+    numbers = numbers * multipliers
+    numbers[~np.isfinite(numbers)] = np.nan
+    return numbers
+
+
+def parse_unit_series(values):
+    """
+    向量化解析一整列带中文单位的数值字符串，支持 万亿/亿/万/% 单位、正负号、千分位逗号，
+    False、--、空字符串等缺失标记及无法解析的取值记为NaN；结果与逐个调用 parse_unit_value 一致
+    :param values: Series、数组或列表
+    :return: float64 数组
+    """
+    series = pd.Series(values, copy=False)
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return series.to_numpy(dtype=float, na_value=np.nan)
+    if len(series) == 0:
+        return np.empty(0, dtype=float)
+    if not hasattr(np, 'strings'):
+        return _parse_with_regex(series)
+
+    # 转为定长字符串数组，每个字符串视为一行Unicode码点，按列（字符位置）存放以便逐列运算
+    text = np.strings.strip(np.asarray(series.to_numpy(dtype=object), dtype=str))
+    count = len(text)
+    width = text.dtype.itemsize // 4
+    if width == 0:
+        return np.full(count, np.nan)
+    codes = np.ascontiguousarray(text).view(np.uint32).reshape(count, width).T.copy()
+    lengths = np.strings.str_len(text)
+    rows = np.arange(count)
+
+    # 识别末尾的单位（'万亿' 排在 '亿' 之前，已匹配的取值不再重复匹配）并把单位字符清零
+    multipliers = np.ones(count)
+    unit_lengths = np.zeros(count, dtype=np.int64)
+    for unit, multiplier in UNIT_MULTIPLIERS.items():
+        mask = (lengths >= len(unit)) & (unit_lengths == 0)
+        for offset, char in enumerate(unit):
+            position = np.maximum(lengths - len(unit) + offset, 0)
+            mask &= codes[position, rows] == ord(char)
+        multipliers[mask] = multiplier
+        unit_lengths[mask] = len(unit)
+    codes[np.arange(width)[:, None] >= (lengths - unit_lengths)] = 0
+
+    # 逐列累加数字得到整数尾数（Horner法），再除以10的小数位数次方；
+    # 15位有效数字以内时结果与逐个解析完全一致
+    digits = codes - np.uint32(48)
+    is_digit = digits < 10
+    is_dot = codes == 46
+    allowed = is_digit | is_dot | (codes == 44) | (codes == 0)
+    negative = codes[0] == 45
+
+    mantissa = np.zeros(count, dtype=np.int64)
+    frac_digits = np.zeros(count, dtype=np.int64)
+    seen_dot = np.zeros(count, dtype=bool)
+    for j in range(width):
+        digit = is_digit[j]
+        mantissa = np.where(digit, mantissa * 10 + digits[j], mantissa)
+        frac_digits += digit & seen_dot
+        seen_dot |= is_dot[j]
+
+    digit_count = is_digit.sum(axis=0)
+    # 去掉单位后仍含非ASCII字符（全角数字、全角符号等）的取值需要NFKC规范化，交给逐个解析
+    non_ascii = (codes > 127).any(axis=0)
+    # 正负号只能出现在第一个字符
+    simple = (
+        ~non_ascii
+        & (allowed[0] | negative | (codes[0] == 43))
+        & allowed[1:].all(axis=0)
+        & (is_dot.sum(axis=0) <= 1)
+        & (digit_count > 0)
+        & (digit_count <= 15)
+    )
+    numbers = mantissa.astype(float) / np.power(10.0, frac_digits) * multipliers
+    numbers[negative] *= -1
+
+    # 缺失标记（akshare用False表示缺失，以及 --、None、nan 等）不含数字，直接记为NaN；
+    # 其余不符合简单格式的取值（科学计数法、'1.2%%'、全角字符等）逐个解析
+    numbers[(digit_count == 0) & ~non_ascii] = np.nan
+    irregular = np.flatnonzero(~simple & ((digit_count > 0) | non_ascii))
+    if len(irregular):
+        numbers[irregular] = [parse_unit_value(value) for value in text[irregular]]
+    return numbers
+
+
+def is_unit_column(values):
+    """判断一列字符串是否全部为（带单位的）数值或缺失标记，且至少有一个有效数值"""
+    series = pd.Series(values, copy=False)
+    parsed = parse_unit_series(series)
+    if not np.isfinite(parsed).any():
+        return False
+    text = series.astype(str).str.strip()
+    unparsed = np.isnan(parsed) & series.notna().to_numpy() & ~text.isin(MISSING_MARKERS).to_numpy()
+    return not unparsed.any()
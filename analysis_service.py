@@ -0,0 +1,549 @@
+"""
+本地HTTP分析服务：常驻进程中保持行业分类、行业快照、MinerU输出和模型结果等缓存，
+分析任务进入有界队列，由固定数量的工作线程执行，客户端轮询任务状态和报告
+
+用法:
+    python analysis_service.py --port 8000 --workers 2 --max-queue 16
+
+接口:
+    POST /jobs              提交任务（JSON: industry, year, company, 以及 pdf_base64 或 markdown 二选一）
+    GET  /jobs/<id>         查询任务状态
+    GET  /jobs/<id>/report  获取报告（markdown）
+    GET  /metrics           Prometheus 指标（队列深度、任务数、各阶段耗时）
+    GET  /health            健康检查
+"""
+import os
+import json
+import time
+import uuid
+import queue
+import base64
+import signal
+import shutil
+import argparse
+import binascii
+import threading
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from main_analyzer import (
+    PROJECT_ROOT, IntegratedFinancialAnalyzer, IndustryFinancialAnalyzer, MinerUOutputCache,
+    MinerUWorkerPool, PipelineMetrics, parse_years
+)
+
+JOB_STATUSES = ['queued', 'running', 'succeeded', 'failed']
+
+
+class ServiceError(Exception):
+    """返回给客户端的错误，附带HTTP状态码"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class AnalysisService:
+    def __init__(self, workers=2, max_queue=16, industry_workers=2, output_dir=None, mineru_device="cpu",
+                 mineru_workers=None, mineru_timeout=600, metrics_file=None, max_finished_jobs=1000,
+                 industry_analyzer=None, llm_client=None, llm_streaming=False, mineru_python=None,
+                 llm_bypass_cache=False):
+        """
+        :param workers: 并发执行的分析任务数
+        :param max_queue: 等待队列的容量，队列满时拒绝新任务（HTTP 429）
+        :param industry_workers: 并发获取的行业数据组数
+        :param output_dir: 上传文件和报告的目录，默认为项目目录下的 service_output
+        :param max_finished_jobs: 内存中保留的已结束任务数，超出时删除最早的记录
+        :param industry_analyzer: 行业分析器（可选），默认新建
+        :param llm_client: OpenAI兼容的客户端（可选），默认使用config.py中的DeepSeek密钥创建
+        :param llm_streaming: 是否以流式方式调用模型
+        :param mineru_python: MinerU所在虚拟环境的Python解释器（可选），默认取 MINERU_PYTHON 或 ./myenv
+        :param llm_bypass_cache: 是否忽略已缓存的模型结果，每个任务都调用模型
+        """
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_finished_jobs = max_finished_jobs
+        self.output_dir = output_dir or os.path.join(PROJECT_ROOT, 'service_output')
+        self.upload_dir = os.path.join(self.output_dir, 'uploads')
+        self.report_dir = os.path.join(self.output_dir, 'reports')
+        os.makedirs(self.upload_dir, exist_ok=True)
+        os.makedirs(self.report_dir, exist_ok=True)
+
+        # 所有任务共享的常驻状态：行业分析器（含限流器和本地缓存）、MinerU输出缓存、MinerU进程池和指标记录
+        self.industry_analyzer = industry_analyzer or IndustryFinancialAnalyzer()
+        self.extraction_cache = MinerUOutputCache()
+        self.mineru_pool = MinerUWorkerPool(
+            device=mineru_device,
+            workers=mineru_workers,
+            job_timeout=mineru_timeout,
+            python_executable=mineru_python,
+        )
+        self.metrics = PipelineMetrics(metrics_file)
+        self.llm_client = llm_client
+        self.llm_streaming = llm_streaming
+        self.llm_bypass_cache = llm_bypass_cache
+
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.jobs = {}
+        self.running = 0
+        self.accepting = True
+        self.counters = {status: 0 for status in ['submitted', 'rejected', 'succeeded', 'failed']}
+        self._lock = threading.Lock()
+
+        # 相同 (行业, 年份) 的并发任务共享同一次行业数据获取
+        self.industry_executor = ThreadPoolExecutor(max_workers=industry_workers)
+        self._industry_futures = {}
+
+        self._threads = [
+            threading.Thread(target=self._worker_loop, name=f"analysis-worker-{index}", daemon=True)
+            for index in range(workers)
+        ]
+
+    def start(self):
+        for thread in self._threads:
+            thread.start()
+        print(f"分析服务已启动: {self.workers} 个工作线程，队列容量 {self.max_queue}")
+
+    def _new_analyzer(self):
+        """创建共享行业分析器、提取缓存、MinerU进程池和指标记录的单项分析器"""
+        return IntegratedFinancialAnalyzer(
+            self.industry_analyzer,
+            extraction_cache=self.extraction_cache,
+            mineru_pool=self.mineru_pool,
+            metrics=self.metrics,
+            llm_client=self.llm_client,
+            output_dir=self.report_dir,
+            llm_streaming=self.llm_streaming,
+            llm_bypass_cache=self.llm_bypass_cache,
+        )
+
+    def _save_input(self, job_id, payload):
+        """把上传的PDF或markdown写入任务目录，返回 (pdf路径, markdown路径)"""
+        if payload.get('pdf_base64'):
+            try:
+                content = base64.b64decode(payload['pdf_base64'], validate=True)
+            except (binascii.Error, ValueError):
+                raise ServiceError(400, "pdf_base64 不是有效的base64编码")
+            job_dir = os.path.join(self.upload_dir, job_id)
+            os.makedirs(job_dir, exist_ok=True)
+            filename = Path(payload.get('filename') or 'report.pdf').name
+            pdf_path = os.path.join(job_dir, filename)
+            with open(pdf_path, 'wb') as f:
+                f.write(content)
+            return pdf_path, None
+
+        job_dir = os.path.join(self.upload_dir, job_id)
+        os.makedirs(job_dir, exist_ok=True)
+        filename = Path(payload.get('filename') or 'report.md').name
+        markdown_path = os.path.join(job_dir, filename)
+        with open(markdown_path, 'w', encoding='utf-8') as f:
+            f.write(payload['markdown'])
+        return None, markdown_path
+
+    def submit(self, payload):
+        """
+        校验并提交一个分析任务
+        :return: 任务状态字典
+        :raises ServiceError: 参数错误（400）、队列已满（429）或服务正在停止（503）
+        """
+        if not isinstance(payload, dict):
+            raise ServiceError(400, "请求体必须是JSON对象")
+        industry_name = str(payload.get('industry') or '').strip()
+        if not industry_name:
+            raise ServiceError(400, "缺少 industry")
+        try:
+            years = parse_years(str(payload.get('year', '')))
+        except argparse.ArgumentTypeError as e:
+            raise ServiceError(400, str(e))
+        for field in ('pdf_base64', 'markdown', 'filename', 'company'):
+            if payload.get(field) is not None and not isinstance(payload[field], str):
+                raise ServiceError(400, f"{field} 必须是字符串")
+        if bool(payload.get('pdf_base64')) == bool(payload.get('markdown')):
+            raise ServiceError(400, "pdf_base64 和 markdown 必须且只能提供一个")
+        if not self.accepting:
+            raise ServiceError(503, "服务正在停止，不再接受新任务")
+
+        job_id = uuid.uuid4().hex[:12]
+        pdf_path, markdown_path = self._save_input(job_id, payload)
+        job = {
+            'id': job_id,
+            'status': 'queued',
+            'industry': industry_name,
+            'years': years,
+            'company': payload.get('company') or None,
+            'input': 'pdf' if pdf_path else 'markdown',
+            'pdf_path': pdf_path,
+            'markdown_path': markdown_path,
+            'submitted_at': datetime.now().isoformat(timespec='seconds'),
+            'started_at': None,
+            'finished_at': None,
+            'elapsed_seconds': None,
+            'report': None,
+            'error': None,
+        }
+
+        # 保存输入期间服务可能已开始停止，入队前在锁内再次检查（shutdown 在同一把锁内修改 accepting）
+        with self._lock:
+            if not self.accepting:
+                shutil.rmtree(os.path.join(self.upload_dir, job_id), ignore_errors=True)
+                raise ServiceError(503, "服务正在停止，不再接受新任务")
+            self.jobs[job_id] = job
+            try:
+                self.queue.put_nowait(job_id)
+            except queue.Full:
+                del self.jobs[job_id]
+                self.counters['rejected'] += 1
+                shutil.rmtree(os.path.join(self.upload_dir, job_id), ignore_errors=True)
+                raise ServiceError(429, f"任务队列已满（{self.max_queue}），请稍后重试")
+            self.counters['submitted'] += 1
+            return self._public(job)
+
+    @staticmethod
+    def _public(job):
+        """返回给客户端的任务信息（不包含服务器上的输入文件路径）"""
+        info = {key: value for key, value in job.items() if key not in ('pdf_path', 'markdown_path')}
+        info['report'] = os.path.basename(job['report']) if job['report'] else None
+        return info
+
+    def get_job(self, job_id):
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return self._public(job) if job else None
+
+    def get_report(self, job_id):
+        """
+        读取任务报告内容
+        :raises ServiceError: 任务不存在（404）或尚未成功完成（409）
+        """
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if not job:
+                raise ServiceError(404, f"任务不存在: {job_id}")
+            if job['status'] != 'succeeded':
+                raise ServiceError(409, f"任务状态为 {job['status']}，没有报告")
+            report_path = job['report']
+        with open(report_path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def _fetch_industry(self, industry_name, year):
+        return self._new_analyzer().get_industry_data(industry_name, year)
+
+    def _fetch_industry_range(self, industry_name, years):
+        return self._new_analyzer().get_industry_data_range(industry_name, years)
+
+    @staticmethod
+    def _split_range_result(range_future, year_futures):
+        """多年份获取结束后，把结果分发到各年份的任务，没有数据的年份记为失败"""
+        try:
+            csv_paths = range_future.result()
+        except Exception as e:
+            for future in year_futures.values():
+                future.set_exception(e)
+            return
+        for year, future in year_futures.items():
+            if year in csv_paths:
+                future.set_result(csv_paths[year])
+            else:
+                future.set_exception(Exception(f"{year}年没有行业数据"))
+
+    def _industry_futures_for_years(self, industry_name, years):
+        """
+        返回各年份的行业数据获取任务 {年份: Future}：正在进行的 (行业, 年份) 直接复用，
+        其余年份合并为一次多年份获取（每只股票只请求一次）；已结束的任务重新提交（之后通常直接命中快照）
+        """
+        with self._lock:
+            futures = {}
+            missing_years = []
+            for year in years:
+                future = self._industry_futures.get((industry_name, year))
+                if future is None or future.done():
+                    missing_years.append(year)
+                else:
+                    futures[year] = future
+
+            if len(missing_years) == 1:
+                year = missing_years[0]
+                futures[year] = self.industry_executor.submit(self._fetch_industry, industry_name, year)
+            elif missing_years:
+                year_futures = {year: Future() for year in missing_years}
+                range_future = self.industry_executor.submit(self._fetch_industry_range, industry_name, missing_years)
+                range_future.add_done_callback(lambda done: self._split_range_result(done, year_futures))
+                futures.update(year_futures)
+            for year in missing_years:
+                self._industry_futures[(industry_name, year)] = futures[year]
+            return futures
+
+    def _industry_future(self, industry_name, year):
+        """返回 (行业, 年份) 的行业数据获取任务，正在进行时复用"""
+        return self._industry_futures_for_years(industry_name, [year])[year]
+
+    def _run_job(self, job):
+        analyzer = self._new_analyzer()
+        years = job['years']
+        if len(years) > 1:
+            report_path = analyzer.run_trend_analysis(
+                job['pdf_path'], job['industry'], years, job['company'],
+                markdown_path=job['markdown_path'],
+                industry_data_futures=self._industry_futures_for_years(job['industry'], years)
+            )
+        else:
+            report_path = analyzer.run_complete_analysis(
+                job['pdf_path'], job['industry'], years[0], job['company'],
+                industry_data_future=self._industry_future(job['industry'], years[0]),
+                markdown_path=job['markdown_path']
+            )
+        return report_path, analyzer.last_error
+
+    def _worker_loop(self):
+        while True:
+            job_id = self.queue.get()
+            if job_id is None:
+                self.queue.task_done()
+                break
+
+            # 任务执行完毕后才调用 task_done，停止服务时据此等待（见 _wait_drained）
+            try:
+                self._process_job(job_id)
+            finally:
+                self.queue.task_done()
+
+    def _process_job(self, job_id):
+        with self._lock:
+            job = self.jobs[job_id]
+            job['status'] = 'running'
+            job['started_at'] = datetime.now().isoformat(timespec='seconds')
+            self.running += 1
+        start = time.perf_counter()
+
+        try:
+            report_path, error = self._run_job(job)
+        except Exception as e:
+            report_path, error = None, str(e)
+
+        with self._lock:
+            job['status'] = 'succeeded' if report_path else 'failed'
+            job['report'] = report_path
+            job['error'] = None if report_path else (error or "分析失败")
+            job['finished_at'] = datetime.now().isoformat(timespec='seconds')
+            job['elapsed_seconds'] = round(time.perf_counter() - start, 3)
+            self.counters[job['status']] += 1
+            self.running -= 1
+            self._prune_finished()
+        shutil.rmtree(os.path.join(self.upload_dir, job_id), ignore_errors=True)
+        print(f"任务 {job_id} {job['status']} ({job['elapsed_seconds']:.1f}秒)")
+
+    def _prune_finished(self):
+        """只保留最近 max_finished_jobs 个已结束任务的记录（报告文件保留在磁盘上）"""
+        finished = [job_id for job_id, job in self.jobs.items() if job['status'] in ('succeeded', 'failed')]
+        for job_id in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self.jobs[job_id]
+
+    def health(self):
+        with self._lock:
+            return {
+                'status': 'ok' if self.accepting else 'draining',
+                'workers_alive': sum(thread.is_alive() for thread in self._threads),
+                'queue_depth': self.queue.qsize(),
+                'queue_capacity': self.max_queue,
+                'running': self.running,
+            }
+
+    def render_metrics(self):
+        """以 Prometheus 文本格式返回服务指标和各阶段累计值"""
+        with self._lock:
+            counters = dict(self.counters)
+            running = self.running
+        lines = [
+            "# HELP finance_service_queue_depth 等待执行的任务数",
+            "# TYPE finance_service_queue_depth gauge",
+            f"finance_service_queue_depth {self.queue.qsize()}",
+            "# HELP finance_service_queue_capacity 任务队列容量",
+            "# TYPE finance_service_queue_capacity gauge",
+            f"finance_service_queue_capacity {self.max_queue}",
+            "# HELP finance_service_jobs_running 正在执行的任务数",
+            "# TYPE finance_service_jobs_running gauge",
+            f"finance_service_jobs_running {running}",
+            "# HELP finance_service_workers 工作线程数",
+            "# TYPE finance_service_workers gauge",
+            f"finance_service_workers {self.workers}",
+            "# HELP finance_service_jobs_total 按结果统计的任务数",
+            "# TYPE finance_service_jobs_total counter",
+        ]
+        for status, count in counters.items():
+            lines.append(f'finance_service_jobs_total{{status="{status}"}} {count}')
+        return '\n'.join(lines) + '\n' + self.metrics.render_prometheus()
+
+    def _wait_drained(self, timeout):
+        """
+        等待所有已入队的任务执行完毕（工作线程处理完一个任务后才调用 task_done，
+        已出队但尚未开始执行的任务同样计入）
+        :return: 是否在 timeout 秒内全部完成
+        """
+        deadline = time.monotonic() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.queue.all_tasks_done.wait(remaining)
+        return True
+
+    def shutdown(self, timeout=300):
+        """
+        停止接受新任务，等待已提交的任务执行完毕（最多 timeout 秒），然后停止工作线程和MinerU进程池
+        等待期间仍可查询任务状态和报告
+        """
+        with self._lock:
+            self.accepting = False
+        print(f"分析服务正在停止: 等待 {self.queue.qsize()} 个排队任务和 {self.running} 个运行中任务完成...")
+
+        if not self._wait_drained(timeout):
+            print("等待超时，未完成的任务将被放弃")
+
+        for _ in self._threads:
+            try:
+                self.queue.put_nowait(None)
+            except queue.Full:
+                break
+        self.industry_executor.shutdown(wait=False, cancel_futures=True)
+        self.mineru_pool.close()
+        print("分析服务已停止")
+
+
+class AnalysisRequestHandler(BaseHTTPRequestHandler):
+    server_version = "FinanceAnalysisService/1.0"
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def _send(self, status, body, content_type='application/json; charset=utf-8', headers=None):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body, ensure_ascii=False)
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, status, message):
+        self._send(status, {'error': message})
+
+    def do_POST(self):
+        if self.path.rstrip('/') != '/jobs':
+            self._send_error(404, f"未知路径: {self.path}")
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            self._send_error(400, "Content-Length 不是有效的整数")
+            return
+        if length < 0:
+            self._send_error(400, "Content-Length 不能为负数")
+            return
+        if length > self.server.max_body_bytes:
+            self._send_error(413, f"请求体超过上限 {self.server.max_body_bytes // (1024 * 1024)}MB")
+            return
+        try:
+            payload = json.loads(self.rfile.read(length).decode('utf-8'))
+        except (UnicodeDecodeError, ValueError):
+            self._send_error(400, "请求体不是有效的JSON")
+            return
+
+        try:
+            job = self.service.submit(payload)
+        except ServiceError as e:
+            headers = {'Retry-After': '30'} if e.status in (429, 503) else None
+            self._send(e.status, {'error': str(e)}, headers=headers)
+            return
+        self._send(202, job, headers={'Location': f"/jobs/{job['id']}"})
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0].rstrip('/')
+        if path == '/health':
+            health = self.service.health()
+            self._send(200 if health['status'] == 'ok' else 503, health)
+        elif path == '/metrics':
+            self._send(200, self.service.render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+        elif path.startswith('/jobs/') and path.endswith('/report'):
+            job_id = path[len('/jobs/'):-len('/report')]
+            try:
+                self._send(200, self.service.get_report(job_id), content_type='text/markdown; charset=utf-8')
+            except ServiceError as e:
+                self._send_error(e.status, str(e))
+        elif path.startswith('/jobs/'):
+            job = self.service.get_job(path[len('/jobs/'):])
+            if job:
+                self._send(200, job)
+            else:
+                self._send_error(404, f"任务不存在: {path[len('/jobs/'):]}")
+        else:
+            self._send_error(404, f"未知路径: {self.path}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='本地财务分析HTTP服务')
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址')
+    parser.add_argument('--port', type=int, default=8000, help='监听端口')
+    parser.add_argument('--workers', type=int, default=2, help='并发执行的分析任务数')
+    parser.add_argument('--max-queue', type=int, default=16, help='等待队列容量，队列满时返回429')
+    parser.add_argument('--industry-workers', type=int, default=2, help='并发获取的行业数据组数')
+    parser.add_argument('--output-dir', default=None, help='上传文件和报告的目录，默认为 service_output')
+    parser.add_argument('--max-upload-mb', type=int, default=100, help='单个请求体的大小上限（MB）')
+    parser.add_argument('--device', default='cpu', help='MinerU推理设备（cpu/cuda/cuda:0/npu/mps）')
+    parser.add_argument('--mineru-workers', type=int, default=None, help='MinerU工作进程数，默认按CPU核数和内存估算')
+    parser.add_argument('--mineru-timeout', type=int, default=600, help='单个PDF的提取超时（秒）')
+    parser.add_argument('--mineru-python', default=None,
+                        help='MinerU所在虚拟环境的Python解释器（默认取环境变量 MINERU_PYTHON 或 ./myenv），指定后无法导入MinerU时直接报错')
+    parser.add_argument('--metrics-file', default=None, help='阶段指标JSON Lines文件，默认为 metrics/pipeline_metrics.jsonl')
+    parser.add_argument('--shutdown-timeout', type=int, default=300, help='停止时等待未完成任务的最长时间（秒）')
+    parser.add_argument('--stream', action='store_true', help='以流式方式调用DeepSeek，逐个解析指标分组，输出偏离格式时提前中止')
+    parser.add_argument('--no-llm-cache', action='store_true', help='忽略已缓存的模型分析结果，强制调用DeepSeek（新结果仍会写入缓存）')
+    args = parser.parse_args(argv)
+
+    service = AnalysisService(
+        workers=args.workers,
+        max_queue=args.max_queue,
+        industry_workers=args.industry_workers,
+        output_dir=args.output_dir,
+        mineru_device=args.device,
+        mineru_workers=args.mineru_workers,
+        mineru_timeout=args.mineru_timeout,
+        metrics_file=args.metrics_file,
+        llm_streaming=args.stream,
+        mineru_python=args.mineru_python,
+        llm_bypass_cache=args.no_llm_cache,
+    )
+    server = ThreadingHTTPServer((args.host, args.port), AnalysisRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    server.max_body_bytes = args.max_upload_mb * 1024 * 1024
+
+    def stop(signum, frame):
+        # 先排空任务再关闭HTTP服务，期间客户端仍可查询任务状态
+        print(f"\n收到信号 {signum}，开始停止服务")
+
+        def drain():
+            service.shutdown(args.shutdown_timeout)
+            server.shutdown()
+
+        threading.Thread(target=drain, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    service.start()
+    print(f"监听 http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+单位解析微基准：向量化的 parse_unit_series 与逐行 apply(parse_unit_value) 的耗时对比
+
+用法:
+    python benchmarks/bench_unit_parser.py --rows 10000,100000,1000000 --repeat 3
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(PROJECT_ROOT, 'analysis_and_scoring'))
+
+from unit_parser import parse_unit_series, parse_unit_value
+
+
+def build_values(rows, seed=0):
+    """生成与同花顺财务摘要取值分布相近的字符串列：亿/万/百分比/纯数值，以及少量缺失标记"""
+    rng = random.Random(seed)
+    makers = [
+        lambda: f"{rng.uniform(-5, 90):.2f}亿",
+        lambda: f"{rng.uniform(-9999, 9999):.2f}万",
+        lambda: f"{rng.uniform(-50, 80):.2f}%",
+        lambda: f"{rng.uniform(0, 5):.2f}",
+        lambda: f"{rng.uniform(0.1, 3):.2f}万亿",
+    ]
+    values = []
+    for _ in range(rows):
+        if rng.random() < 0.05:
+            values.append(rng.choice(['False', '--', '']))
+        else:
+            values.append(rng.choice(makers)())
+    return pd.Series(values)
+
+
+def best_of(func, values, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(values)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='单位解析微基准')
+    parser.add_argument('--rows', default='10000,100000,1000000', help='列长度，逗号分隔')
+    parser.add_argument('--repeat', type=int, default=3, help='重复次数（取最快的一次）')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    args = parser.parse_args(argv)
+
+    print(f"{'行数':>10}{'逐行apply(秒)':>16}{'向量化(秒)':>14}{'加速比':>10}")
+    results = []
+    for rows in [int(rows) for rows in args.rows.split(',') if rows.strip()]:
+        values = build_values(rows, args.seed)
+        expected, apply_seconds = best_of(lambda v: v.apply(parse_unit_value).to_numpy(dtype=float), values, args.repeat)
+        actual, vector_seconds = best_of(parse_unit_series, values, args.repeat)
+        if not np.allclose(expected, actual, equal_nan=True):
+            raise AssertionError("向量化解析结果与逐行解析不一致")
+        speedup = apply_seconds / vector_seconds if vector_seconds else float('inf')
+        print(f"{rows:>10}{apply_seconds:>16.4f}{vector_seconds:>14.4f}{speedup:>9.1f}x")
+        results.append({'rows': rows, 'apply_seconds': apply_seconds, 'vectorized_seconds': vector_seconds})
+    return results
+
+
+if __name__ == '__main__':
+    main()
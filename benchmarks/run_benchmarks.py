@@ -0,0 +1,288 @@
+"""
+离线性能基准：用本地替身代替akshare、DeepSeek和MinerU，在不联网的机器上测量各阶段和端到端耗时
+
+用法:
+    python benchmarks/run_benchmarks.py --sizes 10,100,1000,5000 --latency 0.01 --failure-rate 0.02
+"""
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+from pathlib import Path
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+sys.path.append(os.path.join(PROJECT_ROOT, 'PDFdata_to_json'))
+sys.path.append(os.path.join(PROJECT_ROOT, 'data_get_result'))
+sys.path.append(os.path.join(PROJECT_ROOT, 'analysis_and_scoring'))
+
+# 必须在导入项目模块之前注册替身模块，确保基准不依赖真实的akshare/openai/config且不会联网
+from benchmarks.stubs import install_offline_modules
+install_offline_modules()
+
+from industry_financial_analyzer import IndustryFinancialAnalyzer
+from stock_financial_cache import StockFinancialCache
+from concurrent_fetcher import ConcurrentFetcher
+from peer_snapshot_store import PeerSnapshotStore
+from constituent_cache import ConstituentCache
+from financial_comparison_analyzer import FinancialComparisonAnalyzer
+from financial_analyzer import FinancialAnalyzer
+from llm_result_cache import LLMResultCache
+
+from benchmarks.stubs import StubAkshare, StubOpenAIClient, StubPageFilter, STUB_LLM_RESULT
+from benchmarks.synthetic import build_industry_mapping, build_statement_markdown, build_industry_frame
+
+YEAR = 2020
+
+
+@contextlib.contextmanager
+def quiet(enabled=True):
+    """屏蔽被测代码的进度输出"""
+    if not enabled:
+        yield
+        return
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def make_industry_analyzer(stub, mapping_file, work_dir, args):
+    """创建使用替身数据源和独立缓存目录的行业分析器"""
+    analyzer = IndustryFinancialAnalyzer(
+        financial_cache=StockFinancialCache(os.path.join(work_dir, 'stock_financial')),
+        fetcher=ConcurrentFetcher(
+            max_workers=args.workers,
+            requests_per_second=args.rps,
+            backoff_base=0.01,
+            backoff_max=0.1,
+        ),
+        snapshot_store=PeerSnapshotStore(os.path.join(work_dir, 'peer_snapshots')),
+        constituent_cache=ConstituentCache(os.path.join(work_dir, 'constituents.json')),
+        data_source=stub,
+    )
+    analyzer.industry_mapping_file = mapping_file
+    return analyzer
+
+
+def bench_industry_fetch(size, name, mapping_file, industry_sizes, work_dir, args):
+    """行业数据获取：冷启动（全部走数据源）和热启动（命中本地缓存）"""
+    stub = StubAkshare(industry_sizes, args.latency, args.jitter, args.failure_rate, args.seed)
+    analyzer = make_industry_analyzer(stub, mapping_file, work_dir, args)
+
+    results = []
+    for mode in ('cold', 'warm'):
+        calls_before = analyzer.fetcher.request_count
+        with quiet(not args.verbose):
+            csv_path, seconds = timed(analyzer.analyze_industry_financials, name, YEAR, use_snapshot=False)
+        rows = len(analyzer.snapshot_store.load({'path': csv_path})) if csv_path else 0
+        results.append({
+            'stage': f'industry_fetch_{mode}',
+            'size': size,
+            'seconds': round(seconds, 4),
+            'akshare_calls': analyzer.fetcher.request_count - calls_before,
+            'rows': rows,
+            'rows_per_second': round(rows / seconds, 1) if seconds else None,
+        })
+    return results
+
+
+def bench_scoring(size, work_dir, args):
+    """评分：加载CSV、建立百分位索引、单公司报告和整表排名"""
+    # 与实际流程相同，同行业数据保存为快照库中的快照（只有快照会生成列式副本）
+    snapshot_store = PeerSnapshotStore(os.path.join(work_dir, 'scoring_snapshots'))
+    csv_path = snapshot_store.save(f'bench_{size}', YEAR, build_industry_frame(size, args.seed))['path']
+    target_metrics = {
+        metric: value
+        for group in STUB_LLM_RESULT.values()
+        for metric, value in group.items()
+    }
+
+    comparison = FinancialComparisonAnalyzer()
+    # 首次读取解析CSV并写出列式副本，之后直接内存映射读取
+    _, load_seconds = timed(comparison.load_industry_data, csv_path)
+    industry_df, columnar_seconds = timed(comparison.load_industry_data, csv_path)
+    index, index_seconds = timed(comparison.build_percentile_index, industry_df)
+    _, report_seconds = timed(
+        comparison.generate_comparison_report,
+        target_metrics, industry_df, '基准公司', '合成行业', YEAR, percentile_index=index
+    )
+    _, league_seconds = timed(comparison.generate_league_table, industry_df, index)
+
+    return [
+        {'stage': 'scoring_load_csv', 'size': size, 'seconds': round(load_seconds, 4)},
+        {'stage': 'scoring_load_columnar', 'size': size, 'seconds': round(columnar_seconds, 4)},
+        {'stage': 'scoring_build_index', 'size': size, 'seconds': round(index_seconds, 4)},
+        {'stage': 'scoring_report', 'size': size, 'seconds': round(report_seconds, 4)},
+        {'stage': 'scoring_league_table', 'size': size, 'seconds': round(league_seconds, 4)},
+    ]
+
+
+def bench_llm(work_dir, args):
+    """财务数据分析：本地指标计算，以及（禁用本地计算和缓存时）模型调用的完整路径"""
+    markdown = build_statement_markdown(args.seed)
+    results = []
+    for mode, streaming in (('llm_analysis', False), ('llm_analysis_streaming', True)):
+        client = StubOpenAIClient(args.llm_latency, args.jitter, args.failure_rate, args.seed)
+        analyzer = FinancialAnalyzer(
+            'stub',
+            result_cache=LLMResultCache(os.path.join(work_dir, 'llm_results')),
+            use_local_engine=False,
+            use_streaming=streaming,
+            client=client,
+        )
+        start = time.perf_counter()
+        with quiet(not args.verbose):
+            for _ in range(args.repeat):
+                analyzer.analyze_financial_data(markdown, bypass_cache=True)
+        seconds = (time.perf_counter() - start) / args.repeat
+        results.append({
+            'stage': mode,
+            'size': len(markdown),
+            'seconds': round(seconds, 4),
+            'llm_calls': client.calls,
+            **analyzer.token_usage,
+        })
+
+    analyzer = FinancialAnalyzer(
+        'stub',
+        result_cache=LLMResultCache(os.path.join(work_dir, 'llm_results')),
+        client=StubOpenAIClient(),
+    )
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        analyzer.compute_local_metrics(markdown)
+    results.append({
+        'stage': 'local_ratio_engine',
+        'size': len(markdown),
+        'seconds': round((time.perf_counter() - start) / args.repeat, 4),
+    })
+    return results
+
+
+def bench_end_to_end(size, name, mapping_file, industry_sizes, work_dir, args):
+    """端到端：IntegratedFinancialAnalyzer 完整流程（MinerU、数据源和模型均为替身）"""
+    try:
+        import main_analyzer
+    except Exception as e:
+        print(f"跳过端到端基准（无法导入 main_analyzer: {e}）")
+        return []
+    from PDFdata_to_json.extraction_cache import MinerUOutputCache
+    from pipeline_metrics import PipelineMetrics
+
+    stub = StubAkshare(industry_sizes, args.latency, args.jitter, args.failure_rate, args.seed)
+    metrics = PipelineMetrics(os.path.join(work_dir, 'pipeline_metrics.jsonl'))
+    llm_client = StubOpenAIClient(args.llm_latency, args.jitter, args.failure_rate, args.seed)
+    analyzer = main_analyzer.IntegratedFinancialAnalyzer(
+        make_industry_analyzer(stub, mapping_file, work_dir, args),
+        page_filter=StubPageFilter(),
+        extraction_cache=MinerUOutputCache(os.path.join(work_dir, 'mineru')),
+        metrics=metrics,
+        llm_client=llm_client,
+        llm_result_cache=LLMResultCache(os.path.join(work_dir, 'llm_results')),
+    )
+
+    def stub_mineru(pdf_path, output_dir):
+        time.sleep(args.mineru_latency)
+        markdown_dir = Path(output_dir) / Path(pdf_path).stem / 'auto'
+        markdown_dir.mkdir(parents=True, exist_ok=True)
+        markdown_path = markdown_dir / f"{Path(pdf_path).stem}.md"
+        # 部分报表缺少若干行项目，本地引擎算不出的指标必须走模型替身
+        markdown_path.write_text(build_statement_markdown(args.seed, partial=True), encoding='utf-8')
+        return str(markdown_path)
+
+    analyzer.run_mineru_cli = stub_mineru
+
+    pdf_path = os.path.join(work_dir, f'synthetic_{size}.pdf')
+    with open(pdf_path, 'wb') as f:
+        f.write(f'%PDF-1.4 synthetic {size}'.encode('utf-8'))
+
+    cwd = os.getcwd()
+    os.chdir(work_dir)  # 报告写入当前目录
+    try:
+        with quiet(not args.verbose):
+            report_path, seconds = timed(analyzer.run_complete_analysis, pdf_path, name, YEAR, '基准公司')
+    finally:
+        os.chdir(cwd)
+
+    results = [{
+        'stage': 'end_to_end',
+        'size': size,
+        'seconds': round(seconds, 4),
+        'status': 'ok' if report_path else f'failed: {analyzer.last_error}',
+        'llm_calls': llm_client.calls,
+    }]
+    for stage, values in metrics.summary().items():
+        results.append({
+            'stage': f'e2e_{stage}',
+            'size': size,
+            'seconds': round(values['wall_seconds'], 4),
+            'akshare_calls': values['akshare_calls'],
+        })
+    return results
+
+
+def print_results(results):
+    print(f"\n{'阶段':<28}{'规模':>8}{'耗时(秒)':>12}  其他")
+    for result in results:
+        extra = ', '.join(
+            f"{key}={value}" for key, value in result.items()
+            if key not in ('stage', 'size', 'seconds')
+        )
+        print(f"{result['stage']:<30}{result['size']:>8}{result['seconds']:>12.4f}  {extra}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='离线性能基准（不访问网络）')
+    parser.add_argument('--sizes', default='10,100,1000,5000', help='合成行业的公司数量，逗号分隔')
+    parser.add_argument('--latency', type=float, default=0.0, help='akshare替身每次调用的延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='叠加的随机延迟上限（秒）')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='替身调用失败的概率（0-1）')
+    parser.add_argument('--llm-latency', type=float, default=0.0, help='模型替身每次调用的延迟（秒）')
+    parser.add_argument('--mineru-latency', type=float, default=0.0, help='MinerU替身每个PDF的耗时（秒）')
+    parser.add_argument('--workers', type=int, default=8, help='行业数据获取的并发线程数')
+    parser.add_argument('--rps', type=float, default=0, help='全局每秒请求数上限，0表示不限流')
+    parser.add_argument('--repeat', type=int, default=3, help='模型分析阶段的重复次数')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    parser.add_argument('--skip-end-to-end', action='store_true', help='不运行端到端基准')
+    parser.add_argument('--output', default=None, help='结果JSON的输出路径')
+    parser.add_argument('--verbose', action='store_true', help='显示被测代码的输出')
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    work_dir = tempfile.mkdtemp(prefix='finance_benchmark_')
+    try:
+        mapping_file, industry_sizes, names = build_industry_mapping(sizes, work_dir)
+        results = []
+        for size in sizes:
+            print(f"基准: {size} 家公司...")
+            size_dir = os.path.join(work_dir, str(size))
+            results.extend(bench_industry_fetch(size, names[size], mapping_file, industry_sizes, size_dir, args))
+            results.extend(bench_scoring(size, size_dir, args))
+            if not args.skip_end_to_end:
+                e2e_dir = os.path.join(work_dir, f'e2e_{size}')
+                os.makedirs(e2e_dir, exist_ok=True)
+                results.extend(bench_end_to_end(size, names[size], mapping_file, industry_sizes, e2e_dir, args))
+        results.extend(bench_llm(work_dir, args))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print_results(results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'config': vars(args), 'results': results}, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已保存到: {args.output}")
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+import sys
+import json
+import time
+import random
+import threading
+from types import ModuleType, SimpleNamespace
+
+import pandas as pd
+
+YEARS = list(range(2015, 2025))
+
+
+class StubDataError(Exception):
+    """模拟的数据源请求失败"""
+
+
+class _OfflineOpenAI:
+    """基准中所有模型调用都经过 StubOpenAIClient，创建真实客户端说明有代码绕过了替身"""
+
+    def __init__(self, *args, **kwargs):
+        raise RuntimeError("离线基准中不应创建真实的OpenAI客户端")
+
+
+def install_offline_modules():
+    """
+    在导入项目代码之前注册 akshare、openai 和 config 的离线替身模块：
+    未安装这些依赖、没有配置密钥时基准也能运行，且任何调用都不会访问网络
+    """
+    akshare = ModuleType('akshare')
+    akshare.__doc__ = '离线基准中的akshare替身，数据通过 StubAkshare 注入'
+
+    openai = ModuleType('openai')
+    openai.OpenAI = openai.AsyncOpenAI = _OfflineOpenAI
+    for name in ('APIConnectionError', 'APITimeoutError', 'APIStatusError'):
+        setattr(openai, name, type(name, (Exception,), {}))
+
+    config = ModuleType('config')
+    config.DEEPSEEK_API_KEY = 'stub'
+
+    for name, module in (('akshare', akshare), ('openai', openai), ('config', config),
+                         ('PDFdata_to_json.config', config)):
+        sys.modules[name] = module
+
+
+class StubLatency:
+    def __init__(self, latency=0.0, jitter=0.0, failure_rate=0.0, seed=0):
+        """
+        模拟网络延迟和失败
+        :param latency: 每次调用的基础延迟（秒）
+        :param jitter: 在基础延迟上叠加的随机延迟上限（秒）
+        :param failure_rate: 调用失败的概率（0-1）
+        :param seed: 随机种子
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def wait(self, name):
+        with self._lock:
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            failed = self._random.random() < self.failure_rate
+        if delay:
+            time.sleep(delay)
+        if failed:
+            raise StubDataError(f"模拟的 {name} 请求失败")
+
+
+class StubAkshare:
+    def __init__(self, industry_sizes, latency=0.0, jitter=0.0, failure_rate=0.0, seed=0):
+        """
+        替代akshare的本地数据源，提供 sw_index_third_cons 与 stock_financial_abstract_ths
+        :param industry_sizes: {三级行业代码: 成分股数量}
+        """
+        self.industry_sizes = industry_sizes
+        self.seed = seed
+        self.delay = StubLatency(latency, jitter, failure_rate, seed)
+        self.calls = {'sw_index_third_cons': 0, 'stock_financial_abstract_ths': 0}
+        self._lock = threading.Lock()
+
+        # 不同行业的股票代码互不重叠
+        self.stock_codes = {}
+        next_code = 1
+        for industry_code, size in industry_sizes.items():
+            self.stock_codes[industry_code] = [f"{code:06d}" for code in range(next_code, next_code + size)]
+            next_code += size
+
+    def _count(self, name):
+        with self._lock:
+            self.calls[name] += 1
+
+    def sw_index_third_cons(self, symbol):
+        self._count('sw_index_third_cons')
+        self.delay.wait('sw_index_third_cons')
+        codes = self.stock_codes.get(symbol, [])
+        return pd.DataFrame({
+            '序号': range(1, len(codes) + 1),
+            '股票代码': [f"{code}.SZ" for code in codes],
+            '股票简称': [f"合成{code}" for code in codes],
+        })
+
+    def stock_financial_abstract_ths(self, symbol, indicator="按年度"):
+        self._count('stock_financial_abstract_ths')
+        self.delay.wait('stock_financial_abstract_ths')
+        rng = random.Random(f"{self.seed}-{symbol}")
+        rows = []
+        for year in YEARS:
+            rows.append({
+                '报告期': str(year),
+                '净利润': f"{rng.uniform(-1, 9):.2f}亿",
+                '净利润同比增长率': f"{rng.uniform(-50, 80):.2f}%",
+                '营业总收入': f"{rng.uniform(1, 90):.2f}亿",
+                '营业总收入同比增长率': f"{rng.uniform(-30, 60):.2f}%",
+                '销售净利率': f"{rng.uniform(-5, 30):.2f}%",
+                '销售毛利率': f"{rng.uniform(5, 60):.2f}%",
+                '净资产收益率': f"{rng.uniform(-10, 30):.2f}%",
+                '流动比率': f"{rng.uniform(0.5, 4):.2f}",
+                '速动比率': f"{rng.uniform(0.3, 3):.2f}",
+                '存货周转天数': f"{rng.uniform(5, 300):.2f}",
+                '应收账款周转天数': f"{rng.uniform(1, 180):.2f}",
+                '资产负债率': f"{rng.uniform(5, 90):.2f}%",
+            })
+        return pd.DataFrame(rows)
+
+
+# 与系统提示词约定一致的模型返回内容
+STUB_LLM_RESULT = {
+    "盈利能力指标": {"净利润": 30000000.0, "销售净利率": 7.5, "销售毛利率": 20.0, "净资产收益率": 9.23},
+    "成长性指标": {"净利润同比增长率": 12.5, "营业总收入同比增长率": 14.29},
+    "偿债能力指标": {"流动比率": 3.0, "速动比率": 2.5, "资产负债率": 30.0},
+    "营运能力指标": {"存货周转天数": 54.18, "应收账款周转天数": 10.2},
+}
+
+
+class _StubCompletions:
+    def __init__(self, client):
+        self.client = client
+
+    def create(self, model, messages, stream=False, temperature=None, **kwargs):
+        client = self.client
+        with client._lock:
+            client.calls += 1
+        client.delay.wait('chat.completions')
+
+        content = json.dumps(client.result, ensure_ascii=False)
+        prompt_tokens = sum(len(message['content']) for message in messages) // 2
+        usage = SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=len(content) // 2)
+        if not stream:
+            return SimpleNamespace(
+                choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+                usage=usage,
+            )
+        return _StubStream(content, usage, client.chunk_chars, client.chunk_interval)
+
+
+class _StubStream:
+    def __init__(self, content, usage, chunk_chars, chunk_interval):
+        self.content = content
+        self.usage = usage
+        self.chunk_chars = chunk_chars
+        self.chunk_interval = chunk_interval
+
+    def __iter__(self):
+        for start in range(0, len(self.content), self.chunk_chars):
+            if self.chunk_interval:
+                time.sleep(self.chunk_interval)
+            delta = SimpleNamespace(content=self.content[start:start + self.chunk_chars])
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+        yield SimpleNamespace(choices=[], usage=self.usage)
+
+    def close(self):
+        pass
+
+
+class StubOpenAIClient:
+    def __init__(self, latency=0.0, jitter=0.0, failure_rate=0.0, seed=0, result=None,
+                 chunk_chars=16, chunk_interval=0.0):
+        """
+        替代OpenAI客户端，client.chat.completions.create 返回固定的指标JSON
+        :param result: 返回的指标字典，默认为 STUB_LLM_RESULT
+        :param chunk_chars: 流式模式下每个分片的字符数
+        :param chunk_interval: 流式模式下分片之间的间隔（秒）
+        """
+        self.delay = StubLatency(latency, jitter, failure_rate, seed)
+        self.result = result or STUB_LLM_RESULT
+        self.chunk_chars = chunk_chars
+        self.chunk_interval = chunk_interval
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=_StubCompletions(self))
+
+
+class StubPageFilter:
+    """不做页面筛选（合成PDF没有文字层）"""
+
+    def prepare(self, pdf_path, output_dir):
+        return pdf_path, None
@@ -0,0 +1,111 @@
+import os
+import random
+
+import pandas as pd
+
+MAPPING_COLUMNS = [
+    '一级行业代码', '一级行业名称', '一级成份个数',
+    '二级行业代码', '二级行业名称', '二级成份个数',
+    '三级行业代码', '三级行业名称', '三级成份个数',
+]
+
+
+def industry_name(size):
+    """合成行业的名称"""
+    return f"合成行业{size}"
+
+
+def build_industry_mapping(sizes, output_dir):
+    """
+    为每个规模生成一个一级行业（下含一个二级、一个三级行业），写出行业映射CSV
+    :param sizes: 行业规模列表（成分股数量）
+    :param output_dir: 输出目录
+    :return: (映射文件路径, {三级行业代码: 成分股数量}, {规模: 一级行业名称})
+    """
+    rows = []
+    industry_sizes = {}
+    names = {}
+    for index, size in enumerate(sizes):
+        third_code = f"{859000 + index}1.SI"
+        name = industry_name(size)
+        rows.append([
+            f"{809000 + index}.SI", name, size,
+            f"{8090000 + index}2.SI", f"{name}二级", size,
+            third_code, f"{name}三级", size,
+        ])
+        industry_sizes[third_code] = size
+        names[size] = name
+
+    os.makedirs(output_dir, exist_ok=True)
+    mapping_file = os.path.join(output_dir, 'synthetic_sw_industry_info.csv')
+    pd.DataFrame(rows, columns=MAPPING_COLUMNS).to_csv(mapping_file, index=False, encoding='utf-8-sig')
+    return mapping_file, industry_sizes, names
+
+
+def _html_table(rows):
+    body = ''.join(
+        '<tr>' + ''.join(f'<td>{cell}</td>' for cell in row) + '</tr>'
+        for row in rows
+    )
+    return f'<table>{body}</table>'
+
+
+# 部分报表中缺少的行项目：本地无法计算速动比率和两个周转天数，需要交给模型
+PARTIAL_STATEMENT_OMITTED_ROWS = ['应收账款', '存货']
+
+
+def build_statement_markdown(seed=0, filler_paragraphs=200, partial=False):
+    """
+    生成类似MinerU输出的年报markdown：大量正文 + 合并资产负债表 + 合并利润表
+    :param seed: 随机种子
+    :param filler_paragraphs: 报表之前的正文段落数（模拟年报篇幅）
+    :param partial: 为True时资产负债表缺少应收账款和存货，部分指标必须由模型计算
+    """
+    rng = random.Random(seed)
+
+    def amount():
+        return f"{rng.uniform(1e7, 9e8):,.2f}"
+
+    filler = '\n\n'.join(
+        f"## 第{index + 1}节 经营情况讨论与分析\n\n" + '公司主营业务保持稳定增长。' * 20
+        for index in range(filler_paragraphs)
+    )
+    balance_rows = [['项目', '附注', '2020年12月31日', '2019年12月31日']]
+    for label in ['应收账款', '存货', '流动资产合计', '资产总计', '流动负债合计', '负债合计', '所有者权益合计']:
+        if partial and label in PARTIAL_STATEMENT_OMITTED_ROWS:
+            continue
+        balance_rows.append([label, '七、1', amount(), amount()])
+    income_rows = [['项目', '附注', '2020年度', '2019年度']]
+    for label in ['一、营业总收入', '其中：营业收入', '减：营业成本', '五、净利润']:
+        income_rows.append([label, '七、2', amount(), amount()])
+
+    return (
+        f"# 2020年年度报告\n\n{filler}\n\n"
+        f"## 合并资产负债表\n\n单位：元\n\n{_html_table(balance_rows)}\n\n"
+        f"## 合并利润表\n\n单位：元\n\n{_html_table(income_rows)}\n"
+    )
+
+
+def build_industry_frame(size, seed=0):
+    """
+    直接生成同行业数据表（格式与行业快照CSV一致），用于单独测试评分阶段
+    :param size: 公司数量
+    """
+    rng = random.Random(seed)
+    rows = []
+    for index in range(size):
+        rows.append({
+            '报告期': '2020',
+            '销售毛利率': f"{rng.uniform(5, 60):.2f}%",
+            '销售净利率': f"{rng.uniform(-5, 30):.2f}%",
+            '净资产收益率': f"{rng.uniform(-10, 30):.2f}%",
+            '营业总收入同比增长率': f"{rng.uniform(-30, 60):.2f}%",
+            '净利润同比增长率': f"{rng.uniform(-50, 80):.2f}%",
+            '资产负债率': f"{rng.uniform(5, 90):.2f}%",
+            '流动比率': round(rng.uniform(0.5, 4), 2),
+            '速动比率': round(rng.uniform(0.3, 3), 2),
+            '存货周转天数': round(rng.uniform(5, 300), 2),
+            '应收账款周转天数': round(rng.uniform(1, 180), 2),
+            '股票代码': f"{index + 1:06d}",
+        })
+    return pd.DataFrame(rows)
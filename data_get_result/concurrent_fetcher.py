@@ -0,0 +1,125 @@
+import time
+import random
+import threading
+import contextvars
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# 当前上下文中的请求计数器（见 ConcurrentFetcher.count_requests）
+_request_counter = contextvars.ContextVar('request_counter', default=None)
+
+
+class RequestCounter:
+    """统计一段调用中发出的请求次数，线程安全"""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def add(self):
+        with self._lock:
+            self.count += 1
+
+# 令牌桶限流器，多个线程共享同一个全局请求速率
+class TokenBucketRateLimiter:
+    def __init__(self, requests_per_second=2.0, burst=None):
+        """
+        :param requests_per_second: 每秒允许的请求数，<=0 表示不限流
+        :param burst: 令牌桶容量（允许的突发请求数），默认等于每秒请求数且至少为1
+        """
+        self.rate = requests_per_second
+        self.capacity = burst if burst is not None else max(1.0, requests_per_second)
+        self.tokens = self.capacity
+        self.last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """阻塞直到获得一个令牌"""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_time = (1 - self.tokens) / self.rate
+            time.sleep(wait_time)
+
+
+# 有界线程池抓取引擎：全局限流 + 带抖动的指数退避重试 + 按输入顺序返回结果
+class ConcurrentFetcher:
+    def __init__(self, max_workers=8, requests_per_second=2.0, max_retries=2,
+                 backoff_base=0.5, backoff_max=8.0):
+        """
+        :param max_workers: 最大并发线程数
+        :param requests_per_second: 全局每秒请求数上限
+        :param max_retries: 单次调用失败后的最大重试次数
+        :param backoff_base: 退避基准时间（秒）
+        :param backoff_max: 单次退避的最长时间（秒）
+        """
+        self.max_workers = max_workers
+        self.rate_limiter = TokenBucketRateLimiter(requests_per_second)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # 实际发出的请求次数（含重试），为进程内所有调用的累计值
+        self.request_count = 0
+        self._count_lock = threading.Lock()
+
+    @contextmanager
+    def count_requests(self):
+        """
+        统计 with 块内（包括经 map 派发到线程池的任务）发出的请求次数，不包含其他线程同时发出的请求：
+        with fetcher.count_requests() as counter: ...; counter.count
+        """
+        counter = RequestCounter()
+        token = _request_counter.set(counter)
+        try:
+            yield counter
+        finally:
+            _request_counter.reset(token)
+
+    def call(self, func, *args, **kwargs):
+        """在限流下调用func，失败时按带抖动的指数退避重试，重试用尽后抛出最后一次异常"""
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            with self._count_lock:
+                self.request_count += 1
+            counter = _request_counter.get()
+            if counter is not None:
+                counter.add()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                if attempt >= self.max_retries:
+                    raise
+                # full jitter: 在 [0, min(上限, 基准*2^attempt)] 内随机等待
+                delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+                time.sleep(random.uniform(0, delay))
+
+    def map(self, func, items, progress_callback=None):
+        """
+        并发地对每个元素调用func，结果按输入顺序返回
+        :param progress_callback: 每完成一个任务调用一次，参数为 (已完成数, 总数, 元素)
+        """
+        items = list(items)
+        results = [None] * len(items)
+        if not items:
+            return results
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # 每个任务在调用方上下文的副本中执行，请求计数归属于发起 map 的调用
+            futures = {
+                executor.submit(contextvars.copy_context().run, func, item): index
+                for index, item in enumerate(items)
+            }
+            for completed, future in enumerate(as_completed(futures), 1):
+                index = futures[future]
+                results[index] = future.result()
+                if progress_callback:
+                    progress_callback(completed, len(items), items[index])
+
+        return results
@@ -0,0 +1,108 @@
+import os
+import json
+import threading
+from datetime import datetime, timedelta
+
+# 申万三级行业成分股缓存：按三级行业代码保存有序成分股列表，记录成分变动，并维护股票→行业的反向索引
+class ConstituentCache:
+    def __init__(self, cache_file=None, max_age_days=7, max_change_records=20):
+        """
+        :param cache_file: 缓存文件路径，默认为 data_get_result/cache/constituents.json
+        :param max_age_days: 成分股列表的有效期（天）
+        :param max_change_records: 每个行业最多保留的成分变动记录数
+        """
+        if cache_file is None:
+            cache_file = os.path.join(
+                os.path.dirname(os.path.abspath(__file__)), 'cache', 'constituents.json'
+            )
+        self.cache_file = cache_file
+        self.max_age = timedelta(days=max_age_days)
+        self.max_change_records = max_change_records
+        self._lock = threading.Lock()
+        self._industries = self._read()
+        self._stock_index = self._build_stock_index()
+
+    def _read(self):
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f).get('industries', {})
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self):
+        os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+        tmp_path = f"{self.cache_file}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'industries': self._industries}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.cache_file)
+
+    def _build_stock_index(self):
+        stock_index = {}
+        for industry_code, entry in self._industries.items():
+            for stock_code in entry['stocks']:
+                stock_index.setdefault(stock_code, []).append(industry_code)
+        return stock_index
+
+    def is_fresh(self, industry_code, max_age_days=None, now=None):
+        """判断指定行业的成分股列表是否在有效期内"""
+        entry = self._industries.get(industry_code)
+        if not entry:
+            return False
+        max_age = self.max_age if max_age_days is None else timedelta(days=max_age_days)
+        fetched_at = datetime.fromisoformat(entry['fetched_at'])
+        return (now or datetime.now()) - fetched_at <= max_age
+
+    def get(self, industry_code, max_age_days=None):
+        """返回有效的成分股代码列表，缺失或过期时返回None"""
+        if not self.is_fresh(industry_code, max_age_days):
+            return None
+        return list(self._industries[industry_code]['stocks'])
+
+    def get_stored(self, industry_code):
+        """返回已保存的成分股列表（不检查有效期），不存在时返回None"""
+        entry = self._industries.get(industry_code)
+        return list(entry['stocks']) if entry else None
+
+    def update(self, industry_code, stock_codes):
+        """
+        保存最新的成分股列表，并与上一次的列表比较
+        :return: 成分变动 {'added': [...], 'removed': [...]}，首次保存或无变动时返回None
+        """
+        stock_codes = list(dict.fromkeys(stock_codes))
+        now = datetime.now().isoformat(timespec='seconds')
+
+        with self._lock:
+            entry = self._industries.get(industry_code)
+            change = None
+            if entry:
+                previous = set(entry['stocks'])
+                current = set(stock_codes)
+                added = [code for code in stock_codes if code not in previous]
+                removed = [code for code in entry['stocks'] if code not in current]
+                if added or removed:
+                    change = {'detected_at': now, 'added': added, 'removed': removed}
+                changes = entry.get('changes', [])
+            else:
+                changes = []
+
+            if change:
+                changes = (changes + [change])[-self.max_change_records:]
+
+            self._industries[industry_code] = {
+                'fetched_at': now,
+                'stocks': stock_codes,
+                'changes': changes,
+            }
+            self._stock_index = self._build_stock_index()
+            self._write()
+
+        return change
+
+    def changes(self, industry_code):
+        """返回指定行业的成分变动记录"""
+        entry = self._industries.get(industry_code)
+        return list(entry.get('changes', [])) if entry else []
+
+    def stock_industries(self, stock_code):
+        """返回包含该股票的三级行业代码列表"""
+        return list(self._stock_index.get(stock_code, []))
@@ -1,6 +1,5 @@
 import pandas as pd
 import os
-from datetime import datetime
 import time
 
 # 添加akshare导入
@@ -10,15 +9,32 @@ except ImportError:
     print("错误: 请先安装akshare库: pip install akshare")
     raise
 
+from stock_financial_cache import StockFinancialCache
+from concurrent_fetcher import ConcurrentFetcher
+from peer_snapshot_store import PeerSnapshotStore
+from industry_taxonomy import get_taxonomy
+from constituent_cache import ConstituentCache
+
 # 合并申万一级、二级和三级行业分类
 class IndustryFinancialAnalyzer:
-    def __init__(self):
+    def __init__(self, financial_cache=None, fetcher=None, snapshot_store=None, constituent_cache=None,
+                 data_source=None):
         self.current_dir = os.path.dirname(os.path.abspath(__file__))
         self.industry_mapping_file = os.path.join(
             self.current_dir, 
             'industry_data_base', 
             'merged_sw_industry_info_20250621_145757.csv'
         )
+        # 个股财务摘要的本地缓存
+        self.financial_cache = financial_cache or StockFinancialCache()
+        # 并发抓取引擎，所有akshare请求共享同一个全局限流器
+        self.fetcher = fetcher or ConcurrentFetcher()
+        # 按 (行业代码, 年份) 保存的同行业数据快照
+        self.snapshot_store = snapshot_store or PeerSnapshotStore()
+        # 三级行业成分股缓存
+        self.constituent_cache = constituent_cache or ConstituentCache()
+        # 行情数据源：提供 sw_index_third_cons 与 stock_financial_abstract_ths 的对象，默认为akshare
+        self.data_source = data_source or ak
         
     def load_industry_mapping(self):
         """加载行业映射数据"""
@@ -28,43 +44,49 @@ class IndustryFinancialAnalyzer:
             print(f"加载行业映射文件失败: {e}")
             return None
     
+    def get_taxonomy(self):
+        """返回进程内共享的行业层级索引（映射文件只读取一次）"""
+        return get_taxonomy(self.industry_mapping_file)
+    
     def find_third_level_industries(self, industry_name):
         """根据行业名称查找对应的三级行业代码"""
-        mapping_df = self.load_industry_mapping()
-        if mapping_df is None:
+        taxonomy = self.get_taxonomy()
+        if taxonomy is None:
+            return []
+        
+        industry_code = taxonomy.resolve(industry_name)
+        if not industry_code:
+            suggestions = taxonomy.suggest(industry_name)
+            hint = f"，是否要找: {'、'.join(suggestions)}" if suggestions else ""
+            print(f"未找到行业名称 '{industry_name}' 对应的数据{hint}")
             return []
         
-        third_level_codes = []
-        
-        # 检查是否为一级行业
-        first_level_match = mapping_df[mapping_df['一级行业名称'] == industry_name]
-        if not first_level_match.empty:
-            # 获取该一级行业下所有有三级行业代码的记录
-            third_level_codes = first_level_match[first_level_match['三级行业代码'] != '']['三级行业代码'].unique().tolist()
-            print(f"找到一级行业 '{industry_name}' 下的 {len(third_level_codes)} 个三级行业")
-            return third_level_codes
-        
-        # 检查是否为二级行业
-        second_level_match = mapping_df[mapping_df['二级行业名称'] == industry_name]
-        if not second_level_match.empty:
-            third_level_codes = second_level_match[second_level_match['三级行业代码'] != '']['三级行业代码'].unique().tolist()
-            print(f"找到二级行业 '{industry_name}' 下的 {len(third_level_codes)} 个三级行业")
-            return third_level_codes
-        
-        # 检查是否为三级行业
-        third_level_match = mapping_df[mapping_df['三级行业名称'] == industry_name]
-        if not third_level_match.empty:
-            third_level_codes = third_level_match['三级行业代码'].unique().tolist()
-            print(f"找到三级行业 '{industry_name}' 的行业代码")
-            return third_level_codes
-        
-        print(f"未找到行业名称 '{industry_name}' 对应的数据")
-        return []
+        node = taxonomy.get_node(industry_code)
+        third_level_codes = taxonomy.third_level_codes(industry_code)
+        if node['level'] == '三级':
+            print(f"找到三级行业 '{node['name']}' 的行业代码")
+        else:
+            print(f"找到{node['level']}行业 '{node['name']}' 下的 {len(third_level_codes)} 个三级行业")
+        return third_level_codes
+    
+    def resolve_industry_code(self, industry_name):
+        """根据行业名称查找其自身所在层级的行业代码"""
+        taxonomy = self.get_taxonomy()
+        if taxonomy is None:
+            return None
+        return taxonomy.resolve(industry_name)
+    
+    def get_industry_snapshot(self, industry_name, year, max_age_days=None):
+        """查找指定行业和年份的有效快照，不存在或已过期时返回None"""
+        industry_code = self.resolve_industry_code(industry_name)
+        if not industry_code:
+            return None
+        return self.snapshot_store.get_latest(industry_code, year, max_age_days)
     
     def get_industry_constituents(self, industry_code):
         """获取指定三级行业的成分股数据"""
         try:
-            constituents_df = ak.sw_index_third_cons(symbol=industry_code)
+            constituents_df = self.fetcher.call(self.data_source.sw_index_third_cons, symbol=industry_code)
             return constituents_df
         except Exception as e:
             print(f"获取行业 {industry_code} 成分股数据失败: {e}")
@@ -85,65 +107,127 @@ class IndustryFinancialAnalyzer:
         
         return stock_codes
     
+    def get_constituent_codes(self, industry_code, use_cache=True):
+        """获取指定三级行业的有序成分股代码，缓存有效时不访问网络"""
+        if use_cache:
+            cached_codes = self.constituent_cache.get(industry_code)
+            if cached_codes is not None:
+                return cached_codes
+        
+        stock_codes = self.extract_stock_codes(self.get_industry_constituents(industry_code))
+        if not stock_codes:
+            # 获取失败时退回到已保存的列表
+            return self.constituent_cache.get_stored(industry_code) or []
+        
+        change = self.constituent_cache.update(industry_code, stock_codes)
+        if change:
+            print(f"行业 {industry_code} 成分股变动: 新增 {len(change['added'])} 只, 移除 {len(change['removed'])} 只")
+        return self.constituent_cache.get_stored(industry_code)
+    
+    def get_stock_financial_history(self, stock_code, year=None, period="按年度"):
+        """获取单个股票的完整财务历史，缓存有效时不访问网络"""
+        financial_df = self.financial_cache.load(stock_code, period, year)
+        if financial_df is not None:
+            return financial_df
+        
+        return self.fetch_stock_financial_history(stock_code, period)
+    
+    def fetch_stock_financial_history(self, stock_code, period="按年度"):
+        """从数据源获取单个股票的完整财务历史并写入缓存"""
+        financial_df = self.fetcher.call(
+            self.data_source.stock_financial_abstract_ths, symbol=stock_code, indicator=period
+        )
+        self.financial_cache.save(stock_code, financial_df, period)
+        return financial_df
+    
+    def filter_year(self, financial_df, stock_code, year):
+        """从完整财务历史中筛选指定年份的数据"""
+        if '报告期' not in financial_df.columns:
+            return pd.DataFrame()
+        
+        year_mask = financial_df['报告期'].astype(str).str.contains(str(year), na=False)
+        filtered_df = financial_df[year_mask].copy()
+        if filtered_df.empty:
+            return pd.DataFrame()
+        
+        # 添加股票代码列
+        filtered_df['股票代码'] = stock_code
+        return filtered_df
+    
+    def split_years(self, financial_df, stock_code, years):
+        """把完整财务历史按年份拆分，返回 {年份: 该年数据}，没有数据的年份不包含在结果中"""
+        yearly_data = {}
+        for year in years:
+            filtered_df = self.filter_year(financial_df, stock_code, year)
+            if not filtered_df.empty:
+                yearly_data[year] = filtered_df
+        return yearly_data
+    
+    def get_stock_financial_years(self, stock_code, years, period="按年度"):
+        """获取单个股票多个年份的财务数据，完整历史只获取一次"""
+        try:
+            # 缓存有效性按最新的年份判断（最新年份的报告最可能尚未披露完）
+            financial_df = self.get_stock_financial_history(stock_code, max(years), period)
+            return self.split_years(financial_df, stock_code, years)
+            
+        except Exception as e:
+            print(f"获取股票 {stock_code} 财务数据失败: {e}")
+            return {}
+    
     def get_stock_financial_data(self, stock_code, year, period="按年度"):
         """获取单个股票的财务数据"""
         try:
-            financial_df = ak.stock_financial_abstract_ths(symbol=stock_code, indicator=period)
-            
-            # 筛选指定年份的数据
-            if '报告期' in financial_df.columns:
-                financial_df['报告期_str'] = financial_df['报告期'].astype(str)
-                year_str = str(year)
-                filtered_df = financial_df[financial_df['报告期_str'].str.contains(year_str, na=False)]
-                
-                if not filtered_df.empty:
-                    filtered_df = filtered_df.drop('报告期_str', axis=1)
-                    # 添加股票代码列
-                    filtered_df['股票代码'] = stock_code
-                    return filtered_df
-            
-            return pd.DataFrame()
+            financial_df = self.get_stock_financial_history(stock_code, year, period)
+            return self.filter_year(financial_df, stock_code, year)
             
         except Exception as e:
             print(f"获取股票 {stock_code} 财务数据失败: {e}")
             return pd.DataFrame()
     
-    def analyze_industry_financials(self, industry_name, year):
-        """主函数：分析指定行业的财务数据"""
+    def collect_stock_codes(self, third_level_codes):
+        """并发获取多个三级行业的成分股，按出现顺序去重后返回"""
+        constituents_list = self.fetcher.map(self.get_constituent_codes, third_level_codes)
+        all_stock_codes = []
+        for stock_codes in constituents_list:
+            all_stock_codes.extend(stock_codes)
+        
+        # 按出现顺序去重，保证合并结果的顺序确定
+        all_stock_codes = list(dict.fromkeys(all_stock_codes))
+        print(f"\n总共找到 {len(all_stock_codes)} 只成分股")
+        return all_stock_codes
+    
+    @staticmethod
+    def report_progress(completed, total, stock_code):
+        print(f"进度: {completed}/{total} ({stock_code})")
+    
+    def analyze_industry_financials(self, industry_name, year, use_snapshot=True, max_age_days=None):
+        """主函数：分析指定行业的财务数据，返回同行业数据快照的文件路径"""
         print(f"\n=== 开始分析行业 '{industry_name}' 的 {year} 年财务数据 ===")
         
+        # 0. 已有有效快照时直接返回
+        if use_snapshot:
+            snapshot = self.get_industry_snapshot(industry_name, year, max_age_days)
+            if snapshot:
+                print(f"使用已有行业快照 v{snapshot['version']}（生成于 {snapshot['created_at']}）")
+                return snapshot['path']
+        
         # 1. 查找三级行业代码
         third_level_codes = self.find_third_level_industries(industry_name)
         if not third_level_codes:
             print("未找到对应的行业数据")
             return None
         
-        # 2. 获取所有成分股
-        all_stock_codes = []
-        for code in third_level_codes:
-            constituents_df = self.get_industry_constituents(code)
-            stock_codes = self.extract_stock_codes(constituents_df)
-            all_stock_codes.extend(stock_codes)
-            time.sleep(1)  # 避免请求过于频繁
-        
-        # 去重
-        all_stock_codes = list(set(all_stock_codes))
-        print(f"\n总共找到 {len(all_stock_codes)} 只成分股")
+        # 2. 并发获取所有成分股（优先读取成分股缓存）
+        all_stock_codes = self.collect_stock_codes(third_level_codes)
         
-        # 3. 批量获取财务数据
-        all_financial_data = []
-        success_count = 0
-        
-        for i, stock_code in enumerate(all_stock_codes, 1):
-            print(f"\n进度: {i}/{len(all_stock_codes)}")
-            financial_df = self.get_stock_financial_data(stock_code, year)
-            
-            if not financial_df.empty:
-                all_financial_data.append(financial_df)
-                success_count += 1
-            
-            # 避免请求过于频繁
-            time.sleep(0.5)
+        # 3. 并发批量获取财务数据（结果按股票代码顺序返回）
+        financial_results = self.fetcher.map(
+            lambda stock_code: self.get_stock_financial_data(stock_code, year),
+            all_stock_codes,
+            progress_callback=self.report_progress
+        )
+        all_financial_data = [df for df in financial_results if not df.empty]
+        success_count = len(all_financial_data)
         
         print(f"\n成功获取 {success_count} 只股票的财务数据")
         
@@ -151,16 +235,230 @@ class IndustryFinancialAnalyzer:
         if all_financial_data:
             combined_df = pd.concat(all_financial_data, ignore_index=True)
             
-            # 5. 保存到CSV文件
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"industry_financial_analysis_{industry_name}_{year}_{timestamp}.csv"
-            filepath = os.path.join(self.current_dir, filename)
-            
-            combined_df.to_csv(filepath, index=False, encoding='utf-8-sig')
+            # 5. 保存为新的快照版本
+            industry_code = self.resolve_industry_code(industry_name)
+            snapshot = self.snapshot_store.save(
+                industry_code, year, combined_df,
+                industry_name=industry_name,
+                extra_metadata={'third_level_codes': third_level_codes}
+            )
+            filepath = snapshot['path']
             print(f"\n=== 分析完成 ===")
             print(f"总共包含 {len(combined_df)} 条财务记录")
+            print(f"快照版本 v{snapshot['version']} 已保存到: {filepath}")
             
             return filepath
         else:
             print("\n未获取到任何财务数据")
-            return None
\ No newline at end of file
+            return None
+    
+    def analyze_industry_financials_range(self, industry_name, years, use_snapshot=True, max_age_days=None):
+        """
+        多年份模式：每只成分股的完整财务历史只获取一次，在内存中按年份拆分后分别保存快照
+        :param years: 年份列表（如 range(2018, 2025)）
+        :return: {年份: 同行业数据快照的文件路径}，没有数据的年份不包含在结果中
+        """
+        years = sorted(set(int(year) for year in years))
+        print(f"\n=== 开始分析行业 '{industry_name}' 的 {years[0]}-{years[-1]} 年财务数据 ===")
+        
+        # 0. 已有有效快照的年份直接使用
+        csv_paths = {}
+        if use_snapshot:
+            for year in years:
+                snapshot = self.get_industry_snapshot(industry_name, year, max_age_days)
+                if snapshot:
+                    print(f"{year}年使用已有行业快照 v{snapshot['version']}（生成于 {snapshot['created_at']}）")
+                    csv_paths[year] = snapshot['path']
+        missing_years = [year for year in years if year not in csv_paths]
+        if not missing_years:
+            return csv_paths
+        
+        # 1. 查找三级行业代码
+        third_level_codes = self.find_third_level_industries(industry_name)
+        if not third_level_codes:
+            print("未找到对应的行业数据")
+            return csv_paths
+        
+        # 2. 并发获取所有成分股（优先读取成分股缓存）
+        all_stock_codes = self.collect_stock_codes(third_level_codes)
+        
+        # 3. 每只股票只请求一次，结果按年份拆分
+        financial_results = self.fetcher.map(
+            lambda stock_code: self.get_stock_financial_years(stock_code, missing_years),
+            all_stock_codes,
+            progress_callback=self.report_progress
+        )
+        
+        # 4. 按年份合并并保存快照
+        industry_code = self.resolve_industry_code(industry_name)
+        for year in missing_years:
+            year_data = [result[year] for result in financial_results if year in result]
+            if not year_data:
+                print(f"{year}年未获取到任何财务数据")
+                continue
+            
+            combined_df = pd.concat(year_data, ignore_index=True)
+            snapshot = self.snapshot_store.save(
+                industry_code, year, combined_df,
+                industry_name=industry_name,
+                extra_metadata={'third_level_codes': third_level_codes}
+            )
+            csv_paths[year] = snapshot['path']
+            print(f"{year}年: {len(year_data)} 只股票, 快照版本 v{snapshot['version']} 已保存到: {snapshot['path']}")
+        
+        print(f"\n=== 分析完成 ===")
+        return dict(sorted(csv_paths.items()))
+    
+    def refresh_constituents(self, third_level_codes):
+        """
+        重新获取各三级行业的成分股（每个行业一次请求），与已保存的列表比较
+        :return: ({三级行业代码: 成分股列表}, {三级行业代码: {'added': [...], 'removed': [...]}})
+        """
+        previous = {code: self.constituent_cache.get_stored(code) for code in third_level_codes}
+        current = self.fetcher.map(lambda code: self.get_constituent_codes(code, use_cache=False), third_level_codes)
+        
+        members = {}
+        changes = {}
+        for code, stock_codes in zip(third_level_codes, current):
+            members[code] = stock_codes
+            before = previous[code] or []
+            before_set, current_set = set(before), set(stock_codes)
+            added = [stock for stock in stock_codes if stock not in before_set]
+            removed = [stock for stock in before if stock not in current_set]
+            if added or removed:
+                changes[code] = {'added': added, 'removed': removed}
+        return members, changes
+    
+    def select_stale_stocks(self, stock_codes, year, period="按年度"):
+        """筛选需要重新获取的股票：本地没有缓存，或指定年份的报告可能已发布但尚未获取"""
+        return [
+            stock_code for stock_code in stock_codes
+            if self.financial_cache.may_have_new_report(
+                self.financial_cache.load_metadata(stock_code, period), year
+            )
+        ]
+    
+    def refresh_industries(self, industry_codes, year, period="按年度"):
+        """
+        增量刷新多个行业的指定年份数据：成分股每个三级行业只请求一次，只重新获取新成分股和可能有新报告的股票，
+        其余股票直接使用本地缓存，最后为每个行业重新生成快照
+        :param industry_codes: 行业代码列表（任意层级）
+        :return: 刷新汇总信息
+        """
+        start = time.perf_counter()
+        with self.fetcher.count_requests() as counter:
+            summary = self._refresh_industries(industry_codes, year, period)
+        if summary is None:
+            return None
+        summary['akshare_calls'] = counter.count
+        summary['elapsed_seconds'] = round(time.perf_counter() - start, 3)
+        print(f"\n=== 增量刷新完成: 重新获取 {summary['stocks_fetched']} 只, 失败 {len(summary['stocks_failed'])} 只, "
+              f"akshare调用 {summary['akshare_calls']} 次, 耗时 {summary['elapsed_seconds']:.1f}秒 ===")
+        return summary
+    
+    def _refresh_industries(self, industry_codes, year, period):
+        """增量刷新的主体，返回不含调用次数和耗时的汇总信息"""
+        taxonomy = self.get_taxonomy()
+        if taxonomy is None:
+            return None
+        
+        industry_codes = list(dict.fromkeys(industry_codes))
+        third_levels = {code: taxonomy.third_level_codes(code) for code in industry_codes}
+        all_third_level_codes = list(dict.fromkeys(
+            third_code for codes in third_levels.values() for third_code in codes
+        ))
+        print(f"\n=== 增量刷新 {len(industry_codes)} 个行业的 {year} 年数据（{len(all_third_level_codes)} 个三级行业）===")
+        
+        # 1. 重新获取成分股并找出变动
+        members, constituent_changes = self.refresh_constituents(all_third_level_codes)
+        all_stock_codes = list(dict.fromkeys(
+            stock_code for stock_codes in members.values() for stock_code in stock_codes
+        ))
+        
+        # 2. 只获取新成分股和可能有新报告的股票
+        stale_codes = self.select_stale_stocks(all_stock_codes, year, period)
+        print(f"共 {len(all_stock_codes)} 只成分股，需要重新获取 {len(stale_codes)} 只")
+        
+        def fetch(stock_code):
+            try:
+                self.fetch_stock_financial_history(stock_code, period)
+                return True
+            except Exception as e:
+                print(f"获取股票 {stock_code} 财务数据失败: {e}")
+                return False
+        
+        fetch_results = self.fetcher.map(fetch, stale_codes, progress_callback=self.report_progress)
+        failed_codes = [code for code, ok in zip(stale_codes, fetch_results) if not ok]
+        
+        # 3. 从本地缓存按年份筛选（每只股票只读取一次），为每个行业生成新快照
+        year_data = {}
+        for stock_code in all_stock_codes:
+            financial_df = self.financial_cache.load_stored(stock_code, period)
+            if financial_df is not None:
+                filtered_df = self.filter_year(financial_df, stock_code, year)
+                if not filtered_df.empty:
+                    year_data[stock_code] = filtered_df
+        
+        industries = {}
+        for industry_code in industry_codes:
+            node = taxonomy.get_node(industry_code)
+            stock_codes = list(dict.fromkeys(
+                stock_code for third_code in third_levels[industry_code] for stock_code in members[third_code]
+            ))
+            frames = [year_data[code] for code in stock_codes if code in year_data]
+            snapshot = None
+            if frames:
+                snapshot = self.snapshot_store.save(
+                    industry_code, year, pd.concat(frames, ignore_index=True),
+                    industry_name=node['name'],
+                    extra_metadata={'third_level_codes': third_levels[industry_code], 'refresh': 'incremental'}
+                )
+            industries[industry_code] = {
+                'name': node['name'],
+                'stocks': len(stock_codes),
+                'rows': sum(len(frame) for frame in frames),
+                'path': snapshot['path'] if snapshot else None,
+            }
+        
+        summary = {
+            'year': year,
+            'industries': industries,
+            'constituent_changes': constituent_changes,
+            'stocks_total': len(all_stock_codes),
+            'stocks_fetched': len(stale_codes) - len(failed_codes),
+            'stocks_failed': failed_codes,
+        }
+        return summary
+    
+    def refresh_industry_financials(self, industry_name, year, period="按年度"):
+        """增量刷新单个行业，返回新快照的文件路径"""
+        industry_code = self.resolve_industry_code(industry_name)
+        if not industry_code:
+            print(f"未找到行业名称 '{industry_name}' 对应的数据")
+            return None
+        summary = self.refresh_industries([industry_code], year, period)
+        return summary['industries'][industry_code]['path'] if summary else None
+    
+    def refresh_all_industries(self, year, industry_names=None, period="按年度"):
+        """
+        增量刷新全部申万行业：默认刷新所有一级行业（覆盖全部成分股）以及已有该年份快照的行业
+        :param industry_names: 只刷新指定的行业
+        :return: 刷新汇总信息
+        """
+        taxonomy = self.get_taxonomy()
+        if taxonomy is None:
+            return None
+        
+        if industry_names:
+            industry_codes = []
+            for industry_name in industry_names:
+                industry_code = taxonomy.resolve(industry_name)
+                if industry_code:
+                    industry_codes.append(industry_code)
+                else:
+                    print(f"未找到行业名称 '{industry_name}' 对应的数据")
+        else:
+            industry_codes = taxonomy.codes_at_level('一级') + [
+                code for code in self.snapshot_store.list_industries(year) if taxonomy.get_node(code)
+            ]
+        return self.refresh_industries(industry_codes, year, period)
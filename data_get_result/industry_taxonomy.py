@@ -0,0 +1,183 @@
+import pandas as pd
+import re
+import difflib
+import threading
+from collections import OrderedDict
+
+# 申万行业分类的内存层级索引：名称→代码、代码→上级链、层级→子行业
+class IndustryTaxonomy:
+    LEVELS = ['一级', '二级', '三级']
+
+    def __init__(self, mapping_df, aliases=None, resolve_cache_size=1024):
+        """
+        :param mapping_df: merged_sw_industry_info_*.csv 的内容
+        :param aliases: 别名到标准行业名称的映射，如 {'猪肉': '生猪养殖'}
+        :param resolve_cache_size: 名称解析结果的缓存条数上限，超出时淘汰最久未使用的条目
+        """
+        self.nodes = {}            # 代码 -> {'code', 'name', 'level', 'parent'}
+        self.name_index = {}       # 名称 -> 代码列表（按层级从高到低）
+        self.normalized_index = {}  # 规范化名称 -> 代码列表（按层级从高到低）
+        self.level_index = {level: [] for level in self.LEVELS}
+        self.children_index = {}   # 代码 -> 直接子行业代码列表
+        self.third_level_index = {}  # 代码 -> 下属全部三级行业代码列表
+        self.aliases = {}
+        # 解析结果的LRU缓存（长时间运行的服务会收到任意输入的名称，需要限制大小）
+        self._resolve_cache = OrderedDict()
+        self.resolve_cache_size = resolve_cache_size
+        self._lock = threading.Lock()
+
+        self._build(mapping_df)
+        for alias, name in (aliases or {}).items():
+            self.add_alias(alias, name)
+
+    @classmethod
+    def from_csv(cls, mapping_file, aliases=None):
+        """从行业映射CSV文件构建索引"""
+        mapping_df = pd.read_csv(mapping_file, encoding='utf-8-sig', dtype=str)
+        return cls(mapping_df, aliases)
+
+    def _build(self, mapping_df):
+        """逐行读取映射表，一次性建立所有索引"""
+        for row in mapping_df.to_dict('records'):
+            parent_code = None
+            for level in self.LEVELS:
+                code = row.get(f'{level}行业代码')
+                name = row.get(f'{level}行业名称')
+                if pd.isna(code) or pd.isna(name) or str(code).strip() == '':
+                    break
+                code, name = str(code).strip(), str(name).strip()
+
+                if code not in self.nodes:
+                    self.nodes[code] = {'code': code, 'name': name, 'level': level, 'parent': parent_code}
+                    self.name_index.setdefault(name, []).append(code)
+                    self.level_index[level].append(code)
+                    self.children_index.setdefault(code, [])
+                    if parent_code:
+                        self.children_index[parent_code].append(code)
+                parent_code = code
+
+        # 同名行业按层级从高到低排列，与逐级查找的优先级保持一致
+        for name, codes in self.name_index.items():
+            codes.sort(key=self._level_rank)
+            self.normalized_index.setdefault(self.normalize_name(name), []).extend(codes)
+        for codes in self.normalized_index.values():
+            codes.sort(key=self._level_rank)
+
+        # 预先计算每个行业下属的三级行业，查询时无需遍历
+        for code in self.nodes:
+            self.third_level_index[code] = self._collect_third_level(code)
+
+    def _level_rank(self, code):
+        return self.LEVELS.index(self.nodes[code]['level'])
+
+    def _collect_third_level(self, code):
+        if self.nodes[code]['level'] == '三级':
+            return [code]
+        result = []
+        for child in self.children_index.get(code, []):
+            result.extend(self._collect_third_level(child))
+        return result
+
+    @staticmethod
+    def normalize_name(name):
+        """去除空白和申万名称中用于区分层级的罗马数字后缀（如 白酒Ⅱ → 白酒）"""
+        name = re.sub(r'\s+', '', str(name))
+        return re.sub(r'[ⅠⅡⅢ]+$', '', name)
+
+    def add_alias(self, alias, name):
+        """添加别名，name 可以是行业名称或行业代码"""
+        with self._lock:
+            self.aliases[alias] = name
+            self._resolve_cache.clear()
+
+    def resolve(self, industry_name, fuzzy=False):
+        """
+        将行业名称解析为行业代码，依次尝试：精确名称、行业代码、别名、规范化名称，
+        fuzzy 为True时最后尝试模糊匹配（需由调用方显式开启，避免把输错的名称当作另一个行业）
+        :return: 行业代码，无法解析时返回None
+        """
+        cache_key = (industry_name, fuzzy)
+        with self._lock:
+            if cache_key in self._resolve_cache:
+                self._resolve_cache.move_to_end(cache_key)
+                return self._resolve_cache[cache_key]
+
+        code = self._resolve_uncached(industry_name, fuzzy)
+        with self._lock:
+            self._resolve_cache[cache_key] = code
+            while len(self._resolve_cache) > self.resolve_cache_size:
+                self._resolve_cache.popitem(last=False)
+        return code
+
+    def suggest(self, industry_name, n=3):
+        """返回与给定名称最接近的若干行业名称，用于提示"""
+        return difflib.get_close_matches(str(industry_name).strip(), list(self.name_index), n=n, cutoff=0.6)
+
+    def _resolve_uncached(self, industry_name, fuzzy):
+        industry_name = str(industry_name).strip()
+        if industry_name in self.name_index:
+            return self.name_index[industry_name][0]
+        if industry_name in self.nodes:
+            return industry_name
+        if industry_name in self.aliases:
+            return self._resolve_uncached(self.aliases[industry_name], fuzzy=False)
+
+        normalized = self.normalize_name(industry_name)
+        if normalized in self.normalized_index:
+            return self.normalized_index[normalized][0]
+
+        if fuzzy:
+            close = self.suggest(industry_name, n=1)
+            if close:
+                code = self.name_index[close[0]][0]
+                print(f"未精确匹配行业名称 '{industry_name}'，按最接近的 '{close[0]}'（{code}）处理")
+                return code
+
+        return None
+
+    def get_node(self, code):
+        """返回行业节点信息"""
+        return self.nodes.get(code)
+
+    def parent_chain(self, code):
+        """返回从该行业到一级行业的代码链，如 [三级代码, 二级代码, 一级代码]"""
+        chain = []
+        while code:
+            chain.append(code)
+            code = self.nodes[code]['parent']
+        return chain
+
+    def children(self, code):
+        """返回直接子行业代码列表"""
+        return list(self.children_index.get(code, []))
+
+    def codes_at_level(self, level):
+        """返回指定层级（'一级'/'二级'/'三级'）的所有行业代码"""
+        return list(self.level_index.get(level, []))
+
+    def third_level_codes(self, code):
+        """返回该行业下属的全部三级行业代码"""
+        return list(self.third_level_index.get(code, []))
+
+
+# 进程级缓存：每个映射文件只读取一次
+_taxonomy_cache = {}
+_taxonomy_lock = threading.Lock()
+
+
+def get_taxonomy(mapping_file):
+    """返回指定映射文件对应的行业索引，首次调用时构建，加载失败返回None"""
+    taxonomy = _taxonomy_cache.get(mapping_file)
+    if taxonomy is not None:
+        return taxonomy
+
+    with _taxonomy_lock:
+        taxonomy = _taxonomy_cache.get(mapping_file)
+        if taxonomy is None:
+            try:
+                taxonomy = IndustryTaxonomy.from_csv(mapping_file)
+            except Exception as e:
+                print(f"加载行业映射文件失败: {e}")
+                return None
+            _taxonomy_cache[mapping_file] = taxonomy
+    return taxonomy
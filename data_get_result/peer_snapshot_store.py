@@ -0,0 +1,147 @@
+import pandas as pd
+import os
+import json
+import shutil
+import threading
+from datetime import datetime, timedelta
+
+# 按 (行业代码, 年份) 保存同行业财务数据快照，每次保存生成一个新版本
+class PeerSnapshotStore:
+    def __init__(self, store_dir=None, max_age_days=7, keep_versions=5):
+        """
+        :param store_dir: 快照目录，默认为 data_get_result/cache/peer_snapshots
+        :param max_age_days: 快照的默认有效期（天）
+        :param keep_versions: 每个 (行业, 年份) 最多保留的版本数
+        """
+        if store_dir is None:
+            store_dir = os.path.join(
+                os.path.dirname(os.path.abspath(__file__)), 'cache', 'peer_snapshots'
+            )
+        self.store_dir = store_dir
+        self.max_age = timedelta(days=max_age_days)
+        self.keep_versions = keep_versions
+        self._lock = threading.Lock()
+
+    def _snapshot_dir(self, industry_code, year):
+        """快照所在目录，行业代码中的 '.' 替换为 '_'"""
+        return os.path.join(self.store_dir, str(industry_code).replace('.', '_'), str(year))
+
+    def _manifest_path(self, industry_code, year):
+        return os.path.join(self._snapshot_dir(industry_code, year), 'manifest.json')
+
+    def _read_manifest(self, industry_code, year):
+        try:
+            with open(self._manifest_path(industry_code, year), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_manifest(self, industry_code, year, manifest):
+        manifest_path = self._manifest_path(industry_code, year)
+        tmp_path = f"{manifest_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, manifest_path)
+
+    def _with_path(self, industry_code, year, version_info):
+        """为版本信息补充快照文件的绝对路径"""
+        info = dict(version_info)
+        info['path'] = os.path.join(self._snapshot_dir(industry_code, year), info['file'])
+        return info
+
+    def list_versions(self, industry_code, year):
+        """列出指定 (行业, 年份) 的所有快照版本，按版本号升序"""
+        manifest = self._read_manifest(industry_code, year)
+        if not manifest:
+            return []
+        return [self._with_path(industry_code, year, v) for v in manifest['versions']]
+
+    def list_industries(self, year):
+        """列出已有指定年份快照的行业代码"""
+        industries = []
+        if not os.path.isdir(self.store_dir):
+            return industries
+        for entry in sorted(os.listdir(self.store_dir)):
+            try:
+                with open(os.path.join(self.store_dir, entry, str(year), 'manifest.json'), 'r', encoding='utf-8') as f:
+                    industries.append(json.load(f)['industry_code'])
+            except (OSError, ValueError, KeyError):
+                continue
+        return industries
+
+    def is_fresh(self, snapshot_info, max_age_days=None, now=None):
+        """判断快照是否在有效期内"""
+        if not snapshot_info:
+            return False
+        max_age = self.max_age if max_age_days is None else timedelta(days=max_age_days)
+        created_at = datetime.fromisoformat(snapshot_info['created_at'])
+        return (now or datetime.now()) - created_at <= max_age
+
+    def get_latest(self, industry_code, year, max_age_days=None):
+        """
+        查找最新的有效快照
+        :return: 快照信息字典（含 path、version、created_at 等），不存在或已过期时返回None
+        """
+        versions = self.list_versions(industry_code, year)
+        if not versions:
+            return None
+        latest = versions[-1]
+        if not self.is_fresh(latest, max_age_days) or not os.path.exists(latest['path']):
+            return None
+        return latest
+
+    def load(self, snapshot_info):
+        """读取快照数据"""
+        return pd.read_csv(snapshot_info['path'], encoding='utf-8-sig')
+
+    def save(self, industry_code, year, peer_df, industry_name=None, extra_metadata=None):
+        """
+        保存一个新的快照版本
+        :param extra_metadata: 附加到版本信息中的其他元数据
+        :return: 新版本的快照信息字典
+        """
+        snapshot_dir = self._snapshot_dir(industry_code, year)
+        os.makedirs(snapshot_dir, exist_ok=True)
+
+        with self._lock:
+            manifest = self._read_manifest(industry_code, year) or {
+                'industry_code': industry_code,
+                'industry_name': industry_name,
+                'year': int(year),
+                'versions': [],
+            }
+            version = manifest['versions'][-1]['version'] + 1 if manifest['versions'] else 1
+            filename = f"v{version:04d}.csv"
+
+            filepath = os.path.join(snapshot_dir, filename)
+            tmp_path = f"{filepath}.tmp"
+            peer_df.to_csv(tmp_path, index=False, encoding='utf-8-sig')
+            os.replace(tmp_path, filepath)
+
+            version_info = {
+                'version': version,
+                'file': filename,
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+                'rows': len(peer_df),
+                'stock_count': int(peer_df['股票代码'].nunique()) if '股票代码' in peer_df.columns else None,
+            }
+            if extra_metadata:
+                version_info.update(extra_metadata)
+
+            manifest['versions'].append(version_info)
+            manifest['versions'] = self._prune(snapshot_dir, manifest['versions'])
+            self._write_manifest(industry_code, year, manifest)
+
+        return self._with_path(industry_code, year, version_info)
+
+    def _prune(self, snapshot_dir, versions):
+        """只保留最近的 keep_versions 个版本，删除更旧的快照文件"""
+        if self.keep_versions is None or len(versions) <= self.keep_versions:
+            return versions
+        for old in versions[:-self.keep_versions]:
+            old_path = os.path.join(snapshot_dir, old['file'])
+            if os.path.exists(old_path):
+                os.remove(old_path)
+            # 评分阶段生成的列式副本（v0001.columns/）随快照一起删除
+            shutil.rmtree(os.path.splitext(old_path)[0] + '.columns', ignore_errors=True)
+        return versions[-self.keep_versions:]
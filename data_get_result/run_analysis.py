@@ -11,4 +11,7 @@ analyzer = IndustryFinancialAnalyzer()
 analyzer.analyze_industry_financials("农产品加工", 2020)
 
 # 三级行业示例
-# analyzer.analyze_industry_financials("果蔬加工", 2024)
\ No newline at end of file
+# analyzer.analyze_industry_financials("果蔬加工", 2024)
+
+# 多年份示例：每只成分股只请求一次，按年份分别保存快照
+# analyzer.analyze_industry_financials_range("农产品加工", range(2018, 2025))
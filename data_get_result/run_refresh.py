@@ -0,0 +1,39 @@
+"""
+增量刷新申万行业数据（适合每晚定时运行），只重新获取新成分股和可能有新报告的股票
+
+用法:
+    python data_get_result/run_refresh.py                      # 刷新上一年度的全部行业
+    python data_get_result/run_refresh.py --year 2024 --industry 农产品加工 --industry 白酒
+"""
+import json
+import argparse
+from datetime import datetime
+
+from industry_financial_analyzer import IndustryFinancialAnalyzer
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='增量刷新申万行业财务数据')
+    parser.add_argument('--year', type=int, default=datetime.now().year - 1, help='刷新的年份，默认为上一年度')
+    parser.add_argument('--industry', action='append', default=None,
+                        help='只刷新指定行业（可重复），默认刷新全部一级行业及已有快照的行业')
+    parser.add_argument('--summary', default=None, help='刷新汇总JSON的输出路径')
+    args = parser.parse_args(argv)
+
+    analyzer = IndustryFinancialAnalyzer()
+    summary = analyzer.refresh_all_industries(args.year, args.industry)
+    if summary is None:
+        print("增量刷新失败")
+        return None
+
+    for industry in summary['industries'].values():
+        print(f"  {industry['name']}: {industry['stocks']} 只成分股, {industry['rows']} 条记录")
+    if args.summary:
+        with open(args.summary, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        print(f"汇总文件: {args.summary}")
+    return summary
+
+
+if __name__ == '__main__':
+    main()
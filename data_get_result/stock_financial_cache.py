@@ -0,0 +1,154 @@
+import pandas as pd
+import os
+import json
+import threading
+from datetime import datetime, timedelta
+
+# 同花顺财务摘要按 (股票代码, 报告类型) 缓存完整历史，任意年份均可从本地读取
+class StockFinancialCache:
+    # 报告类型到目录名的映射，避免在路径中使用中文
+    PERIOD_DIRS = {
+        "按年度": "annual",
+        "按报告期": "report",
+        "按单季度": "quarter",
+    }
+
+    def __init__(self, cache_dir=None, max_age_days=90, refresh_interval_hours=24):
+        """
+        :param cache_dir: 缓存目录，默认为 data_get_result/cache/stock_financial
+        :param max_age_days: 缓存的最长有效期（天），超过后无条件重新获取
+        :param refresh_interval_hours: 所需年份尚未完成披露时，两次重新获取之间的最小间隔（小时）
+        """
+        if cache_dir is None:
+            cache_dir = os.path.join(
+                os.path.dirname(os.path.abspath(__file__)), 'cache', 'stock_financial'
+            )
+        self.cache_dir = cache_dir
+        self.max_age = timedelta(days=max_age_days)
+        self.refresh_interval = timedelta(hours=refresh_interval_hours)
+        self._lock = threading.Lock()
+
+    def _paths(self, stock_code, period):
+        """返回缓存数据文件和元数据文件的路径"""
+        period_dir = os.path.join(self.cache_dir, self.PERIOD_DIRS.get(period, period))
+        return (
+            os.path.join(period_dir, f"{stock_code}.pkl"),
+            os.path.join(period_dir, f"{stock_code}.json"),
+        )
+
+    @staticmethod
+    def report_year_settled_at(year):
+        """指定年份的年报披露截止日（次年4月30日）之后，该年数据视为不再变化"""
+        return datetime(int(year) + 1, 5, 1)
+
+    def load_metadata(self, stock_code, period="按年度"):
+        """读取缓存元数据，不存在时返回None"""
+        _, meta_path = self._paths(stock_code, period)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def is_fresh(self, metadata, year=None, now=None):
+        """
+        判断缓存对指定年份是否仍然有效
+        :param metadata: 缓存元数据
+        :param year: 需要的年份，为None时只检查最长有效期
+        :param now: 当前时间（便于测试），默认datetime.now()
+        """
+        if not metadata:
+            return False
+        now = now or datetime.now()
+        fetched_at = datetime.fromisoformat(metadata['fetched_at'])
+        age = now - fetched_at
+        if age > self.max_age:
+            return False
+        if year is None:
+            return True
+
+        # 获取时该年份的报告已全部披露，历史数据不会再变化
+        if fetched_at >= self.report_year_settled_at(year):
+            return True
+
+        # 该年份仍处于披露期内，按最小间隔重新获取以拿到新发布的报告
+        return age <= self.refresh_interval
+
+    @staticmethod
+    def covers_year_end(report_period, year):
+        """报告期是否已到达指定年份的年末（年报 '2020'、'2020-12-31' 或之后的报告期）"""
+        if not report_period:
+            return False
+        text = str(report_period)
+        if text[:4] > str(year):
+            return True
+        return text.startswith(str(year)) and (len(text) == 4 or text[5:10] == '12-31')
+
+    def may_have_new_report(self, metadata, year, now=None):
+        """
+        增量刷新时判断缓存是否可能缺少指定年份的新报告：
+        没有缓存、获取时该年报告尚未全部披露且缓存中还没有该年年报，并且距上次获取已超过最小间隔
+        """
+        if not metadata:
+            return True
+        now = now or datetime.now()
+        fetched_at = datetime.fromisoformat(metadata['fetched_at'])
+        if fetched_at >= self.report_year_settled_at(year):
+            return False
+        if self.covers_year_end(metadata.get('latest_report_period'), year):
+            return False
+        return now - fetched_at > self.refresh_interval
+
+    def load_stored(self, stock_code, period="按年度"):
+        """读取已缓存的完整财务历史（不检查有效期），不存在时返回None"""
+        data_path, _ = self._paths(stock_code, period)
+        try:
+            return pd.read_pickle(data_path)
+        except Exception:
+            return None
+
+    def load(self, stock_code, period="按年度", year=None):
+        """读取缓存的完整财务历史，缓存缺失或已失效时返回None"""
+        data_path, _ = self._paths(stock_code, period)
+        metadata = self.load_metadata(stock_code, period)
+        if not self.is_fresh(metadata, year):
+            return None
+        try:
+            return pd.read_pickle(data_path)
+        except Exception:
+            return None
+
+    def save(self, stock_code, financial_df, period="按年度"):
+        """保存完整财务历史及元数据，使用临时文件替换保证写入的原子性"""
+        data_path, meta_path = self._paths(stock_code, period)
+        os.makedirs(os.path.dirname(data_path), exist_ok=True)
+
+        report_periods = []
+        if '报告期' in financial_df.columns:
+            report_periods = sorted(financial_df['报告期'].astype(str).unique().tolist())
+
+        metadata = {
+            'stock_code': stock_code,
+            'period': period,
+            'fetched_at': datetime.now().isoformat(timespec='seconds'),
+            'rows': len(financial_df),
+            'latest_report_period': report_periods[-1] if report_periods else None,
+        }
+
+        with self._lock:
+            tmp_data_path = f"{data_path}.{threading.get_ident()}.tmp"
+            financial_df.to_pickle(tmp_data_path)
+            os.replace(tmp_data_path, data_path)
+
+            tmp_meta_path = f"{meta_path}.{threading.get_ident()}.tmp"
+            with open(tmp_meta_path, 'w', encoding='utf-8') as f:
+                json.dump(metadata, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_meta_path, meta_path)
+
+        return metadata
+
+    def invalidate(self, stock_code, period="按年度"):
+        """删除指定股票的缓存"""
+        for path in self._paths(stock_code, period):
+            if os.path.exists(path):
+                os.remove(path)
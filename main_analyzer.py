@@ -1,45 +1,93 @@
 # 在文件开头添加akshare导入
 import os
 import sys
+import csv
 import json
+import time
 import shutil
+import argparse
 import subprocess
 from pathlib import Path
 from datetime import datetime
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 import akshare as ak
 
 
-# 导入各模块
-sys.path.append('PDFdata_to_json')
-sys.path.append('data_get_result')
-sys.path.append('analysis_and_scoring')
+# 导入各模块（按本文件所在目录定位，不依赖当前工作目录）
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(PROJECT_ROOT, 'PDFdata_to_json'))
+sys.path.append(os.path.join(PROJECT_ROOT, 'data_get_result'))
+sys.path.append(os.path.join(PROJECT_ROOT, 'analysis_and_scoring'))
 
 from PDFdata_to_json.financial_analyzer import FinancialAnalyzer
 from PDFdata_to_json.config import DEEPSEEK_API_KEY
+from PDFdata_to_json.pdf_page_filter import PdfPageFilter
+from PDFdata_to_json.extraction_cache import MinerUOutputCache
+from PDFdata_to_json.mineru_worker_pool import MinerUWorkerPool
 from data_get_result.industry_financial_analyzer import IndustryFinancialAnalyzer
 from analysis_and_scoring.financial_comparison_analyzer import FinancialComparisonAnalyzer
+from columnar_peer_store import ColumnarPeerStore
+from pipeline_metrics import PipelineMetrics, file_size
+from pipeline_graph import PipelineGraph
+from record_replay import (
+    CallArchive, RecordingDataSource, ReplayDataSource, RecordingOpenAIClient, ReplayOpenAIClient
+)
+from stock_financial_cache import StockFinancialCache
+from concurrent_fetcher import ConcurrentFetcher
+from peer_snapshot_store import PeerSnapshotStore
+from constituent_cache import ConstituentCache
+from llm_result_cache import LLMResultCache
 
 class IntegratedFinancialAnalyzer:
-    def __init__(self):
+    def __init__(self, industry_analyzer=None, page_filter=None, extraction_cache=None,
+                 mineru_pool=None, mineru_device="cpu", metrics=None, llm_client=None,
+                 llm_result_cache=None, output_dir=None, llm_streaming=False, llm_bypass_cache=False):
         self.temp_dir = None
         self.cleanup_files = []
+        # 可在多个分析流程之间共享的行业分析器（共享限流器和缓存）
+        self.industry_analyzer = industry_analyzer
+        # PDF页面预筛选：只让MinerU处理合并报表及附注所在页
+        self.page_filter = page_filter or PdfPageFilter()
+        # MinerU输出缓存（按PDF哈希和提取参数），不在临时目录中，不会被清理
+        self.extraction_cache = extraction_cache or MinerUOutputCache()
+        # 常驻的MinerU工作进程池（可选），未提供或不可用时按命令行方式逐个提取
+        self.mineru_pool = mineru_pool
+        self.mineru_device = mineru_pool.device if mineru_pool else mineru_device
+        # 各阶段的耗时和资源使用记录
+        self.metrics = metrics or PipelineMetrics()
+        # OpenAI兼容的客户端（可选），默认使用config.py中的DeepSeek密钥创建
+        self.llm_client = llm_client
+        # 模型结果缓存（可选），默认使用 PDFdata_to_json/cache/llm_results
+        self.llm_result_cache = llm_result_cache
+        # 同行业数据的列式副本，快照生成时即转换类型，评分时直接内存映射读取
+        self.peer_store = ColumnarPeerStore()
+        # 报告输出目录，默认为当前工作目录
+        self.output_dir = output_dir
+        # 是否以流式方式调用模型（逐个解析指标分组，输出偏离格式时提前中止）
+        self.llm_streaming = llm_streaming
+        # 是否忽略已缓存的模型结果，强制调用模型（新结果仍会写入缓存）
+        self.llm_bypass_cache = llm_bypass_cache
+        self.last_error = None
         
     def setup_temp_directory(self):
         """创建临时工作目录"""
         self.temp_dir = tempfile.mkdtemp(prefix='finance_analysis_')
+        self.cleanup_files = []
         print(f"创建临时工作目录: {self.temp_dir}")
         
-    def cleanup_temp_files(self):
-        """清理所有临时文件和目录"""
+    def cleanup_temp_files(self, temp_dir=None, cleanup_files=None):
+        """清理所有临时文件和目录，默认清理当前流程的临时目录"""
+        temp_dir = temp_dir or self.temp_dir
+        cleanup_files = self.cleanup_files if cleanup_files is None else cleanup_files
         try:
             # 清理临时目录
-            if self.temp_dir and os.path.exists(self.temp_dir):
-                shutil.rmtree(self.temp_dir)
-                print(f"已清理临时目录: {self.temp_dir}")
+            if temp_dir and os.path.exists(temp_dir):
+                shutil.rmtree(temp_dir)
+                print(f"已清理临时目录: {temp_dir}")
             
             # 清理其他中间文件
-            for file_path in self.cleanup_files:
+            for file_path in cleanup_files:
                 if os.path.exists(file_path):
                     if os.path.isfile(file_path):
                         os.remove(file_path)
@@ -50,35 +98,95 @@ class IntegratedFinancialAnalyzer:
         except Exception as e:
             print(f"清理文件时出错: {e}")
     
+    def cleanup_after(self, pipeline):
+        """
+        清理本次流程的临时文件；流水线失败后仍有脱离的阶段（MinerU提取、模型调用）在运行时，
+        等这些阶段结束后再清理，避免删除它们正在写入的临时目录
+        """
+        temp_dir, cleanup_files = self.temp_dir, self.cleanup_files
+        
+        def cleanup():
+            print("\n=== 清理临时文件 ===")
+            self.cleanup_temp_files(temp_dir, cleanup_files)
+            print("清理完成")
+        
+        if pipeline is None:
+            cleanup()
+        else:
+            pipeline.call_when_idle(cleanup)
+    
+    def run_mineru_cli(self, pdf_path, output_dir):
+        """以命令行方式运行MinerU（每次调用都会重新加载模型），返回markdown文件路径"""
+        # 激活虚拟环境并运行mineru
+        if os.name == 'nt':  # Windows
+            activate_cmd = r"myenv\Scripts\activate.bat"
+            cmd = f"{activate_cmd} && mineru -p \"{pdf_path}\" -o \"{output_dir}\" -d {self.mineru_device}"
+        else:  # Linux/macOS
+            activate_cmd = "source myenv/bin/activate"
+            cmd = f"{activate_cmd} && mineru -p '{pdf_path}' -o '{output_dir}' -d {self.mineru_device}"
+        
+        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, cwd=os.getcwd())
+        if result.returncode != 0:
+            raise Exception(f"MinerU执行失败: {result.stderr}")
+        
+        # 查找生成的markdown文件
+        markdown_files = list(Path(output_dir).rglob("*.md"))
+        if not markdown_files:
+            raise Exception("未找到生成的markdown文件")
+        return str(markdown_files[0])
+    
     def extract_pdf_content(self, pdf_path):
         """使用MinerU提取PDF内容"""
         print("步骤1: 提取PDF内容...")
         
+        with self.metrics.stage('mineru_extraction') as stage:
+            stage['bytes_read'] = file_size(pdf_path)
+            markdown_path = self._extract_pdf_content(pdf_path)
+            if markdown_path:
+                stage['bytes_written'] = file_size(markdown_path)
+            else:
+                stage['status'] = 'error'
+            return markdown_path
+    
+    def _extract_pdf_content(self, pdf_path):
+        """按缓存→页面预筛选→MinerU的顺序提取，返回markdown文件路径，失败时返回None"""
+        # 相同PDF、MinerU版本和提取参数的结果直接复用
+        cache_options = {'device': self.mineru_device, 'page_filter': vars(self.page_filter)}
+        try:
+            cache_key = self.extraction_cache.make_key(pdf_path, cache_options)
+        except OSError as e:
+            print(f"PDF提取失败: {e}")
+            return None
+        # 复制到本任务的临时目录，缓存条目被并发任务淘汰时不影响后续读取
+        cached_markdown = self.extraction_cache.get(cache_key, copy_to=os.path.join(self.temp_dir, "cached_output"))
+        if cached_markdown:
+            print(f"命中MinerU输出缓存，跳过PDF提取: {cached_markdown}")
+            return cached_markdown
+        
         # 创建输出目录
         output_dir = os.path.join(self.temp_dir, "pdf_output")
         os.makedirs(output_dir, exist_ok=True)
         
-        # 激活虚拟环境并运行mineru
-        if os.name == 'nt':  # Windows
-            activate_cmd = r"myenv\Scripts\activate.bat"
-            cmd = f"{activate_cmd} && mineru -p \"{pdf_path}\" -o \"{output_dir}\" -d cuda"
-        else:  # Linux/macOS
-            activate_cmd = "source myenv/bin/activate"
-            cmd = f"{activate_cmd} && mineru -p '{pdf_path}' -o '{output_dir}' -d cuda"
+        # 扫描文字层，只提取报表相关页；扫描件或无法识别时处理全文
+        source_pdf = pdf_path
+        pdf_path, pages = self.page_filter.prepare(pdf_path, self.temp_dir)
         
         try:
-            result = subprocess.run(cmd, shell=True, capture_output=True, text=True, cwd=os.getcwd())
-            if result.returncode != 0:
-                raise Exception(f"MinerU执行失败: {result.stderr}")
-            
-            # 查找生成的markdown文件
-            markdown_files = list(Path(output_dir).rglob("*.md"))
-            if not markdown_files:
-                raise Exception("未找到生成的markdown文件")
-            
-            markdown_path = str(markdown_files[0])
+            if self.mineru_pool is not None and self.mineru_pool.is_available():
+                markdown_path = self.mineru_pool.extract(pdf_path, output_dir)
+            else:
+                markdown_path = self.run_mineru_cli(pdf_path, output_dir)
             self.cleanup_files.append(output_dir)
             print(f"PDF内容提取完成: {markdown_path}")
+            
+            # 继续使用本任务输出目录中的markdown，缓存副本可能被其他任务淘汰
+            try:
+                self.extraction_cache.put(cache_key, output_dir, markdown_path, {
+                    'source_pdf': os.path.basename(source_pdf),
+                    'pages': pages,
+                })
+            except OSError as e:
+                print(f"写入MinerU输出缓存失败: {e}")
             return markdown_path
             
         except Exception as e:
@@ -89,25 +197,35 @@ class IntegratedFinancialAnalyzer:
         """分析财务数据"""
         print("步骤2: 分析财务数据...")
         
-        if DEEPSEEK_API_KEY == "your_deepseek_api_key_here":
+        if self.llm_client is None and DEEPSEEK_API_KEY == "your_deepseek_api_key_here":
             raise Exception("请先在config.py中配置DeepSeek API密钥")
         
-        analyzer = FinancialAnalyzer(DEEPSEEK_API_KEY)
-        
-        # 读取markdown内容
-        content = analyzer.read_markdown_content(markdown_path)
-        if not content:
-            raise Exception("读取markdown文件失败")
-        
-        # 分析财务数据
-        analysis_result = analyzer.analyze_financial_data(content)
-        if not analysis_result:
-            raise Exception("财务数据分析失败")
+        analyzer = FinancialAnalyzer(
+            DEEPSEEK_API_KEY,
+            result_cache=self.llm_result_cache,
+            use_streaming=self.llm_streaming,
+            client=self.llm_client,
+            bypass_cache=self.llm_bypass_cache,
+        )
         
-        # 保存分析结果到临时文件
-        json_path = os.path.join(self.temp_dir, "financial_analysis.json")
-        with open(json_path, 'w', encoding='utf-8') as f:
-            f.write(analysis_result)
+        with self.metrics.stage('llm_analysis') as stage:
+            # 读取markdown内容
+            content = analyzer.read_markdown_content(markdown_path)
+            if not content:
+                raise Exception("读取markdown文件失败")
+            stage['bytes_read'] = file_size(markdown_path)
+            
+            # 分析财务数据
+            analysis_result = analyzer.analyze_financial_data(content)
+            stage.update(analyzer.token_usage)
+            if not analysis_result:
+                raise Exception("财务数据分析失败")
+            
+            # 保存分析结果到临时文件
+            json_path = os.path.join(self.temp_dir, "financial_analysis.json")
+            with open(json_path, 'w', encoding='utf-8') as f:
+                f.write(analysis_result)
+            stage['bytes_written'] = file_size(json_path)
         
         self.cleanup_files.append(json_path)
         print("财务数据分析完成")
@@ -117,50 +235,170 @@ class IntegratedFinancialAnalyzer:
         """获取行业数据"""
         print(f"步骤3: 获取{industry_name}行业{year}年数据...")
         
-        industry_analyzer = IndustryFinancialAnalyzer()
+        industry_analyzer = self.industry_analyzer or IndustryFinancialAnalyzer()
         
-        # 分析行业财务数据
-        csv_path = industry_analyzer.analyze_industry_financials(industry_name, year)
-        if not csv_path or not os.path.exists(csv_path):
-            raise Exception(f"获取{industry_name}行业数据失败")
+        with self.metrics.stage('industry_fetch', industry=industry_name, year=year) as stage:
+            # 优先使用已有的有效快照
+            snapshot = industry_analyzer.get_industry_snapshot(industry_name, year)
+            if snapshot:
+                print(f"使用已有行业快照 v{snapshot['version']}（生成于 {snapshot['created_at']}）")
+                stage['snapshot_hit'] = True
+                return snapshot['path']
+            
+            # 分析行业财务数据（结果保存为可复用的快照，不加入清理列表）
+            # 批量模式下多个流程共享请求器，只统计本次获取发出的请求
+            with industry_analyzer.fetcher.count_requests() as counter:
+                csv_path = industry_analyzer.analyze_industry_financials(industry_name, year, use_snapshot=False)
+            stage['akshare_calls'] = counter.count
+            if not csv_path or not os.path.exists(csv_path):
+                raise Exception(f"获取{industry_name}行业数据失败")
+            self.ingest_peer_data(csv_path)
+            stage['bytes_written'] = file_size(csv_path)
         
-        self.cleanup_files.append(csv_path)
         print(f"行业数据获取完成: {csv_path}")
         return csv_path
     
-    def generate_comparison_report(self, company_json_path, industry_csv_path, company_name, industry_name, year):
-        """生成对比分析报告"""
-        print("步骤4: 生成对比分析报告...")
+    def ingest_peer_data(self, csv_path):
+        """把同行业快照转换为带类型的列式副本（已是最新时跳过），转换失败不影响流程，评分时会再次尝试"""
+        if self.peer_store.is_current(csv_path):
+            return
+        try:
+            self.peer_store.ingest(csv_path)
+        except Exception as e:
+            print(f"同行业数据列式转换失败: {e}")
+    
+    def get_industry_data_range(self, industry_name, years):
+        """获取行业多个年份的数据，每只成分股只请求一次，返回 {年份: CSV路径}"""
+        print(f"步骤3: 获取{industry_name}行业{years[0]}-{years[-1]}年数据...")
         
-        comparison_analyzer = FinancialComparisonAnalyzer()
+        industry_analyzer = self.industry_analyzer or IndustryFinancialAnalyzer()
         
-        # 加载公司数据
-        company_data = comparison_analyzer.load_target_company_data(company_json_path)
+        with self.metrics.stage('industry_fetch', industry=industry_name, year=f"{years[0]}-{years[-1]}") as stage:
+            with industry_analyzer.fetcher.count_requests() as counter:
+                csv_paths = industry_analyzer.analyze_industry_financials_range(industry_name, years)
+            stage['akshare_calls'] = counter.count
+            if not csv_paths:
+                raise Exception(f"获取{industry_name}行业数据失败")
+            for csv_path in csv_paths.values():
+                self.ingest_peer_data(csv_path)
+            stage['bytes_written'] = sum(file_size(path) for path in csv_paths.values())
         
-        # 加载行业数据
-        industry_data = comparison_analyzer.load_industry_data(industry_csv_path)
+        missing_years = [year for year in years if year not in csv_paths]
+        if missing_years:
+            print(f"以下年份没有行业数据，将不参与对比: {missing_years}")
+        print(f"行业数据获取完成: {len(csv_paths)} 个年份")
+        return csv_paths
+    
+    def collect_industry_futures(self, industry_name, industry_data_futures):
+        """
+        等待各年份已提交的行业数据获取任务，返回 {年份: CSV路径}
+        :param industry_data_futures: {年份: Future}，获取失败的年份不参与对比
+        """
+        csv_paths = {}
+        missing_years = []
+        for year, future in sorted(industry_data_futures.items()):
+            try:
+                csv_paths[year] = future.result()
+            except Exception as e:
+                print(f"{year}年行业数据获取失败: {e}")
+                missing_years.append(year)
+        if not csv_paths:
+            raise Exception(f"获取{industry_name}行业数据失败")
+        if missing_years:
+            print(f"以下年份没有行业数据，将不参与对比: {missing_years}")
+        return csv_paths
+    
+    def generate_trend_report(self, company_json_path, industry_csv_paths, company_name, industry_name):
+        """生成多年份趋势报告"""
+        print("步骤4: 生成多年份趋势报告...")
         
-        # 生成报告
-        report_content = comparison_analyzer.generate_comparison_report(
-            company_data, industry_data, company_name, industry_name, year
-        )
+        comparison_analyzer = FinancialComparisonAnalyzer(self.peer_store)
+        
+        with self.metrics.stage('scoring') as stage:
+            company_data = comparison_analyzer.load_target_company_data(company_json_path)
+            industry_data_by_year = {
+                year: comparison_analyzer.load_industry_data(path) for year, path in industry_csv_paths.items()
+            }
+            stage['bytes_read'] = file_size(company_json_path) + sum(
+                file_size(path) for path in industry_csv_paths.values()
+            )
+        
+        with self.metrics.stage('rendering') as stage:
+            report_content = comparison_analyzer.generate_trend_report(
+                company_data, industry_data_by_year, company_name, industry_name
+            )
+            
+            years = sorted(industry_csv_paths)
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            report_filename = f"财务趋势报告_{company_name}_{industry_name}_{years[0]}-{years[-1]}_{timestamp}.md"
+            report_path = os.path.join(self.output_dir or os.getcwd(), report_filename)
+            
+            with open(report_path, 'w', encoding='utf-8') as f:
+                f.write(report_content)
+            stage['bytes_written'] = file_size(report_path)
+        
+        print(f"趋势报告生成完成: {report_path}")
+        return report_path
+    
+    def generate_comparison_report(self, company_json_path, industry_csv_path, company_name, industry_name, year):
+        """生成对比分析报告"""
+        print("步骤4: 生成对比分析报告...")
         
-        # 保存最终报告
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        report_filename = f"财务分析报告_{company_name}_{industry_name}_{year}_{timestamp}.md"
-        report_path = os.path.join(os.getcwd(), report_filename)
+        comparison_analyzer = FinancialComparisonAnalyzer(self.peer_store)
         
-        with open(report_path, 'w', encoding='utf-8') as f:
-            f.write(report_content)
+        with self.metrics.stage('scoring') as stage:
+            # 加载公司数据
+            company_data = comparison_analyzer.load_target_company_data(company_json_path)
+            
+            # 加载行业数据
+            industry_data = comparison_analyzer.load_industry_data(industry_csv_path)
+            stage['bytes_read'] = file_size(company_json_path) + file_size(industry_csv_path)
+            
+            percentile_index = comparison_analyzer.build_percentile_index(industry_data)
+        
+        with self.metrics.stage('rendering') as stage:
+            # 生成报告
+            report_content = comparison_analyzer.generate_comparison_report(
+                company_data, industry_data, company_name, industry_name, year,
+                percentile_index=percentile_index
+            )
+            
+            # 保存最终报告
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            report_filename = f"财务分析报告_{company_name}_{industry_name}_{year}_{timestamp}.md"
+            report_path = os.path.join(self.output_dir or os.getcwd(), report_filename)
+            
+            with open(report_path, 'w', encoding='utf-8') as f:
+                f.write(report_content)
+            stage['bytes_written'] = file_size(report_path)
         
         print(f"分析报告生成完成: {report_path}")
         return report_path
     
-    def run_complete_analysis(self, pdf_path, industry_name, year, company_name=None):
-        """运行完整的分析流程"""
+    def make_extract_stage(self, pdf_path, markdown_path=None):
+        """返回流水线的步骤1：已提供markdown时直接使用，否则从PDF提取"""
+        def extract_stage():
+            if markdown_path:
+                print("步骤1: 使用已提供的markdown，跳过PDF提取")
+                return markdown_path
+            extracted_path = self.extract_pdf_content(pdf_path)
+            if not extracted_path:
+                raise Exception("PDF内容提取失败")
+            return extracted_path
+        return extract_stage
+    
+    def run_complete_analysis(self, pdf_path, industry_name, year, company_name=None, industry_data_future=None,
+                              markdown_path=None):
+        """
+        运行完整的分析流程
+        industry_data_future: 可选，已提交的行业数据获取任务（Future），提供时不再单独获取行业数据
+        markdown_path: 可选，已提取好的报表markdown，提供时跳过PDF提取（pdf_path 可为None）
+        """
+        self.last_error = None
+        pipeline = None
         try:
             print("=== 开始财务分析流程 ===")
-            print(f"PDF文件: {pdf_path}")
+            print(f"PDF文件: {pdf_path}" if not markdown_path else f"Markdown文件: {markdown_path}")
             print(f"对比行业: {industry_name}")
             print(f"分析年份: {year}")
             
@@ -169,23 +407,26 @@ class IntegratedFinancialAnalyzer:
             
             # 如果没有提供公司名称，从PDF文件名提取
             if not company_name:
-                company_name = Path(pdf_path).stem
+                company_name = Path(pdf_path or markdown_path).stem
             
-            # 步骤1: 提取PDF内容
-            markdown_path = self.extract_pdf_content(pdf_path)
-            if not markdown_path:
-                raise Exception("PDF内容提取失败")
+            # 步骤1→2（PDF提取、财务分析）与步骤3（行业数据）互不依赖，并发执行后在步骤4汇合
+            extract_stage = self.make_extract_stage(pdf_path, markdown_path)
             
-            # 步骤2: 分析财务数据
-            json_path = self.analyze_financial_data(markdown_path)
+            def report_stage(json_path, csv_path):
+                return self.generate_comparison_report(
+                    json_path, csv_path, company_name, industry_name, year
+                )
             
-            # 步骤3: 获取行业数据
-            csv_path = self.get_industry_data(industry_name, year)
+            pipeline = PipelineGraph()
+            pipeline.add_stage('markdown', extract_stage)
+            pipeline.add_stage('company_json', self.analyze_financial_data, depends_on=['markdown'])
+            if industry_data_future is not None:
+                pipeline.add_stage('industry_csv', industry_data_future.result)
+            else:
+                pipeline.add_stage('industry_csv', lambda: self.get_industry_data(industry_name, year))
+            pipeline.add_stage('report', report_stage, depends_on=['company_json', 'industry_csv'])
             
-            # 步骤4: 生成对比报告
-            report_path = self.generate_comparison_report(
-                json_path, csv_path, company_name, industry_name, year
-            )
+            report_path = pipeline.run()['report']
             
             print("=== 分析流程完成 ===")
             print(f"最终报告: {report_path}")
@@ -194,34 +435,408 @@ class IntegratedFinancialAnalyzer:
             
         except Exception as e:
             print(f"分析过程中出错: {e}")
+            self.last_error = str(e)
             return None
         
         finally:
-            # 清理所有临时文件
-            print("\n=== 清理临时文件 ===")
-            self.cleanup_temp_files()
-            print("清理完成")
+            # 清理所有临时文件（有脱离的阶段仍在运行时，在其结束后清理）
+            self.cleanup_after(pipeline)
+            try:
+                self.metrics.write_prometheus()
+            except OSError as e:
+                print(f"写入Prometheus指标文件失败: {e}")
+
+    def run_trend_analysis(self, pdf_path, industry_name, years, company_name=None, markdown_path=None,
+                           industry_data_futures=None):
+        """
+        运行多年份趋势分析：公司指标与每一年的同行业分布分别对比
+        :param years: 年份列表，同行业数据每只股票只获取一次
+        :param markdown_path: 可选，已提取好的报表markdown，提供时跳过PDF提取
+        :param industry_data_futures: 可选，{年份: 已提交的行业数据获取任务（Future）}，提供时不再单独获取行业数据
+        """
+        self.last_error = None
+        years = sorted(set(years))
+        pipeline = None
+        try:
+            print("=== 开始财务趋势分析流程 ===")
+            print(f"PDF文件: {pdf_path}" if not markdown_path else f"Markdown文件: {markdown_path}")
+            print(f"对比行业: {industry_name}")
+            print(f"分析年份: {years[0]}-{years[-1]}")
+            
+            self.setup_temp_directory()
+            
+            if not company_name:
+                company_name = Path(pdf_path or markdown_path).stem
+            
+            extract_stage = self.make_extract_stage(pdf_path, markdown_path)
+            
+            def report_stage(json_path, csv_paths):
+                return self.generate_trend_report(json_path, csv_paths, company_name, industry_name)
+            
+            pipeline = PipelineGraph()
+            pipeline.add_stage('markdown', extract_stage)
+            pipeline.add_stage('company_json', self.analyze_financial_data, depends_on=['markdown'])
+            if industry_data_futures is not None:
+                pipeline.add_stage('industry_csvs', lambda: self.collect_industry_futures(industry_name, industry_data_futures))
+            else:
+                pipeline.add_stage('industry_csvs', lambda: self.get_industry_data_range(industry_name, years))
+            pipeline.add_stage('report', report_stage, depends_on=['company_json', 'industry_csvs'])
+            
+            report_path = pipeline.run()['report']
+            
+            print("=== 趋势分析流程完成 ===")
+            print(f"最终报告: {report_path}")
+            
+            return report_path
+            
+        except Exception as e:
+            print(f"分析过程中出错: {e}")
+            self.last_error = str(e)
+            return None
+        
+        finally:
+            self.cleanup_after(pipeline)
+            try:
+                self.metrics.write_prometheus()
+            except OSError as e:
+                print(f"写入Prometheus指标文件失败: {e}")
+
+class RecordReplaySession:
+    """
+    录制/回放会话：录制时包装真实的akshare和DeepSeek客户端并把结果写入存档，回放时只读存档、不访问网络
+    个股财务、成分股、行业快照和模型结果缓存都放在临时目录中，保证每次外部调用都经过录制/回放层
+    """
+    
+    def __init__(self, mode, archive_path, latency=None):
+        """
+        :param mode: 'record' 或 'replay'
+        :param archive_path: 存档路径
+        :param latency: 回放时的模拟延迟：None 不等待，'recorded' 使用录制时的耗时，数字为固定秒数
+        """
+        self.mode = mode
+        self.archive = CallArchive(archive_path, 'w' if mode == 'record' else 'r')
+        self.cache_dir = tempfile.mkdtemp(prefix='finance_record_replay_')
+        
+        if mode == 'record':
+            data_source = RecordingDataSource(ak, self.archive)
+            self.llm_client = RecordingOpenAIClient(FinancialAnalyzer(DEEPSEEK_API_KEY).client, self.archive)
+            fetcher = ConcurrentFetcher()
+        else:
+            data_source = ReplayDataSource(self.archive, latency)
+            self.llm_client = ReplayOpenAIClient(self.archive, latency)
+            # 回放不需要遵守接口限流
+            fetcher = ConcurrentFetcher(requests_per_second=0)
+        
+        self.industry_analyzer = IndustryFinancialAnalyzer(
+            financial_cache=StockFinancialCache(os.path.join(self.cache_dir, 'stock_financial')),
+            fetcher=fetcher,
+            snapshot_store=PeerSnapshotStore(os.path.join(self.cache_dir, 'peer_snapshots')),
+            constituent_cache=ConstituentCache(os.path.join(self.cache_dir, 'constituents.json')),
+            data_source=data_source,
+        )
+        self.llm_result_cache = LLMResultCache(os.path.join(self.cache_dir, 'llm_results'))
+    
+    def create_analyzer(self, llm_streaming=False, mineru_pool=None, mineru_device="cpu", llm_bypass_cache=False):
+        """创建使用本会话数据源和模型客户端的分析器"""
+        return IntegratedFinancialAnalyzer(
+            self.industry_analyzer,
+            mineru_pool=mineru_pool,
+            mineru_device=mineru_device,
+            llm_client=self.llm_client,
+            llm_result_cache=self.llm_result_cache,
+            llm_streaming=llm_streaming,
+            llm_bypass_cache=llm_bypass_cache,
+        )
+    
+    def close(self):
+        self.archive.close()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        if self.mode == 'record':
+            print(f"已录制 {self.archive.recorded} 条外部调用到: {self.archive.path}")
+        else:
+            print(f"已从存档回放 {self.archive.replayed} 条外部调用: {self.archive.path}")
+
+class BatchFinancialAnalyzer:
+    """批量分析：每个不同的 (行业, 年份) 只获取一次同行业数据，多个PDF并发提取和评分"""
+    
+    def __init__(self, max_workers=2, industry_workers=2, mineru_device="cpu", mineru_workers=None,
+                 mineru_timeout=600, metrics_file=None, prometheus_file=None, llm_streaming=False,
+                 mineru_python=None, llm_bypass_cache=False):
+        self.max_workers = max_workers
+        self.industry_workers = industry_workers
+        # 所有条目共享同一个行业分析器，从而共享全局限流器和本地缓存
+        self.industry_analyzer = IndustryFinancialAnalyzer()
+        self.extraction_cache = MinerUOutputCache()
+        # 所有条目共享常驻的MinerU工作进程池，模型在每个进程中只加载一次
+        self.mineru_pool = MinerUWorkerPool(
+            device=mineru_device,
+            workers=mineru_workers,
+            job_timeout=mineru_timeout,
+            python_executable=mineru_python,
+        )
+        # 所有条目的阶段指标写入同一个文件
+        self.metrics = PipelineMetrics(metrics_file, prometheus_file)
+        self.llm_streaming = llm_streaming
+        self.llm_bypass_cache = llm_bypass_cache
+        self.industry_timings = {}
+    
+    def _new_analyzer(self):
+        """创建共享行业分析器、提取缓存、MinerU进程池和指标记录的单项分析器"""
+        return IntegratedFinancialAnalyzer(
+            self.industry_analyzer,
+            extraction_cache=self.extraction_cache,
+            mineru_pool=self.mineru_pool,
+            metrics=self.metrics,
+            llm_streaming=self.llm_streaming,
+            llm_bypass_cache=self.llm_bypass_cache,
+        )
+    
+    @staticmethod
+    def load_manifest(manifest_path):
+        """
+        读取批量任务清单，支持CSV（列: pdf,industry,year[,company]）或JSON（同名字段的对象列表）
+        """
+        if manifest_path.lower().endswith('.json'):
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                rows = json.load(f)
+        else:
+            with open(manifest_path, 'r', encoding='utf-8-sig', newline='') as f:
+                rows = list(csv.DictReader(f))
+        
+        items = []
+        for row in rows:
+            items.append({
+                'pdf': row['pdf'],
+                'industry': row['industry'],
+                'year': int(row['year']),
+                'company': row.get('company') or None,
+            })
+        return items
+    
+    def _fetch_industry(self, industry_name, year):
+        """获取一个 (行业, 年份) 的同行业数据并记录耗时"""
+        start = time.perf_counter()
+        try:
+            analyzer = self._new_analyzer()
+            return analyzer.get_industry_data(industry_name, year)
+        finally:
+            self.industry_timings[(industry_name, year)] = time.perf_counter() - start
+    
+    def _analyze_item(self, item, industry_future):
+        """分析单个PDF并返回结果记录"""
+        start = time.perf_counter()
+        record = dict(item)
+        if not os.path.exists(item['pdf']):
+            record.update(status='failed', report=None, error=f"PDF文件不存在 - {item['pdf']}")
+        else:
+            analyzer = self._new_analyzer()
+            report_path = analyzer.run_complete_analysis(
+                item['pdf'], item['industry'], item['year'], item['company'],
+                industry_data_future=industry_future
+            )
+            record.update(
+                status='success' if report_path else 'failed',
+                report=report_path,
+                error=analyzer.last_error,
+            )
+        record['elapsed_seconds'] = round(time.perf_counter() - start, 3)
+        return record
+    
+    def run(self, items):
+        """执行批量分析并返回汇总信息"""
+        start = time.perf_counter()
+        self.industry_timings = {}
+        
+        # 每个不同的 (行业, 年份) 只提交一次获取任务
+        industry_keys = list(dict.fromkeys(
+            (item['industry'], item['year']) for item in items if os.path.exists(item['pdf'])
+        ))
+        print(f"=== 批量分析: {len(items)} 个PDF, {len(industry_keys)} 组行业数据 ===")
+        
+        with ThreadPoolExecutor(max_workers=self.industry_workers) as industry_executor, \
+                ThreadPoolExecutor(max_workers=self.max_workers) as item_executor:
+            industry_futures = {
+                key: industry_executor.submit(self._fetch_industry, *key) for key in industry_keys
+            }
+            item_futures = [
+                item_executor.submit(self._analyze_item, item, industry_futures.get((item['industry'], item['year'])))
+                for item in items
+            ]
+            results = [future.result() for future in item_futures]
+            
+            industries = []
+            for (industry_name, year), future in industry_futures.items():
+                error = future.exception()
+                industries.append({
+                    'industry': industry_name,
+                    'year': year,
+                    'status': 'failed' if error else 'success',
+                    'csv': None if error else future.result(),
+                    'error': str(error) if error else None,
+                    'elapsed_seconds': round(self.industry_timings.get((industry_name, year), 0.0), 3),
+                })
+        
+        success_count = sum(1 for r in results if r['status'] == 'success')
+        self.metrics.write_prometheus()
+        return {
+            'total': len(results),
+            'success': success_count,
+            'failed': len(results) - success_count,
+            'elapsed_seconds': round(time.perf_counter() - start, 3),
+            'industries': industries,
+            'items': results,
+            'stages': self.metrics.summary(),
+        }
+    
+    @staticmethod
+    def print_summary(summary):
+        """打印批量分析汇总"""
+        print("\n=== 批量分析完成 ===")
+        print(f"成功: {summary['success']} 个, 失败: {summary['failed']} 个, 总耗时: {summary['elapsed_seconds']:.1f}秒")
+        for industry in summary['industries']:
+            print(f"  行业数据 {industry['industry']} {industry['year']}: {industry['status']} ({industry['elapsed_seconds']:.1f}秒)")
+        for record in summary['items']:
+            mark = '✅' if record['status'] == 'success' else '❌'
+            detail = record['report'] if record['status'] == 'success' else record['error']
+            print(f"  {mark} {record['pdf']} ({record['elapsed_seconds']:.1f}秒): {detail}")
+        for stage, values in summary.get('stages', {}).items():
+            print(f"  阶段 {stage}: {values['runs']} 次, 累计 {values['wall_seconds']:.1f}秒")
+
+STREAM_HELP = '以流式方式调用DeepSeek，逐个解析指标分组，输出偏离格式时提前中止'
+NO_LLM_CACHE_HELP = '忽略已缓存的模型分析结果，强制调用DeepSeek（新结果仍会写入缓存）'
+MINERU_PYTHON_HELP = 'MinerU所在虚拟环境的Python解释器（默认取环境变量 MINERU_PYTHON 或 ./myenv），指定后无法导入MinerU时直接报错'
+
+def batch_main(argv):
+    """批量模式命令行接口"""
+    parser = argparse.ArgumentParser(prog='python main_analyzer.py --batch', description='按清单批量分析PDF财务报表')
+    parser.add_argument('manifest', help='任务清单（CSV: pdf,industry,year[,company]，或同字段的JSON列表）')
+    parser.add_argument('--workers', type=int, default=2, help='并发分析的PDF数量')
+    parser.add_argument('--industry-workers', type=int, default=2, help='并发获取的行业数据组数')
+    parser.add_argument('--summary', default=None, help='汇总JSON的输出路径')
+    parser.add_argument('--device', default='cpu', help='MinerU推理设备（cpu/cuda/cuda:0/npu/mps）')
+    parser.add_argument('--mineru-workers', type=int, default=None, help='MinerU工作进程数，默认按CPU核数和内存估算')
+    parser.add_argument('--mineru-timeout', type=int, default=600, help='单个PDF的提取超时（秒）')
+    parser.add_argument('--metrics-file', default=None, help='阶段指标JSON Lines文件，默认为 metrics/pipeline_metrics.jsonl')
+    parser.add_argument('--prometheus-file', default=None, help='可选的Prometheus textfile输出路径')
+    parser.add_argument('--mineru-python', default=None, help=MINERU_PYTHON_HELP)
+    parser.add_argument('--stream', action='store_true', help=STREAM_HELP)
+    parser.add_argument('--no-llm-cache', action='store_true', help=NO_LLM_CACHE_HELP)
+    args = parser.parse_args(argv)
+    
+    batch_analyzer = BatchFinancialAnalyzer(
+        args.workers, args.industry_workers,
+        mineru_device=args.device,
+        mineru_workers=args.mineru_workers,
+        mineru_timeout=args.mineru_timeout,
+        metrics_file=args.metrics_file,
+        prometheus_file=args.prometheus_file,
+        llm_streaming=args.stream,
+        mineru_python=args.mineru_python,
+        llm_bypass_cache=args.no_llm_cache,
+    )
+    try:
+        summary = batch_analyzer.run(batch_analyzer.load_manifest(args.manifest))
+    finally:
+        batch_analyzer.mineru_pool.close()
+    batch_analyzer.print_summary(summary)
+    
+    summary_path = args.summary or f"batch_summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    print(f"📄 汇总文件: {summary_path}")
+
+def parse_years(value):
+    """年份参数：单个年份（2020）、区间（2018-2024）或逗号分隔的列表（2018,2020,2022）"""
+    try:
+        if '-' in value:
+            start, end = (int(part) for part in value.split('-', 1))
+            years = list(range(start, end + 1))
+        else:
+            years = [int(part) for part in value.split(',') if part.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"无效的年份: {value}")
+    if not years:
+        raise argparse.ArgumentTypeError(f"无效的年份: {value}")
+    return years
+
+def parse_replay_latency(value):
+    """回放延迟参数：'recorded' 或秒数"""
+    return value if value == 'recorded' else float(value)
 
 def main():
     """主函数 - 命令行接口"""
+    if len(sys.argv) > 1 and sys.argv[1] == '--batch':
+        batch_main(sys.argv[2:])
+        return
+    
     if len(sys.argv) < 4:
         print("使用方法: python main_analyzer.py <PDF文件路径> <行业名称> <年份> [公司名称]")
         print("示例: python main_analyzer.py PDF/test_short.pdf 农产品加工 2020 测试公司")
+        print("多年份趋势: 年份写为区间，如 python main_analyzer.py PDF/test_short.pdf 农产品加工 2018-2024 测试公司")
+        print("批量模式: python main_analyzer.py --batch <任务清单.csv|json> [--workers N]")
+        print("录制/回放: 追加 --record <存档.zip> 或 --replay <存档.zip> [--replay-latency 秒数|recorded]")
+        print("流式调用: 追加 --stream，逐个解析模型输出的指标分组，输出偏离格式时提前中止")
+        print("忽略模型结果缓存: 追加 --no-llm-cache，强制重新调用DeepSeek")
+        print("MinerU进程: 追加 --mineru-pool [--mineru-python <myenv解释器>] [--device cuda]，通过常驻工作进程提取PDF")
         return
     
-    pdf_path = sys.argv[1]
-    industry_name = sys.argv[2]
-    year = int(sys.argv[3])
-    company_name = sys.argv[4] if len(sys.argv) > 4 else None
+    parser = argparse.ArgumentParser(prog='python main_analyzer.py', description='分析PDF财务报表并与同行业对比')
+    parser.add_argument('pdf_path', help='PDF文件路径')
+    parser.add_argument('industry_name', help='行业名称')
+    parser.add_argument('years', type=parse_years, help='年份，写为区间（如 2018-2024）或逗号分隔的列表时生成多年份趋势报告')
+    parser.add_argument('company_name', nargs='?', default=None, help='公司名称（默认取PDF文件名）')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--record', metavar='ARCHIVE', default=None, help='把akshare和DeepSeek的调用结果录制到存档')
+    group.add_argument('--replay', metavar='ARCHIVE', default=None, help='从存档回放akshare和DeepSeek调用（不访问网络）')
+    parser.add_argument('--replay-latency', type=parse_replay_latency, default=None,
+                        help='回放时的模拟延迟：秒数，或 recorded 表示使用录制时的耗时')
+    parser.add_argument('--stream', action='store_true', help=STREAM_HELP)
+    parser.add_argument('--no-llm-cache', action='store_true', help=NO_LLM_CACHE_HELP)
+    parser.add_argument('--device', default='cpu', help='MinerU推理设备（cpu/cuda/cuda:0/npu/mps）')
+    parser.add_argument('--mineru-pool', action='store_true',
+                        help='通过常驻的MinerU工作进程提取（与批量模式相同），默认按命令行方式调用mineru')
+    parser.add_argument('--mineru-python', default=None, help=MINERU_PYTHON_HELP + '；指定时自动启用 --mineru-pool')
+    parser.add_argument('--mineru-timeout', type=int, default=600, help='单个PDF的提取超时（秒），仅用于 --mineru-pool')
+    args = parser.parse_args()
     
     # 检查PDF文件是否存在
-    if not os.path.exists(pdf_path):
-        print(f"错误: PDF文件不存在 - {pdf_path}")
+    if not os.path.exists(args.pdf_path):
+        print(f"错误: PDF文件不存在 - {args.pdf_path}")
         return
     
     # 运行分析
-    analyzer = IntegratedFinancialAnalyzer()
-    result = analyzer.run_complete_analysis(pdf_path, industry_name, year, company_name)
+    session = None
+    if args.record:
+        session = RecordReplaySession('record', args.record)
+    elif args.replay:
+        session = RecordReplaySession('replay', args.replay, args.replay_latency)
+    
+    mineru_pool = None
+    if args.mineru_pool or args.mineru_python:
+        mineru_pool = MinerUWorkerPool(
+            device=args.device,
+            workers=1,
+            job_timeout=args.mineru_timeout,
+            python_executable=args.mineru_python,
+        )
+    
+    try:
+        if session:
+            analyzer = session.create_analyzer(args.stream, mineru_pool, args.device, args.no_llm_cache)
+        else:
+            analyzer = IntegratedFinancialAnalyzer(
+                mineru_pool=mineru_pool, mineru_device=args.device, llm_streaming=args.stream,
+                llm_bypass_cache=args.no_llm_cache,
+            )
+        if len(args.years) > 1:
+            result = analyzer.run_trend_analysis(args.pdf_path, args.industry_name, args.years, args.company_name)
+        else:
+            result = analyzer.run_complete_analysis(args.pdf_path, args.industry_name, args.years[0], args.company_name)
+    finally:
+        if mineru_pool:
+            mineru_pool.close()
+        if session:
+            session.close()
     
     if result:
         print(f"\n✅ 分析成功完成!")
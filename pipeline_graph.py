@@ -0,0 +1,79 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+class PipelineCancelled(Exception):
+    """流水线中其他阶段已失败，本阶段不再执行"""
+
+
+class PipelineGraph:
+    """按依赖关系组织的流水线：互不依赖的阶段并发执行，每个阶段以其依赖阶段的结果作为参数"""
+    
+    def __init__(self):
+        self.stages = {}
+        # 最近一次 run() 提交的阶段任务
+        self.futures = []
+    
+    def add_stage(self, name, func, depends_on=()):
+        """添加阶段，依赖的阶段必须已经添加"""
+        for dependency in depends_on:
+            if dependency not in self.stages:
+                raise ValueError(f"阶段 {name} 依赖的阶段 {dependency} 不存在")
+        self.stages[name] = (func, list(depends_on))
+    
+    def run(self):
+        """
+        执行所有阶段并返回 {阶段名: 结果}
+        任一阶段失败时立即抛出其异常：尚未开始的阶段不再执行，已在运行的阶段无法中断，
+        与流水线脱离，在后台结束后其结果被丢弃
+        """
+        futures = {}
+        self.futures = []
+        cancelled = threading.Event()
+        
+        def run_stage(func, dependency_futures):
+            # 依赖阶段失败时，result() 会重新抛出其异常
+            args = [future.result() for future in dependency_futures]
+            if cancelled.is_set():
+                raise PipelineCancelled()
+            return func(*args)
+        
+        # 每个阶段占用一个线程，等待依赖的线程不会阻塞其他阶段
+        executor = ThreadPoolExecutor(max_workers=max(1, len(self.stages)))
+        try:
+            for name, (func, depends_on) in self.stages.items():
+                futures[name] = executor.submit(run_stage, func, [futures[d] for d in depends_on])
+                self.futures.append(futures[name])
+            # 按完成顺序检查，最先失败的阶段决定抛出的异常
+            for future in as_completed(futures.values()):
+                if future.exception() is not None:
+                    cancelled.set()
+                    raise future.exception()
+            return {name: future.result() for name, future in futures.items()}
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            detached = [name for name, future in futures.items() if not future.done()]
+            if detached:
+                print(f"流水线已失败，未结束的阶段 {', '.join(detached)} 已脱离流水线，结束后结果将被丢弃")
+    
+    def call_when_idle(self, callback):
+        """
+        所有阶段（包括失败后脱离流水线、仍在运行的阶段）结束后调用 callback，已全部结束时立即调用
+        用于在脱离的阶段不再写入之后再清理它们使用的临时文件
+        """
+        pending = [future for future in self.futures if not future.done()]
+        if not pending:
+            callback()
+            return
+        lock = threading.Lock()
+        remaining = [len(pending)]
+        
+        def on_done(_):
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                callback()
+        
+        for future in pending:
+            future.add_done_callback(on_done)
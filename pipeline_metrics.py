@@ -0,0 +1,147 @@
+import os
+import sys
+import json
+import time
+import uuid
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows 没有 resource 模块
+    resource = None
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# 每个阶段记录的计数字段
+COUNTER_FIELDS = ['akshare_calls', 'prompt_tokens', 'completion_tokens', 'bytes_read', 'bytes_written']
+
+
+def peak_rss_bytes():
+    """当前进程自启动以来的峰值常驻内存（字节，不是单个阶段的峰值），无法获取时返回None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以KB为单位，macOS 以字节为单位
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def file_size(path):
+    """文件大小（字节），文件不存在时返回0"""
+    try:
+        return os.path.getsize(path)
+    except (OSError, TypeError):
+        return 0
+
+
+class PipelineMetrics:
+    def __init__(self, metrics_file=None, prometheus_file=None, run_id=None):
+        """
+        记录分析流程各阶段的耗时和资源使用
+        :param metrics_file: JSON Lines 指标文件，默认为 metrics/pipeline_metrics.jsonl
+        :param prometheus_file: 可选的 Prometheus textfile 输出路径（供 node_exporter 采集）
+        :param run_id: 本次运行的标识，默认随机生成
+        """
+        self.metrics_file = metrics_file or os.path.join(PROJECT_ROOT, 'metrics', 'pipeline_metrics.jsonl')
+        self.prometheus_file = prometheus_file
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.records = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name, **labels):
+        """
+        记录一个阶段：with metrics.stage('llm_analysis') as record: record['prompt_tokens'] += n
+        阶段内抛出异常时状态记为 error，调用方也可以直接设置 record['status']
+        """
+        record = {
+            'run_id': self.run_id,
+            'stage': name,
+            'started_at': datetime.now().isoformat(timespec='milliseconds'),
+        }
+        record.update({field: 0 for field in COUNTER_FIELDS})
+        record.update(labels)
+
+        start = time.perf_counter()
+        try:
+            yield record
+        except BaseException:
+            record['status'] = 'error'
+            raise
+        finally:
+            record['wall_seconds'] = round(time.perf_counter() - start, 4)
+            # 进程级峰值（ru_maxrss），阶段结束时的读数，不是本阶段单独的峰值
+            record['process_peak_rss_bytes'] = peak_rss_bytes()
+            record.setdefault('status', 'ok')
+            self._append(record)
+
+    def _append(self, record):
+        with self._lock:
+            self.records.append(record)
+            try:
+                os.makedirs(os.path.dirname(self.metrics_file) or '.', exist_ok=True)
+                with open(self.metrics_file, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            except OSError as e:
+                print(f"写入指标文件失败: {e}")
+
+    def summary(self):
+        """按阶段汇总：{阶段: {'runs', 'errors', 'wall_seconds', 各计数字段}}"""
+        summary = {}
+        with self._lock:
+            records = list(self.records)
+        for record in records:
+            stage = summary.setdefault(record['stage'], {
+                'runs': 0, 'errors': 0, 'wall_seconds': 0.0, **{field: 0 for field in COUNTER_FIELDS}
+            })
+            stage['runs'] += 1
+            stage['errors'] += record['status'] != 'ok'
+            stage['wall_seconds'] += record['wall_seconds']
+            for field in COUNTER_FIELDS:
+                stage[field] += record.get(field) or 0
+        return summary
+
+    def render_prometheus(self):
+        """以 Prometheus 文本格式返回各阶段累计值"""
+        metrics = [
+            ('finance_pipeline_stage_runs_total', 'counter', '阶段执行次数', 'runs'),
+            ('finance_pipeline_stage_errors_total', 'counter', '阶段失败次数', 'errors'),
+            ('finance_pipeline_stage_seconds_total', 'counter', '阶段累计耗时（秒）', 'wall_seconds'),
+            ('finance_pipeline_stage_akshare_calls_total', 'counter', 'akshare接口调用次数', 'akshare_calls'),
+            ('finance_pipeline_stage_prompt_tokens_total', 'counter', '大模型输入token数', 'prompt_tokens'),
+            ('finance_pipeline_stage_completion_tokens_total', 'counter', '大模型输出token数', 'completion_tokens'),
+            ('finance_pipeline_stage_bytes_read_total', 'counter', '读取字节数', 'bytes_read'),
+            ('finance_pipeline_stage_bytes_written_total', 'counter', '写入字节数', 'bytes_written'),
+        ]
+        summary = self.summary()
+        lines = []
+        for metric_name, metric_type, help_text, field in metrics:
+            lines.append(f"# HELP {metric_name} {help_text}")
+            lines.append(f"# TYPE {metric_name} {metric_type}")
+            for stage, values in sorted(summary.items()):
+                lines.append(f'{metric_name}{{stage="{stage}"}} {values[field]}')
+
+        peak = peak_rss_bytes()
+        if peak is not None:
+            lines.append("# HELP finance_pipeline_process_peak_rss_bytes 进程自启动以来的峰值常驻内存（字节）")
+            lines.append("# TYPE finance_pipeline_process_peak_rss_bytes gauge")
+            lines.append(f"finance_pipeline_process_peak_rss_bytes {peak}")
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path=None):
+        """
+        以 Prometheus textfile 格式写出各阶段累计值
+        :param path: 输出路径，默认使用构造时的 prometheus_file
+        """
+        path = path or self.prometheus_file
+        if not path:
+            return None
+
+        # 先写临时文件再替换，避免采集到写了一半的文件
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+        return path
@@ -0,0 +1,257 @@
+import os
+import json
+import time
+import pickle
+import hashlib
+import zipfile
+import threading
+from types import SimpleNamespace
+
+
+class ReplayMissError(LookupError):
+    """回放存档中没有对应的请求记录"""
+
+
+def make_key(*parts):
+    """根据请求内容生成存档键"""
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class CallArchive:
+    def __init__(self, path, mode='r'):
+        """
+        外部调用的录制存档（zip文件，每个请求一个压缩条目）
+        存档中的数据表以pickle保存，只应回放自己录制的存档
+        :param path: 存档路径
+        :param mode: 'r' 回放（只读），'w' 录制（文件已存在时追加）
+        """
+        self.path = path
+        self.mode = mode
+        self._lock = threading.Lock()
+        if mode == 'w':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._zip = zipfile.ZipFile(path, 'a', compression=zipfile.ZIP_DEFLATED)
+        else:
+            self._zip = zipfile.ZipFile(path, 'r')
+        self._names = set(self._zip.namelist())
+        self.recorded = 0
+        self.replayed = 0
+
+    def _entry_name(self, namespace, key):
+        return f"{namespace}/{key}.pkl"
+
+    def get(self, namespace, key):
+        """
+        读取一条记录
+        :raises ReplayMissError: 存档中没有该请求
+        """
+        name = self._entry_name(namespace, key)
+        with self._lock:
+            if name not in self._names:
+                raise ReplayMissError(f"存档中没有该请求的记录: {namespace}/{key[:12]}")
+            payload = pickle.loads(self._zip.read(name))
+            self.replayed += 1
+        return payload
+
+    def put(self, namespace, key, payload):
+        """写入一条记录，相同请求只保留第一次的结果"""
+        name = self._entry_name(namespace, key)
+        with self._lock:
+            if name in self._names:
+                return
+            self._zip.writestr(name, pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL))
+            self._names.add(name)
+            self.recorded += 1
+
+    def close(self):
+        with self._lock:
+            self._zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _simulate_latency(latency, recorded_elapsed):
+    """latency 为 'recorded' 时按录制时的耗时等待，为数字时等待固定秒数，为None时不等待"""
+    if latency == 'recorded':
+        delay = recorded_elapsed or 0
+    else:
+        delay = latency or 0
+    if delay > 0:
+        time.sleep(delay)
+
+
+class RecordingDataSource:
+    def __init__(self, source, archive):
+        """
+        包装akshare等数据源，把每次成功调用的结果写入存档
+        :param source: 被包装的数据源（如akshare模块）
+        :param archive: 以 'w' 模式打开的 CallArchive
+        """
+        self.source = source
+        self.archive = archive
+
+    def __getattr__(self, name):
+        func = getattr(self.source, name)
+
+        def recorded_call(*args, **kwargs):
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            self.archive.put('akshare', make_key(name, args, kwargs), {
+                'name': name,
+                'args': args,
+                'kwargs': kwargs,
+                'result': result,
+                'elapsed': time.perf_counter() - start,
+            })
+            return result
+
+        return recorded_call
+
+
+class ReplayDataSource:
+    def __init__(self, archive, latency=None):
+        """
+        从存档回放数据源调用，不访问网络
+        :param archive: CallArchive
+        :param latency: 模拟延迟：None 不等待，'recorded' 使用录制时的耗时，数字为固定秒数
+        """
+        self.archive = archive
+        self.latency = latency
+
+    def __getattr__(self, name):
+        def replayed_call(*args, **kwargs):
+            payload = self.archive.get('akshare', make_key(name, args, kwargs))
+            _simulate_latency(self.latency, payload['elapsed'])
+            # 返回副本，避免调用方修改存档中的对象
+            result = payload['result']
+            return result.copy() if hasattr(result, 'copy') else result
+
+        return replayed_call
+
+
+def _llm_key(kwargs):
+    """模型请求的存档键：只取决定输出内容的参数，流式和非流式请求共用同一条记录"""
+    return make_key(kwargs.get('model'), kwargs.get('messages'), kwargs.get('temperature'))
+
+
+def _usage_dict(usage):
+    if usage is None:
+        return None
+    return {
+        'prompt_tokens': getattr(usage, 'prompt_tokens', 0) or 0,
+        'completion_tokens': getattr(usage, 'completion_tokens', 0) or 0,
+    }
+
+
+class _RecordingStream:
+    """透传流式响应，关闭时把已读取的内容写入存档"""
+
+    def __init__(self, stream, archive, key, start):
+        self.stream = stream
+        self.archive = archive
+        self.key = key
+        self.start = start
+        self.parts = []
+        self.usage = None
+        self.finished = False
+        self.closed = False
+
+    def __iter__(self):
+        for chunk in self.stream:
+            if getattr(chunk, 'usage', None):
+                self.usage = _usage_dict(chunk.usage)
+            if chunk.choices and chunk.choices[0].delta.content:
+                self.parts.append(chunk.choices[0].delta.content)
+            yield chunk
+        self.finished = True
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.stream.close()
+        # 调用方读到JSON闭合后会提前关闭流，录制已读取的分片；回放时调用方读到的内容与录制时一致
+        if self.parts or self.usage is not None:
+            self.archive.put('llm', self.key, {
+                'content': ''.join(self.parts),
+                'usage': self.usage,
+                'elapsed': time.perf_counter() - self.start,
+                'complete': self.finished,
+            })
+
+
+class _RecordingCompletions:
+    def __init__(self, client, archive):
+        self.client = client
+        self.archive = archive
+
+    def create(self, **kwargs):
+        start = time.perf_counter()
+        key = _llm_key(kwargs)
+        response = self.client.chat.completions.create(**kwargs)
+        if kwargs.get('stream'):
+            return _RecordingStream(response, self.archive, key, start)
+        self.archive.put('llm', key, {
+            'content': response.choices[0].message.content,
+            'usage': _usage_dict(getattr(response, 'usage', None)),
+            'elapsed': time.perf_counter() - start,
+        })
+        return response
+
+
+class RecordingOpenAIClient:
+    def __init__(self, client, archive):
+        """
+        包装OpenAI兼容客户端，把 chat.completions.create 的结果写入存档
+        :param client: 被包装的客户端
+        :param archive: 以 'w' 模式打开的 CallArchive
+        """
+        self.chat = SimpleNamespace(completions=_RecordingCompletions(client, archive))
+
+
+class _ReplayStream:
+    def __init__(self, content, usage, chunk_chars=16):
+        self.content = content
+        self.usage = usage
+        self.chunk_chars = chunk_chars
+
+    def __iter__(self):
+        for start in range(0, len(self.content), self.chunk_chars):
+            delta = SimpleNamespace(content=self.content[start:start + self.chunk_chars])
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+        yield SimpleNamespace(choices=[], usage=self.usage)
+
+    def close(self):
+        pass
+
+
+class _ReplayCompletions:
+    def __init__(self, archive, latency):
+        self.archive = archive
+        self.latency = latency
+
+    def create(self, **kwargs):
+        payload = self.archive.get('llm', _llm_key(kwargs))
+        _simulate_latency(self.latency, payload['elapsed'])
+        usage = SimpleNamespace(**payload['usage']) if payload['usage'] else None
+        if kwargs.get('stream'):
+            return _ReplayStream(payload['content'], usage)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=payload['content']))],
+            usage=usage,
+        )
+
+
+class ReplayOpenAIClient:
+    def __init__(self, archive, latency=None):
+        """
+        从存档回放模型调用，不访问网络
+        :param archive: CallArchive
+        :param latency: 模拟延迟：None 不等待，'recorded' 使用录制时的耗时，数字为固定秒数
+        """
+        self.chat = SimpleNamespace(completions=_ReplayCompletions(archive, latency))
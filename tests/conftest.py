@@ -0,0 +1,10 @@
+import os
+import sys
+
+# 与 main_analyzer.py 相同：各子目录中的模块以顶层模块名互相导入
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in [PROJECT_ROOT] + [
+    os.path.join(PROJECT_ROOT, name) for name in ('PDFdata_to_json', 'data_get_result', 'analysis_and_scoring')
+]:
+    if path not in sys.path:
+        sys.path.append(path)
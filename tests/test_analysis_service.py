@@ -0,0 +1,129 @@
+import sys
+import json
+import types
+import http.client
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip('akshare')
+pytest.importorskip('openai')
+# main_analyzer 从 config.py 读取密钥，测试时不需要真实密钥
+sys.modules.setdefault('config', types.SimpleNamespace(DEEPSEEK_API_KEY='test-key'))
+sys.modules.setdefault('PDFdata_to_json.config', sys.modules['config'])
+
+from analysis_service import AnalysisService, AnalysisRequestHandler, ServiceError
+
+
+@pytest.fixture
+def service(tmp_path):
+    return AnalysisService(
+        workers=1, max_queue=4, output_dir=str(tmp_path / 'service'),
+        metrics_file=str(tmp_path / 'metrics.jsonl'), industry_analyzer=object(),
+    )
+
+
+@pytest.mark.parametrize('payload', [
+    {'industry': '农产品加工', 'year': 2020, 'markdown': ['合并资产负债表']},
+    {'industry': '农产品加工', 'year': 2020, 'markdown': {'text': '合并资产负债表'}},
+    {'industry': '农产品加工', 'year': 2020, 'pdf_base64': 123},
+    {'industry': '农产品加工', 'year': 2020, 'markdown': '合并资产负债表', 'filename': ['a.md']},
+])
+def test_non_string_inputs_are_rejected(service, payload):
+    with pytest.raises(ServiceError) as error:
+        service.submit(payload)
+    assert error.value.status == 400
+    assert service.queue.qsize() == 0
+
+
+def test_job_is_not_queued_after_shutdown_starts(service, monkeypatch):
+    save_input = service._save_input
+
+    def save_then_shutdown(job_id, payload):
+        # 保存输入期间服务开始停止
+        paths = save_input(job_id, payload)
+        service.accepting = False
+        return paths
+
+    monkeypatch.setattr(service, '_save_input', save_then_shutdown)
+    with pytest.raises(ServiceError) as error:
+        service.submit({'industry': '农产品加工', 'year': 2020, 'markdown': '合并资产负债表'})
+    assert error.value.status == 503
+    assert service.queue.qsize() == 0
+    assert not service.jobs
+
+
+def test_trend_jobs_share_per_year_industry_fetches(service, monkeypatch):
+    release = threading.Event()
+    calls = []
+
+    def fetch_industry(industry_name, year):
+        calls.append(('year', year))
+        release.wait(5)
+        return f"{year}.csv"
+
+    def fetch_industry_range(industry_name, years):
+        calls.append(('range', tuple(years)))
+        release.wait(5)
+        return {year: f"{year}.csv" for year in years if year != 2022}
+
+    monkeypatch.setattr(service, '_fetch_industry', fetch_industry)
+    monkeypatch.setattr(service, '_fetch_industry_range', fetch_industry_range)
+
+    single = service._industry_future('农产品加工', 2024)
+    trend = service._industry_futures_for_years('农产品加工', [2022, 2023, 2024])
+    # 正在获取的年份直接复用，其余年份合并为一次多年份获取
+    assert trend[2024] is single
+    assert service._industry_future('农产品加工', 2023) is trend[2023]
+    other_trend = service._industry_futures_for_years('农产品加工', [2023, 2024])
+    assert other_trend == {2023: trend[2023], 2024: single}
+
+    release.set()
+    assert trend[2023].result(5) == '2023.csv'
+    assert single.result(5) == '2024.csv'
+    with pytest.raises(Exception, match='2022'):
+        trend[2022].result(5)
+    assert sorted(calls) == [('range', (2022, 2023)), ('year', 2024)]
+    service.industry_executor.shutdown(wait=True)
+
+
+def test_shutdown_waits_for_job_taken_off_the_queue(service, monkeypatch):
+    started = threading.Event()
+    process_job = service._process_job
+
+    def slow_process_job(job_id):
+        # 任务已出队、尚未计入 running 的窗口
+        started.set()
+        time.sleep(0.3)
+        process_job(job_id)
+
+    monkeypatch.setattr(service, '_process_job', slow_process_job)
+    monkeypatch.setattr(service, '_run_job', lambda job: ('report.md', None))
+    job = service.submit({'industry': '农产品加工', 'year': 2020, 'markdown': '合并资产负债表'})
+    service.start()
+    assert started.wait(5)
+    assert service.queue.qsize() == 0 and service.running == 0
+
+    service.shutdown(timeout=5)
+    assert service.get_job(job['id'])['status'] == 'succeeded'
+
+
+@pytest.mark.parametrize('content_length, status', [('abc', 400), ('-1', 400), (str(2 * 1024 * 1024), 413)])
+def test_invalid_content_length_gets_json_error(service, content_length, status):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), AnalysisRequestHandler)
+    server.service = service
+    server.max_body_bytes = 1024 * 1024
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        connection = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=5)
+        connection.putrequest('POST', '/jobs')
+        connection.putheader('Content-Length', content_length)
+        connection.endheaders()
+        response = connection.getresponse()
+        assert response.status == status
+        assert 'error' in json.loads(response.read().decode('utf-8'))
+    finally:
+        server.shutdown()
+        server.server_close()
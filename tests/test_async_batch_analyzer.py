@@ -0,0 +1,87 @@
+import sys
+import json
+import types
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('openai')
+# batch_analyzer 从 config.py 读取密钥，测试时不需要真实密钥
+sys.modules.setdefault('config', types.SimpleNamespace(DEEPSEEK_API_KEY='test-key'))
+
+from financial_analyzer import FinancialAnalyzer
+from llm_result_cache import LLMResultCache
+from batch_analyzer import AsyncBatchAnalyzer
+
+RESULT = {'盈利能力指标': {'销售毛利率': 30.0}}
+
+
+class SlowCompletions:
+    """每次请求耗时 delay 秒，记录同时进行中的请求数"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.in_flight = 0
+        self.peak = 0
+        self.requests = 0
+
+    async def create(self, **kwargs):
+        self.requests += 1
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            message = SimpleNamespace(content=json.dumps(RESULT, ensure_ascii=False))
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+        finally:
+            self.in_flight -= 1
+
+
+def make_engine(tmp_path, delay, max_concurrency, request_timeout, bypass_cache=False):
+    analyzer = FinancialAnalyzer(
+        'test-key', result_cache=LLMResultCache(tmp_path / 'cache'), use_local_engine=False, client=object(),
+        bypass_cache=bypass_cache,
+    )
+    analyzer.current_dir = tmp_path
+    engine = AsyncBatchAnalyzer(analyzer, max_concurrency=max_concurrency, max_retries=0,
+                                request_timeout=request_timeout)
+    completions = SlowCompletions(delay)
+    engine.client = SimpleNamespace(chat=SimpleNamespace(completions=completions), close=lambda: asyncio.sleep(0))
+    return engine, completions
+
+
+def write_files(tmp_path, count):
+    files = []
+    for i in range(count):
+        path = tmp_path / f'report_{i}.md'
+        path.write_text(f'# 报表 {i}\n\n营业收入 {i}', encoding='utf-8')
+        files.append(path)
+    return files
+
+
+def test_queued_files_do_not_use_up_the_request_timeout(tmp_path):
+    # 4个文件依次占用唯一的并发名额，总耗时超过单次请求的超时时间
+    engine, completions = make_engine(tmp_path, delay=0.2, max_concurrency=1, request_timeout=0.5)
+    succeeded, failed = asyncio.run(engine.run(write_files(tmp_path, 4)))
+    assert failed == []
+    assert len(succeeded) == 4
+    assert completions.peak == 1
+
+
+def test_slow_request_times_out(tmp_path):
+    engine, _ = make_engine(tmp_path, delay=1.0, max_concurrency=2, request_timeout=0.1)
+    succeeded, failed = asyncio.run(engine.run(write_files(tmp_path, 1)))
+    assert succeeded == []
+    assert "超过 0.1 秒" in failed[0][1]
+
+
+@pytest.mark.parametrize('bypass_cache, expected_requests', [(False, 2), (True, 4)])
+def test_cached_results_are_reused_unless_bypassed(tmp_path, bypass_cache, expected_requests):
+    engine, completions = make_engine(tmp_path, delay=0, max_concurrency=2, request_timeout=1,
+                                      bypass_cache=bypass_cache)
+    files = write_files(tmp_path, 2)
+    asyncio.run(engine.run(files))
+    succeeded, failed = asyncio.run(engine.run(files))
+    assert len(succeeded) == 2 and failed == []
+    assert completions.requests == expected_requests
@@ -0,0 +1,74 @@
+import sys
+import json
+import types
+import threading
+
+import pytest
+
+pytest.importorskip('akshare')
+pytest.importorskip('openai')
+# main_analyzer 从 config.py 读取密钥，测试时不需要真实密钥
+sys.modules.setdefault('config', types.SimpleNamespace(DEEPSEEK_API_KEY='test-key'))
+sys.modules.setdefault('PDFdata_to_json.config', sys.modules['config'])
+
+import main_analyzer
+from main_analyzer import BatchFinancialAnalyzer
+
+
+def test_manifest_accepts_csv_and_json(tmp_path):
+    csv_path = tmp_path / 'manifest.csv'
+    csv_path.write_text('pdf,industry,year,company\na.pdf,农产品加工,2020,\nb.pdf,白酒Ⅲ,2021,茅台\n', encoding='utf-8-sig')
+    json_path = tmp_path / 'manifest.json'
+    json_path.write_text(json.dumps([
+        {'pdf': 'a.pdf', 'industry': '农产品加工', 'year': '2020'},
+        {'pdf': 'b.pdf', 'industry': '白酒Ⅲ', 'year': 2021, 'company': '茅台'},
+    ], ensure_ascii=False), encoding='utf-8')
+
+    expected = [
+        {'pdf': 'a.pdf', 'industry': '农产品加工', 'year': 2020, 'company': None},
+        {'pdf': 'b.pdf', 'industry': '白酒Ⅲ', 'year': 2021, 'company': '茅台'},
+    ]
+    assert BatchFinancialAnalyzer.load_manifest(str(csv_path)) == expected
+    assert BatchFinancialAnalyzer.load_manifest(str(json_path)) == expected
+
+
+def test_each_industry_year_is_fetched_once(tmp_path, monkeypatch):
+    pdfs = []
+    for name in ('a', 'b', 'c'):
+        pdf_path = tmp_path / f'{name}.pdf'
+        pdf_path.write_bytes(b'%PDF-1.4')
+        pdfs.append(str(pdf_path))
+    items = [
+        {'pdf': pdfs[0], 'industry': '农产品加工', 'year': 2020, 'company': None},
+        {'pdf': pdfs[1], 'industry': '农产品加工', 'year': 2020, 'company': None},
+        {'pdf': pdfs[2], 'industry': '白酒Ⅲ', 'year': 2020, 'company': None},
+        # PDF不存在的条目直接失败，也不为它获取行业数据
+        {'pdf': str(tmp_path / 'missing.pdf'), 'industry': '种子', 'year': 2020, 'company': None},
+    ]
+
+    batch = BatchFinancialAnalyzer(max_workers=4, metrics_file=str(tmp_path / 'metrics.jsonl'))
+    fetched = []
+    lock = threading.Lock()
+
+    def fake_fetch(industry_name, year):
+        with lock:
+            fetched.append((industry_name, year))
+        return f'{industry_name}_{year}.csv'
+
+    def fake_analysis(self, pdf_path, industry_name, year, company_name=None, industry_data_future=None):
+        # 每个条目等待共享的行业数据
+        return f'{pdf_path}:{industry_data_future.result()}'
+
+    monkeypatch.setattr(batch, '_fetch_industry', fake_fetch)
+    monkeypatch.setattr(main_analyzer.IntegratedFinancialAnalyzer, 'run_complete_analysis', fake_analysis)
+    summary = batch.run(items)
+
+    assert sorted(fetched) == [('农产品加工', 2020), ('白酒Ⅲ', 2020)]
+    assert (summary['total'], summary['success'], summary['failed']) == (4, 3, 1)
+    assert [record['report'] for record in summary['items'][:3]] == [
+        f'{pdfs[0]}:农产品加工_2020.csv', f'{pdfs[1]}:农产品加工_2020.csv', f'{pdfs[2]}:白酒Ⅲ_2020.csv',
+    ]
+    assert 'PDF文件不存在' in summary['items'][3]['error']
+    assert [(i['industry'], i['status'], i['csv']) for i in summary['industries']] == [
+        ('农产品加工', 'success', '农产品加工_2020.csv'), ('白酒Ⅲ', 'success', '白酒Ⅲ_2020.csv'),
+    ]
@@ -0,0 +1,55 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from columnar_peer_store import ColumnarPeerStore
+from peer_snapshot_store import PeerSnapshotStore
+
+
+def make_peer_df():
+    return pd.DataFrame({
+        '股票代码': ['000001', '000002'],
+        '净利润': ['1.50亿', '3000万'],
+        '销售毛利率': ['12.5%', '--'],
+        '股票简称': ['甲', '乙'],
+    })
+
+
+def test_snapshots_get_a_typed_columnar_copy(tmp_path):
+    csv_path = PeerSnapshotStore(str(tmp_path)).save('801010.SI', 2020, make_peer_df())['path']
+    store = ColumnarPeerStore()
+
+    assert store.is_managed_snapshot(csv_path)
+    ingested = store.load(csv_path)
+    assert store.is_current(csv_path)
+    mapped = store.load(csv_path)
+
+    for df in [ingested, mapped]:
+        assert df['股票代码'].tolist() == ['000001', '000002']
+        assert df['净利润'].tolist() == [1.5e8, 3e7]
+        assert df['销售毛利率'][0] == 12.5 and np.isnan(df['销售毛利率'][1])
+
+
+def test_other_csvs_are_parsed_without_writing_next_to_them(tmp_path):
+    csv_path = tmp_path / 'peers.csv'
+    make_peer_df().to_csv(csv_path, index=False, encoding='utf-8-sig')
+    store = ColumnarPeerStore()
+
+    assert not store.is_managed_snapshot(str(csv_path))
+    df = store.load(str(csv_path))
+    assert df['净利润'].tolist() == [1.5e8, 3e7]
+    assert os.listdir(tmp_path) == ['peers.csv']
+
+
+def test_unwritable_snapshot_directory_falls_back_to_csv(tmp_path, monkeypatch):
+    csv_path = PeerSnapshotStore(str(tmp_path)).save('801010.SI', 2020, make_peer_df())['path']
+    blocker = tmp_path / 'not_a_directory'
+    blocker.write_text('', encoding='utf-8')
+    store = ColumnarPeerStore()
+    # 副本目录位于普通文件之下，创建时抛出 OSError（与只读目录相同）
+    monkeypatch.setattr(store, 'columns_dir', lambda path: str(blocker / 'v0001.columns'))
+
+    df = store.load(csv_path)
+    assert df['净利润'].tolist() == [1.5e8, 3e7]
+    assert not store.is_current(csv_path)
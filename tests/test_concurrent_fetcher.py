@@ -0,0 +1,101 @@
+import time
+import random
+import threading
+
+import pytest
+
+import concurrent_fetcher
+from concurrent_fetcher import ConcurrentFetcher, TokenBucketRateLimiter
+
+
+def test_map_returns_results_in_input_order():
+    fetcher = ConcurrentFetcher(max_workers=8, requests_per_second=0)
+    rng = random.Random(0)
+    delays = [rng.uniform(0, 0.02) for _ in range(20)]
+    progress = []
+
+    def slow_square(index):
+        # 后提交的任务可能先完成
+        time.sleep(delays[index])
+        return index * index
+
+    results = fetcher.map(slow_square, range(20), progress_callback=lambda done, total, item: progress.append(done))
+    assert results == [index * index for index in range(20)]
+    assert progress == list(range(1, 21))
+    assert fetcher.map(slow_square, []) == []
+
+
+def test_call_retries_with_capped_exponential_backoff(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(concurrent_fetcher.time, 'sleep', sleeps.append)
+    # 取退避区间的上限，便于检查指数增长和封顶
+    monkeypatch.setattr(concurrent_fetcher.random, 'uniform', lambda low, high: high)
+    fetcher = ConcurrentFetcher(requests_per_second=0, max_retries=3, backoff_base=1.0, backoff_max=3.0)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 4:
+            raise ConnectionError('temporary')
+        return 'ok'
+
+    assert fetcher.call(flaky) == 'ok'
+    assert sleeps == [1.0, 2.0, 3.0]
+    assert fetcher.request_count == 4
+
+
+def test_call_raises_last_error_after_retries(monkeypatch):
+    monkeypatch.setattr(concurrent_fetcher.time, 'sleep', lambda seconds: None)
+    fetcher = ConcurrentFetcher(requests_per_second=0, max_retries=2)
+    attempts = []
+
+    def failing():
+        attempts.append(1)
+        raise ValueError(f'attempt {len(attempts)}')
+
+    with pytest.raises(ValueError, match='attempt 3'):
+        fetcher.call(failing)
+    assert len(attempts) == 3
+
+
+def test_rate_limit_bounds_concurrent_requests():
+    fetcher = ConcurrentFetcher(max_workers=8, requests_per_second=50)
+    fetcher.rate_limiter = TokenBucketRateLimiter(50, burst=1)
+    start = time.monotonic()
+    fetcher.map(lambda item: fetcher.call(lambda: item), range(11))
+    # 第一个令牌立即可用，其余10个请求至少需要 10/50 秒，并发线程数不影响上限
+    assert time.monotonic() - start >= 0.19
+
+
+def test_rate_limiter_allows_initial_burst():
+    limiter = TokenBucketRateLimiter(1, burst=5)
+    start = time.monotonic()
+    for _ in range(5):
+        limiter.acquire()
+    assert time.monotonic() - start < 0.1
+
+
+def test_request_counts_are_attributed_to_each_caller():
+    fetcher = ConcurrentFetcher(max_workers=4, requests_per_second=0)
+    barrier = threading.Barrier(2)
+    counts = {}
+
+    def fetch_industry(name, stocks):
+        with fetcher.count_requests() as counter:
+            barrier.wait(5)
+            # 两个行业同时获取，共享同一个请求器
+            fetcher.map(lambda stock: fetcher.call(lambda: stock), range(stocks))
+            fetcher.call(lambda: name)
+        counts[name] = counter.count
+
+    threads = [
+        threading.Thread(target=fetch_industry, args=('a', 3)),
+        threading.Thread(target=fetch_industry, args=('b', 7)),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert counts == {'a': 4, 'b': 8}
+    assert fetcher.request_count == 12
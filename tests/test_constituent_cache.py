@@ -0,0 +1,45 @@
+import json
+from datetime import datetime, timedelta
+
+from constituent_cache import ConstituentCache
+
+
+def test_update_tracks_changes_and_reverse_index(tmp_path):
+    cache = ConstituentCache(str(tmp_path / 'constituents.json'))
+
+    # 首次保存不记录变动，重复代码只保留一次
+    assert cache.update('850111.SI', ['000001', '000002', '000001']) is None
+    assert cache.get('850111.SI') == ['000001', '000002']
+    assert cache.update('850111.SI', ['000001', '000002']) is None
+
+    change = cache.update('850111.SI', ['000002', '000003'])
+    assert change['added'] == ['000003'] and change['removed'] == ['000001']
+    assert [c['added'] for c in cache.changes('850111.SI')] == [['000003']]
+
+    cache.update('850112.SI', ['000002'])
+    assert cache.stock_industries('000002') == ['850111.SI', '850112.SI']
+    assert cache.stock_industries('000001') == []
+
+
+def test_change_records_are_bounded(tmp_path):
+    cache = ConstituentCache(str(tmp_path / 'constituents.json'), max_change_records=2)
+    for index in range(5):
+        cache.update('850111.SI', [f"{index:06d}"])
+    assert [c['added'] for c in cache.changes('850111.SI')] == [['000003'], ['000004']]
+
+
+def test_cache_persists_and_expires(tmp_path):
+    cache_file = tmp_path / 'constituents.json'
+    ConstituentCache(str(cache_file)).update('850111.SI', ['000001'])
+
+    reloaded = ConstituentCache(str(cache_file), max_age_days=7)
+    assert reloaded.get('850111.SI') == ['000001']
+    assert reloaded.stock_industries('000001') == ['850111.SI']
+    assert reloaded.get('850112.SI') is None
+
+    fetched_at = datetime.fromisoformat(json.loads(cache_file.read_text(encoding='utf-8'))['industries']['850111.SI']['fetched_at'])
+    assert reloaded.is_fresh('850111.SI', now=fetched_at + timedelta(days=7))
+    assert not reloaded.is_fresh('850111.SI', now=fetched_at + timedelta(days=8))
+    # 过期后 get 返回None，get_stored 仍返回已保存的列表
+    assert reloaded.get('850111.SI', max_age_days=-1) is None
+    assert reloaded.get_stored('850111.SI') == ['000001']
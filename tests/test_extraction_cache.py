@@ -0,0 +1,35 @@
+from extraction_cache import MinerUOutputCache
+
+
+def make_output(tmp_path, name, size):
+    output_dir = tmp_path / name
+    output_dir.mkdir()
+    markdown_path = output_dir / f"{name}.md"
+    markdown_path.write_text('合并资产负债表\n' + 'x' * size, encoding='utf-8')
+    return output_dir, markdown_path
+
+
+def test_copied_markdown_survives_eviction(tmp_path):
+    # 容量只够放一个条目
+    cache = MinerUOutputCache(tmp_path / 'cache', max_size_mb=1500 / (1024 * 1024), mineru_version='test')
+    output_a, markdown_a = make_output(tmp_path, 'a', 1000)
+    cache.put('a' * 64, output_a, markdown_a)
+
+    copy_path = cache.get('a' * 64, copy_to=tmp_path / 'job')
+    assert copy_path.startswith(str(tmp_path / 'job'))
+
+    output_b, markdown_b = make_output(tmp_path, 'b', 1000)
+    cache.put('b' * 64, output_b, markdown_b)
+
+    assert cache.get('a' * 64) is None
+    with open(copy_path, encoding='utf-8') as f:
+        assert f.read().startswith('合并资产负债表')
+
+
+def test_get_without_copy_returns_cache_path(tmp_path):
+    cache = MinerUOutputCache(tmp_path / 'cache', mineru_version='test')
+    output_dir, markdown_path = make_output(tmp_path, 'a', 10)
+    cached = cache.put('c' * 64, output_dir, markdown_path)
+
+    assert cache.get('c' * 64) == cached
+    assert cache.get('d' * 64) is None
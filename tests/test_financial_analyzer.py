@@ -0,0 +1,136 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('openai')
+
+from financial_analyzer import FinancialAnalyzer
+from llm_result_cache import LLMResultCache
+from test_local_ratio_engine import BALANCE_SHEET
+
+LLM_RESULT = {
+    '盈利能力指标': {'净利润': 1.0, '销售净利率': 10.0, '销售毛利率': 20.0, '净资产收益率': 5.0},
+    '成长性指标': {'净利润同比增长率': 3.0, '营业总收入同比增长率': 4.0},
+    '偿债能力指标': {'流动比率': 9.9, '速动比率': 9.9, '资产负债率': 99.0},
+    '营运能力指标': {'存货周转天数': 30.0, '应收账款周转天数': 40.0},
+}
+
+
+class RecordingCompletions:
+    def __init__(self, content=None, error=None):
+        self.content = content
+        self.error = error
+        self.requests = []
+
+    def create(self, **kwargs):
+        self.requests.append(kwargs)
+        if self.error:
+            raise self.error
+        message = SimpleNamespace(content=self.content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+def make_analyzer(tmp_path, completions):
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return FinancialAnalyzer('test-key', result_cache=LLMResultCache(tmp_path), client=client)
+
+
+def test_local_metrics_are_kept_when_llm_call_fails(tmp_path):
+    analyzer = make_analyzer(tmp_path, RecordingCompletions(error=RuntimeError("connection reset")))
+    result = json.loads(analyzer.analyze_financial_data(BALANCE_SHEET))
+    assert result['偿债能力指标'] == {'流动比率': 2.0, '速动比率': 1.4, '资产负债率': 50.0}
+    assert result['盈利能力指标']['销售毛利率'] is None
+    assert result['营运能力指标']['存货周转天数'] is None
+
+
+def test_local_metrics_are_kept_when_llm_returns_invalid_json(tmp_path):
+    analyzer = make_analyzer(tmp_path, RecordingCompletions(content="无法分析"))
+    result = json.loads(analyzer.analyze_financial_data(BALANCE_SHEET))
+    assert result['偿债能力指标']['资产负债率'] == 50.0
+    assert result['成长性指标'] == {'净利润同比增长率': None, '营业总收入同比增长率': None}
+
+
+def test_llm_is_asked_only_for_missing_metrics_and_local_values_win(tmp_path):
+    completions = RecordingCompletions(content=json.dumps(LLM_RESULT, ensure_ascii=False))
+    analyzer = make_analyzer(tmp_path, completions)
+    result = json.loads(analyzer.analyze_financial_data(BALANCE_SHEET))
+
+    prompt = completions.requests[0]['messages'][1]['content']
+    assert '只需计算以下指标' in prompt
+    assert '销售毛利率' in prompt.split('\n')[0]
+    assert '流动比率' not in prompt.split('\n')[0]
+    assert result['偿债能力指标'] == {'流动比率': 2.0, '速动比率': 1.4, '资产负债率': 50.0}
+    assert result['盈利能力指标']['销售毛利率'] == 20.0
+
+
+def test_merge_results_without_any_data_returns_none(tmp_path):
+    analyzer = make_analyzer(tmp_path, RecordingCompletions())
+    assert analyzer.merge_results(None, None) is None
+    assert analyzer.merge_results({'盈利能力指标': {}}, None) is None
+    assert analyzer.merge_results(None, '{"盈利能力指标": {}}') == '{"盈利能力指标": {}}'
+
+
+class FakeStream:
+    def __init__(self, text, chunk_chars=8):
+        self.chunks = [text[i:i + chunk_chars] for i in range(0, len(text), chunk_chars)]
+        self.read = 0
+        self.closed = False
+
+    def __iter__(self):
+        for content in self.chunks:
+            self.read += 1
+            delta = SimpleNamespace(content=content)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+
+    def close(self):
+        self.closed = True
+
+
+class StreamingCompletions:
+    def __init__(self, text):
+        self.stream = FakeStream(text)
+
+    def create(self, **kwargs):
+        assert kwargs['stream'] is True
+        return self.stream
+
+
+def test_streaming_mode_parses_groups(tmp_path):
+    completions = StreamingCompletions(json.dumps(LLM_RESULT, ensure_ascii=False) + " 以上为计算结果。" * 50)
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    analyzer = FinancialAnalyzer('test-key', result_cache=LLMResultCache(tmp_path), use_local_engine=False,
+                                 use_streaming=True, client=client)
+    result = json.loads(analyzer.analyze_financial_data("无法在本地解析的内容"))
+    assert result == LLM_RESULT
+    # 对象闭合后只再读取少量分片
+    assert completions.stream.read < len(completions.stream.chunks)
+    assert completions.stream.closed
+
+
+def test_streaming_mode_aborts_off_schema_output(tmp_path):
+    completions = StreamingCompletions('{"盈利能力指标": {"销售毛利率": [1, 2, 3]}}' + " " * 400)
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    analyzer = FinancialAnalyzer('test-key', result_cache=LLMResultCache(tmp_path), use_local_engine=False,
+                                 use_streaming=True, client=client)
+    assert analyzer.analyze_financial_data("无法在本地解析的内容") is None
+    assert completions.stream.closed
+    assert completions.stream.read < len(completions.stream.chunks)
+
+
+def test_bypass_cache_option_skips_cached_results(tmp_path):
+    content = json.dumps(LLM_RESULT, ensure_ascii=False)
+    cached = RecordingCompletions(content=content)
+    analyzer = make_analyzer(tmp_path, cached)
+    analyzer.analyze_financial_data("无法在本地解析的内容")
+    analyzer.analyze_financial_data("无法在本地解析的内容")
+    assert len(cached.requests) == 1
+
+    bypassed = RecordingCompletions(content=content)
+    client = SimpleNamespace(chat=SimpleNamespace(completions=bypassed))
+    analyzer = FinancialAnalyzer('test-key', result_cache=LLMResultCache(tmp_path), client=client, bypass_cache=True)
+    assert json.loads(analyzer.analyze_financial_data("无法在本地解析的内容")) == LLM_RESULT
+    assert len(bypassed.requests) == 1
+    # 单次调用的参数优先于分析器的设置
+    analyzer.analyze_financial_data("无法在本地解析的内容", bypass_cache=False)
+    assert len(bypassed.requests) == 1
@@ -0,0 +1,115 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from financial_comparison_analyzer import FinancialComparisonAnalyzer
+from peer_snapshot_store import PeerSnapshotStore
+from percentile_index import DEFAULT_SCORE, LOWEST_SCORE
+
+METRICS = {
+    '盈利能力指标': {'净利润': None, '销售净利率': 15.0, '销售毛利率': None, '净资产收益率': 10.0},
+    '成长性指标': {'净利润同比增长率': 50.0, '营业总收入同比增长率': 25.0},
+    '偿债能力指标': {'流动比率': 2.0, '速动比率': 1.4, '资产负债率': 50.0},
+    '营运能力指标': {'存货周转天数': None, '应收账款周转天数': 30.0},
+}
+
+
+def make_industry_df():
+    return pd.DataFrame({
+        metric: [10.0, 20.0, 30.0, 40.0, 50.0]
+        for metric in FinancialComparisonAnalyzer().weights
+    })
+
+
+def test_null_metrics_load_as_nan_and_score_lowest(tmp_path):
+    json_path = tmp_path / 'company.json'
+    json_path.write_text(json.dumps(METRICS, ensure_ascii=False), encoding='utf-8')
+    analyzer = FinancialComparisonAnalyzer()
+
+    target_metrics = analyzer.load_target_company_data(json_path)
+    assert np.isnan(target_metrics['销售毛利率'])
+    assert target_metrics['流动比率'] == 2.0
+
+    result = analyzer.score_target(target_metrics, make_industry_df())
+    assert result['scores']['销售毛利率'] == LOWEST_SCORE
+    assert result['scores']['存货周转天数'] == LOWEST_SCORE
+
+    report = analyzer.generate_comparison_report(target_metrics, make_industry_df(), '测试公司', '测试行业', 2020)
+    assert '| 盈利能力 | 销售毛利率 | 数据缺失 |' in report
+
+
+def test_infinite_peer_values_are_dropped_on_ingest_and_mmap_paths(tmp_path):
+    weights = FinancialComparisonAnalyzer().weights
+    rows = []
+    for index in range(5):
+        row = {'股票代码': f"00000{index}", '股票简称': f"公司{index}"}
+        row.update({metric: str(10.0 * (index + 1)) for metric in weights})
+        rows.append(row)
+    rows[2]['存货周转天数'] = 'inf'
+    # 只有快照库中的快照会生成列式副本
+    csv_path = PeerSnapshotStore(str(tmp_path)).save('801010.SI', 2020, pd.DataFrame(rows))['path']
+    analyzer = FinancialComparisonAnalyzer()
+
+    # 第一次读取时转换并写出列式副本，第二次读取内存映射的副本
+    ingested = analyzer.load_industry_data(str(csv_path))
+    assert analyzer.peer_store.is_current(str(csv_path))
+    mapped = analyzer.load_industry_data(str(csv_path))
+
+    for df in [ingested, mapped]:
+        assert len(df) == 4
+        assert '000002' not in set(df['股票代码'])
+    assert np.isnan(analyzer.peer_store.load(str(csv_path))['存货周转天数'][2])
+
+
+def test_league_table_matches_per_company_scoring():
+    analyzer = FinancialComparisonAnalyzer()
+    rng = np.random.default_rng(0)
+    industry_df = pd.DataFrame({
+        # 取值很少，制造大量并列
+        metric: rng.integers(0, 4, size=12).astype(float) * 10
+        for metric in analyzer.weights
+    })
+    industry_df['股票代码'] = [f"{code:06d}" for code in range(12)]
+    industry_df.loc[0, '销售毛利率'] = np.nan
+    industry_df.loc[1, '存货周转天数'] = np.inf
+    industry_df.loc[2, '净资产收益率'] = -np.inf
+    # 完全相同的两家公司应得到相同的评分和排名
+    industry_df.loc[4, list(analyzer.weights)] = industry_df.loc[3, list(analyzer.weights)]
+    # 行业中没有任何有效数据的指标
+    industry_df['速动比率'] = np.nan
+
+    league_df = analyzer.generate_league_table(industry_df).set_index('股票代码')
+    index = analyzer.build_percentile_index(industry_df)
+
+    for _, row in industry_df.iterrows():
+        expected = analyzer.score_target(row[list(analyzer.weights)].to_dict(), industry_df, index)
+        actual = league_df.loc[row['股票代码']]
+        for metric, score in expected['scores'].items():
+            assert actual[f'{metric}得分'] == score, (row['股票代码'], metric)
+        for category, score in expected['category_scores'].items():
+            assert actual[f'{category}得分'] == round(score, 1)
+        assert actual['综合评分'] == round(expected['total_score'], 1)
+        assert actual['评级'] == expected['rating']
+
+    assert league_df.loc['000003', '行业排名'] == league_df.loc['000004', '行业排名']
+    assert league_df.loc['000000', '销售毛利率得分'] == LOWEST_SCORE
+    assert league_df.loc['000001', '存货周转天数得分'] == LOWEST_SCORE
+    assert (league_df['速动比率得分'] == DEFAULT_SCORE).all()
+
+
+def test_trend_report_scores_each_year_against_its_own_peers():
+    analyzer = FinancialComparisonAnalyzer()
+    target_metrics = {metric: 35.0 for metric in analyzer.weights}
+    industry_data_by_year = {
+        2021: make_industry_df() * 2,
+        2020: make_industry_df(),
+    }
+
+    report = analyzer.generate_trend_report(target_metrics, industry_data_by_year, '测试公司', '测试行业')
+
+    for year, industry_df in industry_data_by_year.items():
+        expected = analyzer.score_target(target_metrics, industry_df)
+        assert f"| {year} | 5家 | {expected['total_score']:.1f}分 | {expected['rating']} |" in report
+    assert '**分析年份**: 2020-2021年' in report
+    assert report.index('| 2020 | 5家') < report.index('| 2021 | 5家')
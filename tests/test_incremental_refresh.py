@@ -0,0 +1,135 @@
+import json
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+pytest.importorskip('akshare')
+
+from stock_financial_cache import StockFinancialCache
+from concurrent_fetcher import ConcurrentFetcher
+from peer_snapshot_store import PeerSnapshotStore
+from constituent_cache import ConstituentCache
+from industry_financial_analyzer import IndustryFinancialAnalyzer
+
+YEAR = 2020
+SETTLED = datetime(2021, 5, 1)
+
+
+def metadata(fetched_at, latest_report_period=None):
+    return {'fetched_at': fetched_at.isoformat(timespec='seconds'), 'latest_report_period': latest_report_period}
+
+
+@pytest.mark.parametrize('fetched_at, latest, now, expected', [
+    # 5月1日之后获取的缓存已包含全部年报
+    (SETTLED, '2019', datetime(2021, 6, 1), False),
+    # 截止日前获取、已有年末报告期
+    (datetime(2021, 4, 1), '2020', datetime(2021, 4, 20), False),
+    (datetime(2021, 4, 1), '2020-12-31', datetime(2021, 4, 20), False),
+    (datetime(2021, 4, 1), '2021-03-31', datetime(2021, 4, 20), False),
+    # 截止日前获取、年末报告尚未覆盖，超过最小间隔后需要重新获取
+    (datetime(2021, 4, 1), '2019', datetime(2021, 4, 20), True),
+    (datetime(2021, 4, 1), '2020-09-30', datetime(2021, 4, 20), True),
+    (datetime(2021, 4, 30, 12), None, datetime(2021, 5, 2), True),
+    # 未超过最小间隔时不重复获取
+    (datetime(2021, 4, 1), '2020-09-30', datetime(2021, 4, 1, 12), False),
+])
+def test_may_have_new_report_around_the_may_cutoff(tmp_path, fetched_at, latest, now, expected):
+    cache = StockFinancialCache(str(tmp_path), refresh_interval_hours=24)
+    assert cache.may_have_new_report(metadata(fetched_at, latest), YEAR, now=now) is expected
+
+
+def test_may_have_new_report_without_cache(tmp_path):
+    cache = StockFinancialCache(str(tmp_path))
+    assert cache.may_have_new_report(None, YEAR)
+
+
+class FakeDataSource:
+    """按三级行业返回成分股、按股票返回固定财务摘要的数据源"""
+
+    def __init__(self, constituents):
+        self.constituents = constituents
+        self.fetched = []
+
+    def sw_index_third_cons(self, symbol):
+        codes = self.constituents.get(symbol, [])
+        return pd.DataFrame({
+            '序号': range(1, len(codes) + 1),
+            '股票代码': [f"{code}.SZ" for code in codes],
+            '股票简称': codes,
+        })
+
+    def stock_financial_abstract_ths(self, symbol, indicator="按年度"):
+        self.fetched.append(symbol)
+        return pd.DataFrame({'报告期': ['2019', '2020'], '净利润': ['1.00亿', '2.00亿']})
+
+
+def make_analyzer(tmp_path, constituents):
+    mapping_file = tmp_path / 'mapping.csv'
+    pd.DataFrame([
+        ['801010.SI', '农林牧渔', '801016.SI', '种植业', '850111.SI', '种子'],
+        ['801120.SI', '食品饮料', '801125.SI', '白酒Ⅱ', '851251.SI', '白酒Ⅲ'],
+    ], columns=['一级行业代码', '一级行业名称', '二级行业代码', '二级行业名称', '三级行业代码', '三级行业名称']
+    ).to_csv(mapping_file, index=False, encoding='utf-8-sig')
+
+    source = FakeDataSource(constituents)
+    analyzer = IndustryFinancialAnalyzer(
+        financial_cache=StockFinancialCache(str(tmp_path / 'stock_financial')),
+        fetcher=ConcurrentFetcher(max_workers=2, requests_per_second=0),
+        snapshot_store=PeerSnapshotStore(str(tmp_path / 'snapshots')),
+        constituent_cache=ConstituentCache(str(tmp_path / 'constituents.json')),
+        data_source=source,
+    )
+    analyzer.industry_mapping_file = str(mapping_file)
+    return analyzer, source
+
+
+def backdate(cache, stock_code, fetched_at, latest_report_period):
+    """把已缓存股票的获取时间改到年报披露截止日之前"""
+    _, meta_path = cache._paths(stock_code, "按年度")
+    with open(meta_path, 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    meta.update(metadata(fetched_at, latest_report_period))
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+
+
+def test_refresh_refetches_only_stale_and_new_stocks(tmp_path):
+    analyzer, source = make_analyzer(tmp_path, {'850111.SI': ['000001', '000002', '000003']})
+    analyzer.constituent_cache.update('850111.SI', ['000001', '000002'])
+    for code in ('000001', '000002'):
+        analyzer.fetch_stock_financial_history(code)
+    # 000001 在截止日之后获取，2020年数据不会再变；000002 在截止日前获取且缺少2020年年报
+    backdate(analyzer.financial_cache, '000002', datetime(2021, 3, 1), '2019')
+    source.fetched.clear()
+
+    summary = analyzer.refresh_industries(['801010.SI'], YEAR)
+
+    assert sorted(source.fetched) == ['000002', '000003']
+    assert summary['stocks_total'] == 3
+    assert summary['stocks_fetched'] == 2
+    assert summary['stocks_failed'] == []
+    assert summary['constituent_changes'] == {'850111.SI': {'added': ['000003'], 'removed': []}}
+    # 1 次成分股请求 + 2 次财务摘要请求
+    assert summary['akshare_calls'] == 3
+    industry = summary['industries']['801010.SI']
+    assert industry['stocks'] == 3 and industry['rows'] == 3
+    snapshot = analyzer.snapshot_store.load({'path': industry['path']})
+    assert sorted(snapshot['股票代码'].astype(str).str.zfill(6)) == ['000001', '000002', '000003']
+
+    # 再次刷新时所有股票都已覆盖2020年年末，只重新获取成分股
+    source.fetched.clear()
+    summary = analyzer.refresh_industries(['801010.SI'], YEAR)
+    assert source.fetched == []
+    assert summary['akshare_calls'] == 1
+
+
+def test_refresh_all_industries_defaults_to_first_level(tmp_path):
+    analyzer, source = make_analyzer(tmp_path, {'850111.SI': ['000001'], '851251.SI': ['600519']})
+
+    summary = analyzer.refresh_all_industries(YEAR)
+    assert set(summary['industries']) == {'801010.SI', '801120.SI'}
+    assert sorted(source.fetched) == ['000001', '600519']
+
+    summary = analyzer.refresh_all_industries(YEAR, industry_names=['白酒Ⅲ', '不存在的行业'])
+    assert set(summary['industries']) == {'851251.SI'}
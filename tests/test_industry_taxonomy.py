@@ -0,0 +1,52 @@
+import pandas as pd
+
+from industry_taxonomy import IndustryTaxonomy
+
+
+def make_taxonomy():
+    mapping_df = pd.DataFrame([
+        {'一级行业代码': '801010', '一级行业名称': '农林牧渔', '二级行业代码': '801016', '二级行业名称': '种植业',
+         '三级行业代码': '850111', '三级行业名称': '种子'},
+        {'一级行业代码': '801010', '一级行业名称': '农林牧渔', '二级行业代码': '801017', '二级行业名称': '养殖业',
+         '三级行业代码': '850152', '三级行业名称': '生猪养殖'},
+        {'一级行业代码': '801120', '一级行业名称': '食品饮料', '二级行业代码': '801125', '二级行业名称': '白酒Ⅱ',
+         '三级行业代码': '851251', '三级行业名称': '白酒Ⅲ'},
+    ])
+    return IndustryTaxonomy(mapping_df, aliases={'猪肉': '生猪养殖'})
+
+
+def test_exact_alias_and_normalized_names_resolve():
+    taxonomy = make_taxonomy()
+    assert taxonomy.resolve('农林牧渔') == '801010'
+    assert taxonomy.resolve('850111') == '850111'
+    assert taxonomy.resolve('猪肉') == '850152'
+    # 同名时优先返回较高层级
+    assert taxonomy.resolve('白酒') == '801125'
+
+
+def test_unknown_name_is_not_fuzzy_matched_by_default():
+    taxonomy = make_taxonomy()
+    assert taxonomy.resolve('生猪养值') is None
+    assert taxonomy.resolve('生猪养值', fuzzy=True) == '850152'
+    # 开启模糊匹配的结果不影响默认调用的缓存
+    assert taxonomy.resolve('生猪养值') is None
+
+
+def test_suggest_returns_close_names():
+    taxonomy = make_taxonomy()
+    assert taxonomy.suggest('生猪养值') == ['生猪养殖']
+    assert taxonomy.suggest('半导体') == []
+
+
+def test_resolve_cache_is_bounded_lru():
+    taxonomy = make_taxonomy()
+    taxonomy.resolve_cache_size = 2
+    assert taxonomy.resolve('种子') == '850111'
+    assert taxonomy.resolve('不存在的行业A') is None
+    # 再次访问后 '种子' 成为最近使用的条目
+    assert taxonomy.resolve('种子') == '850111'
+    assert taxonomy.resolve('不存在的行业B') is None
+
+    assert len(taxonomy._resolve_cache) == 2
+    assert ('种子', False) in taxonomy._resolve_cache
+    assert ('不存在的行业A', False) not in taxonomy._resolve_cache
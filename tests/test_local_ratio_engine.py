@@ -0,0 +1,102 @@
+import pytest
+
+from statement_locator import StatementLocator
+from local_ratio_engine import LocalRatioEngine, BALANCE_SHEET_ITEMS, INCOME_STATEMENT_ITEMS, parse_number
+
+BALANCE_SHEET = """## 合并资产负债表
+
+单位：万元
+
+| 项目 | 附注 | 2020年12月31日 | 2019年12月31日 |
+|---|---|---|---|
+| 应收账款 | 5 | 200 | 100 |
+| 存货 | 6 | 300 | 100 |
+| 流动资产合计 | | 1,000 | 800 |
+| 资产总计 | | 4,000 | 3,000 |
+| 流动负债合计 | | 500 | 400 |
+| 负债合计 | | 2,000 | 1,500 |
+| 所有者权益合计 | | 2,000 | 1,500 |
+"""
+
+# 上期列在前（2019年度、2020年度），金额单位为亿元
+INCOME_STATEMENT = """## 合并利润表
+
+单位：亿元
+
+| 项目 | 2019年度 | 2020年度 |
+|---|---|---|
+| 一、营业总收入 | 8 | 10 |
+| 其中：营业收入 | 8 | 10 |
+| 减：营业成本 | 6 | 7 |
+| 五、净利润（净亏损以"－"号填列） | 1 | 1.5 |
+"""
+
+
+def test_parse_number_handles_report_formats():
+    assert parse_number('1,234.50') == 1234.5
+    assert parse_number('(1,000)') == -1000
+    assert parse_number('１２３') == 123
+    assert parse_number('-') is None
+    assert parse_number('七、1') is None
+
+
+def test_locator_finds_statements_and_units():
+    sections = StatementLocator().locate_sections("目录\n\n合并资产负债表........12\n\n" + BALANCE_SHEET + INCOME_STATEMENT)
+    assert sections['合并资产负债表']['unit'] == 1e4
+    assert sections['合并利润表']['unit'] == 1e8
+    assert len(sections['合并资产负债表']['tables']) == 1
+
+
+def test_locator_prefers_consolidated_statement():
+    parent_only = BALANCE_SHEET.replace('合并资产负债表', '母公司资产负债表').replace('200', '999')
+    sections = StatementLocator().locate_sections(parent_only + "\n" + BALANCE_SHEET)
+    table = sections['合并资产负债表']['tables'][0]
+    assert '| 应收账款 | 5 | 200 | 100 |' in table
+
+
+def test_note_column_is_skipped_and_units_applied():
+    engine = LocalRatioEngine()
+    section = engine.statement_locator.locate_sections(BALANCE_SHEET)['合并资产负债表']
+    items = engine.extract_line_items(section['tables'], BALANCE_SHEET_ITEMS, section['unit'])
+    assert items['应收账款'] == (200 * 1e4, 100 * 1e4)
+    assert items['存货'] == (300 * 1e4, 100 * 1e4)
+    assert items['资产总计'] == (4000 * 1e4, 3000 * 1e4)
+
+
+def test_small_integer_note_without_header_is_skipped():
+    table = "| 应收账款 | 5 | 200 | 100 |\n| 存货 | 12 | 300 | 100 |\n"
+    items = LocalRatioEngine().extract_line_items([table], BALANCE_SHEET_ITEMS)
+    assert items['应收账款'] == (200, 100)
+    assert items['存货'] == (300, 100)
+
+
+def test_reversed_year_columns_are_swapped():
+    engine = LocalRatioEngine()
+    section = engine.statement_locator.locate_sections(INCOME_STATEMENT)['合并利润表']
+    items = engine.extract_line_items(section['tables'], INCOME_STATEMENT_ITEMS, section['unit'])
+    assert items['营业收入'] == (10e8, 8e8)
+    assert items['营业成本'] == (7e8, 6e8)
+    assert items['净利润'] == (1.5e8, 1e8)
+
+
+def test_compute_metrics_from_both_statements():
+    result, missing = LocalRatioEngine().compute(BALANCE_SHEET + "\n" + INCOME_STATEMENT)
+    assert missing == []
+    assert result['盈利能力指标']['销售毛利率'] == 30.0
+    assert result['盈利能力指标']['销售净利率'] == 15.0
+    assert result['成长性指标']['营业总收入同比增长率'] == 25.0
+    assert result['成长性指标']['净利润同比增长率'] == 50.0
+    assert result['偿债能力指标']['流动比率'] == 2.0
+    assert result['偿债能力指标']['速动比率'] == 1.4
+    assert result['偿债能力指标']['资产负债率'] == 50.0
+    # 365 ÷ (营业成本 ÷ 平均存货)，金额单位不同的两张报表按元计算
+    assert result['营运能力指标']['存货周转天数'] == pytest.approx(365 / (7e8 / 2e6), abs=0.01)
+
+
+def test_missing_income_statement_reports_missing_metrics():
+    result, missing = LocalRatioEngine().compute(BALANCE_SHEET)
+    assert result['偿债能力指标'] == {'流动比率': 2.0, '速动比率': 1.4, '资产负债率': 50.0}
+    assert set(missing) == {
+        '净利润', '销售净利率', '销售毛利率', '净资产收益率', '净利润同比增长率',
+        '营业总收入同比增长率', '存货周转天数', '应收账款周转天数',
+    }
@@ -0,0 +1,118 @@
+import os
+import sys
+import time
+import multiprocessing
+import multiprocessing.spawn
+
+import pytest
+
+from mineru_worker_pool import MinerUWorkerPool, MinerUWorker
+
+
+class BrokenWorker:
+    """提取时进程被终止、之后无法重启的工作进程"""
+
+    def __init__(self):
+        self.process = object()
+        self.start_calls = 0
+
+    def run(self, pdf_path, output_dir, timeout):
+        self.process = None
+        raise TimeoutError("MinerU提取超时")
+
+    def start(self):
+        self.start_calls += 1
+        raise RuntimeError("无法导入MinerU")
+
+    def stop(self):
+        self.process = None
+
+
+def make_pool(workers, **kwargs):
+    pool = MinerUWorkerPool(workers=len(workers), **kwargs)
+    pool._available = True
+    for worker in workers:
+        pool._all_workers.append(worker)
+        pool._idle.put(worker)
+    return pool
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_worker_that_fails_to_restart_is_dropped(tmp_path, monkeypatch):
+    monkeypatch.delenv('MINERU_PYTHON', raising=False)
+    worker = BrokenWorker()
+    pool = make_pool([worker], python_executable=None)
+
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        pool.extract('report.pdf', str(tmp_path))
+    # 重启在后台进行，不占用本次任务的时间
+    assert time.monotonic() - start < 1
+
+    assert wait_until(lambda: not pool._all_workers)
+    assert worker.start_calls == 1
+    assert pool._idle.empty()
+    # 没有可用进程时退回命令行方式
+    assert pool.is_available() is False
+
+
+def test_failed_restart_with_configured_interpreter_raises(tmp_path):
+    pool = make_pool([BrokenWorker()], python_executable=sys.executable)
+
+    with pytest.raises(TimeoutError):
+        pool.extract('report.pdf', str(tmp_path))
+
+    assert wait_until(lambda: not pool._all_workers)
+    with pytest.raises(RuntimeError, match='重启失败'):
+        pool.is_available()
+
+
+def test_missing_configured_interpreter_fails_loudly(tmp_path):
+    pool = MinerUWorkerPool(workers=1, python_executable=str(tmp_path / 'myenv' / 'bin' / 'python'))
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError, match='解释器不存在'):
+            pool.is_available()
+
+
+def test_interpreter_resolution(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('MINERU_PYTHON', '/opt/mineru/bin/python')
+    pool = MinerUWorkerPool(workers=1)
+    assert pool.python_executable == '/opt/mineru/bin/python'
+    assert pool.python_configured
+
+    monkeypatch.delenv('MINERU_PYTHON')
+    pool = MinerUWorkerPool(workers=1)
+    assert pool.python_executable == sys.executable
+    assert not pool.python_configured
+
+
+class RecordingProcess:
+    """记录启动时 spawn 使用的解释器，不真正启动进程"""
+
+    def __init__(self, **kwargs):
+        self.executable = None
+
+    def start(self):
+        self.executable = multiprocessing.spawn.get_executable()
+
+
+def test_worker_launch_restores_the_global_spawn_executable(tmp_path, monkeypatch):
+    context = multiprocessing.get_context('spawn')
+    monkeypatch.setattr(context, 'Process', RecordingProcess)
+    venv_python = str(tmp_path / 'myenv' / 'bin' / 'python')
+    previous = multiprocessing.spawn.get_executable()
+    worker = MinerUWorker(context, 'cpu', 1, 'ch', 'pipeline', 'auto', 1, venv_python)
+
+    # 首次启动和重启都使用MinerU环境的解释器，之后恢复原值
+    for _ in range(2):
+        worker.launch()
+        assert os.fsdecode(worker.process.executable) == venv_python
+        assert multiprocessing.spawn.get_executable() == previous
@@ -0,0 +1,74 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip('akshare')
+
+from stock_financial_cache import StockFinancialCache
+from concurrent_fetcher import ConcurrentFetcher
+from peer_snapshot_store import PeerSnapshotStore
+from constituent_cache import ConstituentCache
+from industry_financial_analyzer import IndustryFinancialAnalyzer
+
+
+class FakeDataSource:
+    """一个三级行业、三只成分股，每只股票有2018-2020年的年报"""
+
+    def __init__(self):
+        self.fetched = []
+
+    def sw_index_third_cons(self, symbol):
+        return pd.DataFrame({'序号': [1, 2, 3], '股票代码': ['000001.SZ', '000002.SZ', '000003.SZ']})
+
+    def stock_financial_abstract_ths(self, symbol, indicator="按年度"):
+        self.fetched.append(symbol)
+        # 000003 在2019年才上市
+        years = ['2019', '2020'] if symbol == '000003' else ['2018', '2019', '2020']
+        return pd.DataFrame({'报告期': years, '净利润': ['1.00亿'] * len(years)})
+
+
+def make_analyzer(tmp_path):
+    mapping_file = tmp_path / 'mapping.csv'
+    pd.DataFrame(
+        [['801010.SI', '农林牧渔', '801016.SI', '种植业', '850111.SI', '种子']],
+        columns=['一级行业代码', '一级行业名称', '二级行业代码', '二级行业名称', '三级行业代码', '三级行业名称'],
+    ).to_csv(mapping_file, index=False, encoding='utf-8-sig')
+    source = FakeDataSource()
+    analyzer = IndustryFinancialAnalyzer(
+        financial_cache=StockFinancialCache(str(tmp_path / 'stock_financial')),
+        fetcher=ConcurrentFetcher(max_workers=2, requests_per_second=0),
+        snapshot_store=PeerSnapshotStore(str(tmp_path / 'snapshots')),
+        constituent_cache=ConstituentCache(str(tmp_path / 'constituents.json')),
+        data_source=source,
+    )
+    analyzer.industry_mapping_file = str(mapping_file)
+    return analyzer, source
+
+
+def test_range_fetches_each_history_once_and_snapshots_every_year(tmp_path):
+    analyzer, source = make_analyzer(tmp_path)
+
+    csv_paths = analyzer.analyze_industry_financials_range('种子', [2020, 2018, 2019, 2017])
+
+    assert sorted(source.fetched) == ['000001', '000002', '000003']
+    # 没有任何数据的2017年不生成快照
+    assert sorted(csv_paths) == [2018, 2019, 2020]
+    for year, expected in {2018: 2, 2019: 3, 2020: 3}.items():
+        snapshot = pd.read_csv(csv_paths[year], encoding='utf-8-sig', dtype={'股票代码': str})
+        assert len(snapshot) == expected
+        assert set(snapshot['报告期'].astype(str)) == {str(year)}
+        assert analyzer.snapshot_store.get_latest('850111.SI', year)['path'] == csv_paths[year]
+
+    # 再次分析时全部年份都有快照，不再访问数据源
+    source.fetched.clear()
+    assert analyzer.analyze_industry_financials_range('种子', [2018, 2019, 2020]) == csv_paths
+    assert source.fetched == []
+
+
+def test_split_years_skips_years_without_data(tmp_path):
+    analyzer, _ = make_analyzer(tmp_path)
+    history = pd.DataFrame({'报告期': ['2019', '2020'], '净利润': ['1.00亿', '2.00亿']})
+
+    yearly = analyzer.split_years(history, '000001', [2018, 2019, 2020])
+    assert sorted(yearly) == [2019, 2020]
+    assert yearly[2020]['净利润'].tolist() == ['2.00亿']
+    assert yearly[2020]['股票代码'].tolist() == ['000001']
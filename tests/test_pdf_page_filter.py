@@ -0,0 +1,13 @@
+import pdf_page_filter
+from pdf_page_filter import PdfPageFilter
+
+
+def test_missing_pypdf_is_reported_once(monkeypatch, capsys, tmp_path):
+    monkeypatch.setattr(pdf_page_filter, 'PdfReader', None)
+    monkeypatch.setattr(PdfPageFilter, '_missing_pypdf_reported', False)
+    page_filter = PdfPageFilter()
+
+    for _ in range(3):
+        assert page_filter.prepare('report.pdf', str(tmp_path)) == ('report.pdf', None)
+
+    assert capsys.readouterr().out.count('未安装pypdf') == 1
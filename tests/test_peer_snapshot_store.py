@@ -0,0 +1,53 @@
+import os
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from peer_snapshot_store import PeerSnapshotStore
+
+
+def make_peer_df(rows):
+    return pd.DataFrame({'股票代码': [f"{code:06d}" for code in range(rows)], '净利润': ['1.00亿'] * rows})
+
+
+def test_each_save_creates_a_new_version(tmp_path):
+    store = PeerSnapshotStore(str(tmp_path))
+    first = store.save('801010.SI', 2020, make_peer_df(2), industry_name='农林牧渔')
+    second = store.save('801010.SI', 2020, make_peer_df(3), extra_metadata={'refresh': 'incremental'})
+
+    assert (first['version'], second['version']) == (1, 2)
+    assert second['stock_count'] == 3 and second['refresh'] == 'incremental'
+    assert [v['version'] for v in store.list_versions('801010.SI', 2020)] == [1, 2]
+    assert store.get_latest('801010.SI', 2020)['version'] == 2
+    assert len(store.load(store.get_latest('801010.SI', 2020))) == 3
+    # 行业代码中的 '.' 不出现在目录名中，其他年份互不影响
+    assert os.path.isdir(tmp_path / '801010_SI' / '2020')
+    assert store.get_latest('801010.SI', 2021) is None
+    assert store.list_industries(2020) == ['801010.SI']
+
+
+def test_prune_keeps_latest_versions_and_their_columnar_copies(tmp_path):
+    store = PeerSnapshotStore(str(tmp_path), keep_versions=2)
+    saved = [store.save('801010.SI', 2020, make_peer_df(1)) for _ in range(2)]
+    for info in saved:
+        os.makedirs(os.path.splitext(info['path'])[0] + '.columns')
+    saved.append(store.save('801010.SI', 2020, make_peer_df(1)))
+
+    assert [v['version'] for v in store.list_versions('801010.SI', 2020)] == [2, 3]
+    assert not os.path.exists(saved[0]['path'])
+    assert not os.path.exists(os.path.splitext(saved[0]['path'])[0] + '.columns')
+    assert os.path.exists(saved[1]['path'])
+    assert os.path.exists(os.path.splitext(saved[1]['path'])[0] + '.columns')
+
+
+def test_expired_or_missing_snapshots_are_not_returned(tmp_path):
+    store = PeerSnapshotStore(str(tmp_path), max_age_days=7)
+    info = store.save('801010.SI', 2020, make_peer_df(1))
+    created_at = datetime.fromisoformat(info['created_at'])
+
+    assert store.is_fresh(info, now=created_at + timedelta(days=7))
+    assert not store.is_fresh(info, now=created_at + timedelta(days=8))
+    assert not store.is_fresh(info, max_age_days=0, now=created_at + timedelta(seconds=1))
+
+    os.remove(info['path'])
+    assert store.get_latest('801010.SI', 2020) is None
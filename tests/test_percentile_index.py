@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from percentile_index import IndustryPercentileIndex, DEFAULT_SCORE, LOWEST_SCORE
+
+
+def make_index():
+    industry_df = pd.DataFrame({
+        '销售毛利率': [10.0, 20.0, 30.0, 40.0, 50.0],
+        '资产负债率': [10.0, 20.0, 30.0, 40.0, 50.0],
+        '流动比率': [np.nan, np.nan, np.nan, np.nan, np.nan],
+    })
+    return IndustryPercentileIndex(industry_df, ['销售毛利率', '资产负债率', '流动比率'])
+
+
+def test_scores_follow_percentile_bands():
+    index = make_index()
+    assert index.score('销售毛利率', 55.0) == 100
+    assert index.score('销售毛利率', 5.0) == LOWEST_SCORE
+    # 负向指标越小越好
+    assert index.score('资产负债率', 5.0) == 100
+    assert index.score('资产负债率', 55.0) == LOWEST_SCORE
+
+
+def test_missing_target_gets_lowest_score_not_top_score():
+    index = make_index()
+    for metric in ['销售毛利率', '资产负债率']:
+        for value in [np.nan, np.inf, -np.inf]:
+            assert np.isnan(index.percentile(metric, value))
+            assert index.score(metric, value) == LOWEST_SCORE
+
+
+def test_score_array_marks_non_finite_targets_as_missing():
+    index = make_index()
+    scores = index.score_array('销售毛利率', [55.0, np.nan, np.inf, 5.0])
+    assert scores[0] == 100
+    assert np.isnan(scores[1]) and np.isnan(scores[2])
+    assert scores[3] == LOWEST_SCORE
+
+
+def test_metric_without_industry_data_uses_default_score():
+    index = make_index()
+    assert index.score('流动比率', 1.5) == DEFAULT_SCORE
+    scores = index.score_array('流动比率', [1.5, np.nan])
+    assert scores[0] == DEFAULT_SCORE and np.isnan(scores[1])
+
+
+def test_infinite_industry_values_are_ignored():
+    index = IndustryPercentileIndex(pd.DataFrame({'销售毛利率': [10.0, 20.0, np.inf]}), ['销售毛利率'])
+    assert index.percentile('销售毛利率', 15.0) == 50.0
@@ -0,0 +1,129 @@
+import time
+import threading
+
+import pytest
+
+from pipeline_graph import PipelineGraph, PipelineCancelled
+
+
+def test_stages_receive_dependency_results():
+    pipeline = PipelineGraph()
+    pipeline.add_stage('a', lambda: 2)
+    pipeline.add_stage('b', lambda: 3)
+    pipeline.add_stage('sum', lambda a, b: a + b, depends_on=['a', 'b'])
+    assert pipeline.run() == {'a': 2, 'b': 3, 'sum': 5}
+
+
+def test_unknown_dependency_is_rejected():
+    pipeline = PipelineGraph()
+    with pytest.raises(ValueError):
+        pipeline.add_stage('report', lambda x: x, depends_on=['missing'])
+
+
+def test_later_stage_failure_is_raised_without_waiting_for_earlier_stages():
+    release = threading.Event()
+    downstream_calls = []
+
+    def slow_extract():
+        release.wait(5)
+        return 'markdown'
+
+    def failing_fetch():
+        raise RuntimeError("行业数据获取失败")
+
+    pipeline = PipelineGraph()
+    pipeline.add_stage('markdown', slow_extract)
+    pipeline.add_stage('company_json', lambda markdown: downstream_calls.append(markdown), depends_on=['markdown'])
+    pipeline.add_stage('industry_csv', failing_fetch)
+
+    start = time.perf_counter()
+    with pytest.raises(RuntimeError, match="行业数据获取失败"):
+        pipeline.run()
+    assert time.perf_counter() - start < 2
+
+    # 失败后才结束的上游阶段不会再触发下游阶段（如付费的模型调用）
+    release.set()
+    time.sleep(0.2)
+    assert downstream_calls == []
+
+
+def test_cleanup_waits_for_detached_stages(tmp_path):
+    release = threading.Event()
+    written = []
+    cleaned = threading.Event()
+
+    def slow_extract():
+        release.wait(5)
+        # 失败后仍在运行的阶段继续写入临时目录
+        (tmp_path / 'output.md').write_text('markdown', encoding='utf-8')
+        written.append(True)
+
+    def failing_fetch():
+        raise RuntimeError("行业数据获取失败")
+
+    pipeline = PipelineGraph()
+    pipeline.add_stage('markdown', slow_extract)
+    pipeline.add_stage('industry_csv', failing_fetch)
+    with pytest.raises(RuntimeError):
+        pipeline.run()
+
+    pipeline.call_when_idle(cleaned.set)
+    assert not cleaned.is_set()
+    release.set()
+    assert cleaned.wait(5)
+    assert written == [True]
+
+
+def test_cleanup_runs_immediately_when_all_stages_finished():
+    pipeline = PipelineGraph()
+    pipeline.add_stage('a', lambda: 1)
+    pipeline.run()
+    calls = []
+    pipeline.call_when_idle(lambda: calls.append(True))
+    assert calls == [True]
+
+
+def test_waiting_stage_is_cancelled_after_another_stage_fails():
+    release = threading.Event()
+    started = []
+
+    def slow_extract():
+        release.wait(5)
+        return 'markdown'
+
+    def failing_fetch():
+        raise RuntimeError("行业数据获取失败")
+
+    pipeline = PipelineGraph()
+    pipeline.add_stage('markdown', slow_extract)
+    pipeline.add_stage('company_json', lambda markdown: started.append(markdown), depends_on=['markdown'])
+    pipeline.add_stage('industry_csv', failing_fetch)
+    with pytest.raises(RuntimeError):
+        pipeline.run()
+
+    release.set()
+    markdown_future, company_future, _ = pipeline.futures
+    assert markdown_future.result(5) == 'markdown'
+    with pytest.raises(PipelineCancelled):
+        company_future.result(5)
+    assert started == []
+
+
+def test_dependency_failure_is_raised_instead_of_cancellation():
+    calls = []
+
+    def failing_extract():
+        raise ValueError("MinerU提取失败")
+
+    pipeline = PipelineGraph()
+    pipeline.add_stage('markdown', failing_extract)
+    pipeline.add_stage('company_json', lambda markdown: calls.append(markdown), depends_on=['markdown'])
+    pipeline.add_stage('report', lambda company_json: calls.append(company_json), depends_on=['company_json'])
+
+    with pytest.raises(ValueError, match="MinerU提取失败"):
+        pipeline.run()
+    # 下游阶段重新抛出依赖阶段的异常，不会被调用
+    for future in pipeline.futures[1:]:
+        with pytest.raises(ValueError):
+            future.result(5)
+    assert calls == []
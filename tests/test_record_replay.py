@@ -0,0 +1,62 @@
+import json
+from types import SimpleNamespace
+
+from record_replay import CallArchive, RecordingOpenAIClient, ReplayOpenAIClient
+
+CONTENT = json.dumps({'盈利能力指标': {'销售毛利率': 20.0}}, ensure_ascii=False) + " 以上为计算结果。" * 20
+REQUEST = {'model': 'deepseek-chat', 'messages': [{'role': 'user', 'content': '分析'}], 'temperature': 0.1}
+
+
+class FakeStream:
+    def __init__(self, text, chunk_chars=8):
+        self.chunks = [text[i:i + chunk_chars] for i in range(0, len(text), chunk_chars)]
+        self.closed = False
+
+    def __iter__(self):
+        for content in self.chunks:
+            delta = SimpleNamespace(content=content)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+
+    def close(self):
+        self.closed = True
+
+
+class StreamingCompletions:
+    def __init__(self, text):
+        self.stream = FakeStream(text)
+
+    def create(self, **kwargs):
+        return self.stream
+
+
+def read_stream(stream, max_chunks):
+    """像流式分析一样读取部分分片后提前关闭"""
+    parts = []
+    for index, chunk in enumerate(stream):
+        parts.append(chunk.choices[0].delta.content)
+        if index + 1 >= max_chunks:
+            break
+    stream.close()
+    return ''.join(parts)
+
+
+def test_stream_closed_early_is_recorded_and_replayed(tmp_path):
+    archive_path = str(tmp_path / 'calls.zip')
+    completions = StreamingCompletions(CONTENT)
+    real_client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+    with CallArchive(archive_path, 'w') as archive:
+        client = RecordingOpenAIClient(real_client, archive)
+        recorded = read_stream(client.chat.completions.create(stream=True, **REQUEST), 10)
+        assert archive.recorded == 1
+    assert completions.stream.closed
+    assert len(recorded) < len(CONTENT)
+
+    with CallArchive(archive_path, 'r') as archive:
+        client = ReplayOpenAIClient(archive)
+        replayed = ''.join(
+            chunk.choices[0].delta.content
+            for chunk in client.chat.completions.create(stream=True, **REQUEST)
+            if chunk.choices
+        )
+    assert replayed == recorded
@@ -0,0 +1,51 @@
+from datetime import datetime
+
+import pandas as pd
+
+from stock_financial_cache import StockFinancialCache
+
+YEAR = 2020
+SETTLED = datetime(2021, 5, 1)
+
+
+def metadata(fetched_at):
+    return {'fetched_at': fetched_at.isoformat(timespec='seconds')}
+
+
+def test_is_fresh_for_settled_and_open_years(tmp_path):
+    cache = StockFinancialCache(str(tmp_path), max_age_days=90, refresh_interval_hours=24)
+    assert not cache.is_fresh(None, YEAR)
+    # 截止日之后获取：在最长有效期内一直有效
+    assert cache.is_fresh(metadata(SETTLED), YEAR, now=datetime(2021, 7, 1))
+    assert not cache.is_fresh(metadata(SETTLED), YEAR, now=datetime(2021, 8, 1))
+    # 披露期内获取：只在最小间隔内有效
+    assert cache.is_fresh(metadata(datetime(2021, 4, 1)), YEAR, now=datetime(2021, 4, 1, 23))
+    assert not cache.is_fresh(metadata(datetime(2021, 4, 1)), YEAR, now=datetime(2021, 4, 2, 1))
+    # 不指定年份时只检查最长有效期
+    assert cache.is_fresh(metadata(datetime(2021, 4, 1)), now=datetime(2021, 6, 1))
+
+
+def test_save_load_and_invalidate(tmp_path):
+    cache = StockFinancialCache(str(tmp_path))
+    financial_df = pd.DataFrame({'报告期': ['2020', '2019'], '净利润': ['2.00亿', '1.00亿']})
+
+    metadata = cache.save('000001', financial_df)
+    assert metadata['rows'] == 2
+    assert metadata['latest_report_period'] == '2020'
+    assert cache.load_metadata('000001') == metadata
+    pd.testing.assert_frame_equal(cache.load('000001'), financial_df)
+    # 不同报告类型分开缓存
+    assert cache.load('000001', period="按单季度") is None
+
+    cache.invalidate('000001')
+    assert cache.load('000001') is None
+    assert cache.load_metadata('000001') is None
+
+
+def test_load_ignores_expired_cache_but_load_stored_does_not(tmp_path):
+    cache = StockFinancialCache(str(tmp_path), max_age_days=0)
+    financial_df = pd.DataFrame({'报告期': ['2020']})
+    cache.save('000001', financial_df)
+
+    assert cache.load('000001') is None
+    pd.testing.assert_frame_equal(cache.load_stored('000001'), financial_df)
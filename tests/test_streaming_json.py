@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+from streaming_json import IncrementalJSONParser, OffSchemaError, find_json_object
+
+DOCUMENT = json.dumps({
+    '盈利能力指标': {'销售毛利率': 30.5, '销售净利率': 12.1},
+    '偿债能力指标': {'流动比率': 1.8},
+}, ensure_ascii=False)
+
+
+def feed_in_chunks(parser, text, size=7):
+    closed = []
+    for start in range(0, len(text), size):
+        closed.extend(parser.feed(text[start:start + size]))
+    return closed
+
+
+def test_groups_are_returned_as_they_close():
+    parser = IncrementalJSONParser()
+    closed = feed_in_chunks(parser, "```json\n" + DOCUMENT + "\n```")
+    assert [name for name, _ in closed] == ['盈利能力指标', '偿债能力指标']
+    assert closed[1][1] == {'流动比率': 1.8}
+    assert parser.complete
+    assert json.loads(parser.document()) == json.loads(DOCUMENT)
+
+
+def test_braces_inside_strings_are_ignored():
+    parser = IncrementalJSONParser()
+    feed_in_chunks(parser, '{"盈利能力指标": {"净利润": "约{1}亿\\"元\\""}}')
+    assert parser.groups['盈利能力指标'] == {'净利润': '约{1}亿"元"'}
+
+
+def test_long_prefix_before_json_is_rejected():
+    parser = IncrementalJSONParser(max_prefix_chars=20)
+    with pytest.raises(OffSchemaError, match="没有JSON对象"):
+        parser.feed("以下是根据报表计算得到的各项财务指标，请参考。" + DOCUMENT)
+
+
+def test_prefix_within_limit_is_accepted():
+    parser = IncrementalJSONParser(max_prefix_chars=20)
+    parser.feed("结果如下：\n" + DOCUMENT)
+    assert parser.complete
+
+
+def test_reply_longer_than_max_chars_is_rejected():
+    parser = IncrementalJSONParser(max_chars=len(DOCUMENT) - 1)
+    with pytest.raises(OffSchemaError, match="字符仍未结束"):
+        feed_in_chunks(parser, DOCUMENT)
+
+
+def test_nesting_deeper_than_max_depth_is_rejected():
+    parser = IncrementalJSONParser()
+    with pytest.raises(OffSchemaError, match="嵌套层数"):
+        parser.feed('{"盈利能力指标": {"销售毛利率": {"本期": 30.5}}}')
+
+
+def test_arrays_are_rejected():
+    parser = IncrementalJSONParser()
+    with pytest.raises(OffSchemaError, match="数组"):
+        parser.feed('{"盈利能力指标": {"销售毛利率": [30.5, 28.1]}}')
+
+
+def test_unknown_group_is_rejected():
+    parser = IncrementalJSONParser()
+    with pytest.raises(OffSchemaError, match="未知的指标分组"):
+        parser.feed('{"现金流量指标": {"经营现金流": 1.0}}')
+
+
+def test_expected_groups_can_be_restricted():
+    parser = IncrementalJSONParser(expected_groups=['偿债能力指标'])
+    with pytest.raises(OffSchemaError):
+        parser.feed(DOCUMENT)
+
+
+def test_feed_after_complete_is_ignored():
+    parser = IncrementalJSONParser()
+    parser.feed(DOCUMENT)
+    assert parser.feed('{"盈利能力指标": {}}') == []
+    assert parser.document() == DOCUMENT
+
+
+def test_find_json_object_skips_invalid_candidates():
+    assert find_json_object('说明 {无效} 然后 ' + DOCUMENT + ' 结束') == DOCUMENT
+    assert find_json_object('没有JSON') is None
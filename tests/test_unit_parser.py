@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from unit_parser import parse_unit_series, parse_unit_value, is_unit_column
+
+EDGE_CASES = [
+    '12', '12.5%', '-12.3%', '+3.5', '.5', '5.', '1.23亿', '2.5万亿', '3万', '1,234.5万', ' 42 ',
+    '１２', '１２．５％', '－３．５亿', '1，234', '１.５万', '　12　', '٣',
+    '1e5', '1.5E-3%', '1.2%%', '1.2.3', '--5', '12亿亿', '1234567890123456789',
+    'False', 'false', 'None', 'nan', 'NaN', '--', '-', '', '亿', '%', '－－', 'abc', 'inf',
+]
+
+
+def same(left, right):
+    return (np.isnan(left) and np.isnan(right)) or left == pytest.approx(right, rel=1e-12)
+
+
+def test_vectorized_parser_matches_scalar_parser():
+    vectorized = parse_unit_series(EDGE_CASES)
+    for text, value in zip(EDGE_CASES, vectorized):
+        assert same(value, parse_unit_value(text)), text
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('１２', 12.0),
+    ('１２．５％', 12.5),
+    ('－３．５亿', -3.5e8),
+    ('1，234', 1234.0),
+    ('2.5万亿', 2.5e12),
+    ('1,234.5万', 12345000.0),
+    ('1e5', 1e5),
+])
+def test_full_width_and_unit_values(text, expected):
+    assert parse_unit_series([text])[0] == pytest.approx(expected)
+    assert parse_unit_value(text) == pytest.approx(expected)
+
+
+def test_missing_markers_are_nan():
+    for text in ['False', '--', '', 'None', None, False]:
+        assert np.isnan(parse_unit_value(text))
+    assert np.isnan(parse_unit_series(['False', '--', '', 'None'])).all()
+    assert is_unit_column(['１２％', 'False', '3.5%'])